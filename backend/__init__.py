@@ -1,6 +1,6 @@
 # Backend package
 from .server import app
 from .db_store import get_store
-from .excel_utils import read_excel_auto, canon_record
+from .excel_utils import read_excel_auto, read_excel_cached, canon_record, canon_frame
 
-__all__ = ['app', 'get_store', 'read_excel_auto', 'canon_record']
+__all__ = ['app', 'get_store', 'read_excel_auto', 'read_excel_cached', 'canon_record', 'canon_frame']
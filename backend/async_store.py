@@ -0,0 +1,111 @@
+"""Awaitable facade over the synchronous PSUR store.
+
+Store calls (SQLite I/O, Convex HTTP, Excel/CSV generation) block, so the
+FastAPI handlers run them on bounded thread pools instead of the event loop.
+Each workload class gets its own pool so a slow export cannot starve reads,
+and writes go through a single thread so they apply in submission order.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+READ_WORKERS = int(os.getenv("PSUR_READ_WORKERS", "4"))
+EXPORT_WORKERS = int(os.getenv("PSUR_EXPORT_WORKERS", "2"))
+
+WRITE_METHODS = frozenset({
+    "add_record",
+    "add_records",
+    "add_comment",
+    "archive_released",
+    "bulk_update",
+    "bulk_update_status",
+    "delete_record",
+    "generate_next_schedule",
+    "link_references",
+    "recompute_due_dates",
+    "reserve_td_numbers",
+    "restore_archived",
+    "update_record",
+})
+
+# Long-running, CPU/memory-heavy calls.
+EXPORT_METHODS = frozenset({
+    "convert_from_excel",
+    "export_calendar",
+    "export_csv",
+    "export_excel",
+    "import_from_excel",
+    "sync_from_excel",
+})
+
+
+class AsyncStore:
+    """Wraps a store so every method call returns an awaitable.
+
+    ``await async_store.find_by_td("TD001")`` runs ``store.find_by_td`` on the
+    read pool; write and export methods (see WRITE_METHODS/EXPORT_METHODS)
+    use their own pools. Plain attributes such as ``metadata`` pass through.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        *,
+        read_workers: int = READ_WORKERS,
+        export_workers: int = EXPORT_WORKERS,
+    ) -> None:
+        self.sync = store
+        self._pools: Dict[str, ThreadPoolExecutor] = {
+            "read": ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="store-read"),
+            "write": ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-write"),
+            "export": ThreadPoolExecutor(max_workers=export_workers, thread_name_prefix="store-export"),
+        }
+
+    @staticmethod
+    def workload(name: str) -> str:
+        if name in WRITE_METHODS:
+            return "write"
+        if name in EXPORT_METHODS:
+            return "export"
+        return "read"
+
+    async def run(self, workload: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the given workload's pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pools[workload], functools.partial(fn, *args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.sync, name)
+        if not callable(attr):
+            return attr
+        workload = self.workload(name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.run(workload, attr, *args, **kwargs)
+
+        return call
+
+    def shutdown(self, wait: bool = True) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+
+
+_async_store: Optional[AsyncStore] = None
+
+
+def get_async_store() -> AsyncStore:
+    """Get or create the global async wrapper around db_universal.get_store()."""
+    global _async_store
+    if _async_store is None:
+        from .db_universal import get_store
+        _async_store = AsyncStore(get_store())
+    return _async_store
+
+
+def close_async_store() -> None:
+    global _async_store
+    if _async_store is not None:
+        _async_store.shutdown(wait=False)
+        _async_store = None
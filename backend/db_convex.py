@@ -1,15 +1,43 @@
 """Convex database client for PSUR schedule - SYNC VERSION (replaces SQLite)."""
 import os
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import httpx
 from dotenv import load_dotenv
 
+from .db_store import (
+    DUE_BUCKET_SQL,
+    EXPORT_COLUMNS,
+    HASH_COLUMNS,
+    HEALTH_FIELDS,
+    INSERT_COLUMNS,
+    ORDINAL_COLUMNS,
+    PERIOD_BUCKETS,
+    PROTECTED_COLUMNS,
+    _parse_date,
+    _required_date,
+    _workbook_frame,
+    period_bounds,
+)
+from .export_utils import csv_chunks, ndjson_chunks
+
 load_dotenv()
 
 CONVEX_URL = os.getenv("CONVEX_URL", "https://unique-heron-539.convex.cloud").rstrip("/")
 
+# Documents written per psur:applySync call during workbook imports.
+SYNC_BATCH_SIZE = int(os.getenv("CONVEX_SYNC_BATCH_SIZE", "200"))
+
+
+def _is_iso_date(value: Any) -> bool:
+    """True if ``value`` starts with a YYYY-MM-DD date, as the SQLite ordinals require."""
+    text = str(value)[:10]
+    try:
+        return date.fromisoformat(text).isoformat() == text
+    except ValueError:
+        return False
+
 
 class ConvexStore:
     """Synchronous Convex database client."""
@@ -86,6 +114,21 @@ class ConvexStore:
         **kwargs
     ) -> List[Dict[str, Any]]:
         """Filter records with multiple criteria."""
+        results = self._call_query("psur:filter", self._filter_args(
+            writer, classification, status, within_days, overdue_only
+        )) or []
+        return [self._clean_record(r) for r in results]
+
+    @staticmethod
+    def _filter_args(
+        writer: Optional[str] = None,
+        classification: Optional[str] = None,
+        status: Optional[str] = None,
+        within_days: Optional[int] = None,
+        overdue_only: bool = False,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """psur:filter arguments for filter_records' keyword filters."""
         args = {}
         if writer:
             args["writer"] = writer
@@ -98,20 +141,136 @@ class ConvexStore:
         if within_days:
             cutoff = (date.today() + timedelta(days=within_days)).isoformat()
             args["dueBefore"] = cutoff
-        
-        results = self._call_query("psur:filter", args) or []
-        return [self._clean_record(r) for r in results]
+        return args
     
-    def get_all(self) -> List[Dict[str, Any]]:
+    def get_all(self, **kwargs) -> List[Dict[str, Any]]:
         """Get all records."""
         results = self._call_query("psur:getAll") or []
         return [self._clean_record(r) for r in results]
+
+    def records_due_between(self, start: Any, end: Any, **kwargs) -> List[Dict[str, Any]]:
+        """Reports due from start through end (inclusive), in due order."""
+        lo, hi = _required_date(start, "start"), _required_date(end, "end")
+        items = []
+        for record in self.get_all():
+            due = _parse_date(record.get("due_date"))
+            if due and lo <= due <= hi:
+                items.append((due, record.get("td_number") or "", record))
+        items.sort(key=lambda item: item[:2])
+        return [record for _, _, record in items]
+
+    def due_bucket_counts(self, start: Any, end: Any, bucket: str = "month", **kwargs) -> Dict[str, int]:
+        """Reports due per day/week/month/quarter/year between start and end,
+        labelled like the SQLite store's DUE_BUCKET_SQL."""
+        if bucket not in DUE_BUCKET_SQL:
+            raise ValueError(f"Unknown bucket: {bucket!r} (expected one of {', '.join(DUE_BUCKET_SQL)})")
+        counts: Dict[str, int] = {}
+        for record in self.records_due_between(start, end):
+            day = _parse_date(record["due_date"])
+            if bucket == "day":
+                label = day.isoformat()
+            elif bucket == "week":
+                label = (day - timedelta(days=day.weekday())).isoformat()
+            elif bucket == "month":
+                label = day.strftime("%Y-%m")
+            elif bucket == "quarter":
+                label = f"{day.year}-Q{(day.month + 2) // 3}"
+            else:
+                label = str(day.year)
+            counts[label] = counts.get(label, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def due_in_period(self, period: str, *, offset: int = 0, anchor: Any = None, **kwargs) -> Dict[str, Any]:
+        """Reports due in this/next/last week, month, quarter or year."""
+        day = _required_date(anchor, "anchor") if anchor else date.today()
+        start, end = period_bounds(period, day, int(offset))
+        items = self.records_due_between(start, end)
+        return {
+            "period": period,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "items": items,
+            "count": len(items),
+            "buckets": self.due_bucket_counts(start, end, PERIOD_BUCKETS[period]),
+        }
+
+    def get_schedule_for_years(
+        self,
+        first_year: int,
+        last_year: Optional[int] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """Reports due in first_year..last_year (inclusive)."""
+        last_year = first_year if last_year is None else last_year
+        return self.records_due_between(f"{int(first_year)}-01-01", f"{int(last_year)}-12-31")
+
+    def get_schedule_for_year(self, year: int, **kwargs) -> List[Dict[str, Any]]:
+        return self.get_schedule_for_years(year, year)
     
+    def page_records(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """One page of filtered records; the cursor is the next offset."""
+        if cursor:
+            try:
+                offset = int(cursor)
+            except ValueError as e:
+                raise ValueError(f"Invalid cursor: {cursor!r}") from e
+        filters = dict(filters or {})
+        if "class" in filters:
+            filters.setdefault("classification", filters.pop("class"))
+        items = self.filter_records(**filters) if filters else self.get_all()
+        limit = max(1, int(limit))
+        page = items[offset:offset + limit]
+        end = offset + len(page)
+        return {
+            "items": page,
+            "count": len(page),
+            "total": len(items),
+            "next_cursor": str(end) if end < len(items) else None,
+        }
+
     def find_missing_fields(self, fields: List[str]) -> List[Dict[str, Any]]:
         """Find records missing specified fields."""
         results = self._call_query("psur:findMissingFields", {"fields": fields}) or []
         return [self._clean_record(r) for r in results]
     
+    def data_health(self, sample_size: int = 5) -> Dict[str, Any]:
+        """Per-field completeness, unparseable dates and duplicate TD numbers,
+        computed client-side from getAll in the SQLite store's shape."""
+        records = sorted(self.get_all(), key=lambda r: str(r.get("td_number") or ""))
+        total = len(records)
+        td_counts: Dict[str, int] = {}
+        for record in records:
+            if record.get("td_number") is not None:
+                td_counts[record["td_number"]] = td_counts.get(record["td_number"], 0) + 1
+        health: Dict[str, Any] = {
+            "version": self.data_version(),
+            "total_records": total,
+            "complete_records": sum(
+                1 for r in records if all(str(r.get(field) or "").strip() for field in HEALTH_FIELDS)
+            ),
+            "fields": {},
+            "invalid_dates": {},
+            "duplicate_td_numbers": sorted(td for td, n in td_counts.items() if n > 1),
+        }
+        for field in HEALTH_FIELDS:
+            blank = [r.get("td_number") for r in records if not str(r.get(field) or "").strip()]
+            health["fields"][field] = {
+                "missing": len(blank),
+                "completeness": round(100.0 * (total - len(blank)) / total, 1) if total else 100.0,
+                "sample": blank[:sample_size],
+            }
+        for column in ORDINAL_COLUMNS:
+            bad = [r.get("td_number") for r in records if r.get(column) and not _is_iso_date(r[column])]
+            health["invalid_dates"][column] = {"count": len(bad), "sample": bad[:sample_size]}
+        return health
+
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
         return self._call_query("psur:getStats") or {}
@@ -127,6 +286,19 @@ class ConvexStore:
             return result.get("td_number", record.get("td_number", "UNKNOWN"))
         return record.get("td_number", "UNKNOWN")
     
+    def reserve_td_numbers(self, count: int = 1) -> List[str]:
+        """Reserve consecutive fresh TD numbers from the Convex counter."""
+        if count < 1:
+            return []
+        return self._call_mutation("psur:reserveTdNumbers", {"count": count}) or []
+
+    def add_records(self, records: List[Dict[str, Any]]) -> List[str]:
+        """Add several records, reserving missing TD numbers in one call."""
+        missing = [record for record in records if not record.get("td_number")]
+        for record, td_number in zip(missing, self.reserve_td_numbers(len(missing))):
+            record["td_number"] = td_number
+        return [self.add_record(record) for record in records]
+
     def update_record(self, td_number: str, updates: Dict[str, Any]) -> bool:
         """Update record by TD Number (first match)."""
         clean_updates = {k: v for k, v in updates.items() if not k.startswith('_')}
@@ -149,28 +321,69 @@ class ConvexStore:
         })
         return result if isinstance(result, int) else 0
     
-    def add_comment(self, td_number: str, comment: str) -> bool:
-        """Append timestamped comment to record."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        timestamped = f"[{timestamp}] {comment}"
-        result = self._call_mutation("psur:addComment", {
-            "tdNumber": td_number,
-            "comment": timestamped
-        })
+    def bulk_update(self, filter_criteria: Dict[str, Any], updates: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Apply updates to every record matching the filter; returns the updated records.
+
+        One psur:filter query finds the matching documents and one
+        psur:bulkUpdate mutation patches them all by document id.
+        """
+        assignments = {k: v for k, v in updates.items() if k not in PROTECTED_COLUMNS}
+        unknown = set(assignments) - set(INSERT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+        if not assignments:
+            return []
+        criteria = dict(filter_criteria or {})
+        if "class" in criteria and "classification" not in criteria:
+            criteria["classification"] = criteria.pop("class")
+        matches = self._call_query("psur:filter", self._filter_args(**criteria)) or []
+        if not matches:
+            return []
+        results = self._call_mutation("psur:bulkUpdate", {
+            "ids": [record["_id"] for record in matches],
+            "updates": assignments,
+        }) or []
+        return [self._clean_record(r) for r in results]
+    
+    def add_comment(self, td_number: str, comment: str, author: Optional[str] = None) -> bool:
+        """Append a comment to the record's comment log."""
+        args = {"tdNumber": td_number, "comment": comment}
+        if author:
+            args["author"] = author
+        result = self._call_mutation("psur:addComment", args)
         return bool(result)
+
+    def get_comments(self, td_number: str, limit: Optional[int] = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest-first comments on a record."""
+        args: Dict[str, Any] = {"tdNumber": td_number}
+        if limit is not None:
+            args["limit"] = limit
+        if kind:
+            args["kind"] = kind
+        return self._call_query("psur:getComments", args) or []
+
+    def attach_comments(self, records: List[Dict[str, Any]], limit: int = 3) -> List[Dict[str, Any]]:
+        """Add the newest comments to each record as ``recent_comments``."""
+        if limit > 0:
+            for record in records:
+                record["recent_comments"] = self.get_comments(record["td_number"], limit)
+        return records
     
     def link_references(
         self,
         td_number: str,
         mc_url: Optional[str] = None,
-        sp_url: Optional[str] = None
+        sp_url: Optional[str] = None,
+        author: Optional[str] = None,
     ) -> bool:
-        """Attach MC/SharePoint URLs to record."""
+        """Log MC/SharePoint URLs as a 'link' entry in the record's comment log."""
         args = {"tdNumber": td_number}
         if mc_url:
             args["mastercontrolUrl"] = mc_url
         if sp_url:
             args["sharepointUrl"] = sp_url
+        if author:
+            args["author"] = author
 
         result = self._call_mutation("psur:linkReferences", args)
         return bool(result)
@@ -194,11 +407,26 @@ class ConvexStore:
 
     # ========== EXPORT STUBS (TODO) ==========
     
-    def export_excel(self, records: Optional[List[Dict]] = None, filename: str = "export.xlsx") -> str:
+    def export_excel(
+        self,
+        records: Optional[List[Dict]] = None,
+        filename: str = "export.xlsx",
+        filters: Optional[Dict] = None,
+    ) -> str:
         """Export to Excel (stub)."""
         print("⚠️  Excel export not yet implemented for Convex")
         return filename
     
+    def iter_records(self, filters: Optional[Dict[str, Any]] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Yield filtered records (Convex returns them in one query)."""
+        return iter(self.page_records(filters, limit=1_000_000)["items"])
+
+    def iter_csv(self, filters: Optional[Dict[str, Any]] = None, *, compress: bool = False) -> Iterator[bytes]:
+        return csv_chunks(self.iter_records(filters), EXPORT_COLUMNS, compress=compress)
+
+    def iter_ndjson(self, filters: Optional[Dict[str, Any]] = None, *, compress: bool = False) -> Iterator[bytes]:
+        return ndjson_chunks(self.iter_records(filters), fieldnames=EXPORT_COLUMNS, compress=compress)
+
     def export_csv(self, filter_criteria: Dict = None, filename: str = "export.csv") -> str:
         """Export to CSV (stub)."""
         print("⚠️  CSV export not yet implemented for Convex")
@@ -214,11 +442,100 @@ class ConvexStore:
         print("⚠️  Calendar export not yet implemented for Convex")
         return filename
     
-    def import_from_excel(self, excel_path: Optional[str] = None) -> int:
-        """Import from Excel (stub)."""
-        print("⚠️  Excel import not yet implemented for Convex")
-        return 0
+    # ========== EXCEL IMPORT ==========
+
+    def _workbook_rows(self) -> List[Dict[str, Any]]:
+        """Workbook rows as Convex documents, read the same way as the SQLite import."""
+        frame = _workbook_frame()
+        return [
+            {column: value or "" for column, value in zip(INSERT_COLUMNS, row)}
+            for row in frame.itertuples(index=False, name=None)
+        ]
+
+    def _raw_records(self) -> List[Dict[str, Any]]:
+        """All documents with their _id, oldest first; raises if Convex is unreachable."""
+        results = self._call_query("psur:getAll")
+        if results is None:
+            raise RuntimeError("Could not read the current Convex records")
+        return sorted(results, key=lambda r: r.get("_creationTime", 0))
+
+    def _apply_sync(self, inserts: List[Dict], updates: List[Dict], deletes: List[str]) -> None:
+        """Send the change set to psur:applySync in SYNC_BATCH_SIZE slices."""
+        total = max(len(inserts), len(updates), len(deletes))
+        for start in range(0, total, SYNC_BATCH_SIZE):
+            end = start + SYNC_BATCH_SIZE
+            result = self._call_mutation("psur:applySync", {
+                "inserts": inserts[start:end],
+                "updates": updates[start:end],
+                "deletes": deletes[start:end],
+            })
+            if result is None:
+                raise RuntimeError(f"Convex sync failed after {start} of {total} changes")
+
+    def import_from_excel(self) -> int:
+        """Replace every Convex record with the workbook rows.
+
+        Runs in SYNC_BATCH_SIZE batches, so unlike the SQLite import it is
+        not atomic: a failed batch leaves a partial table (rerun to finish).
+        """
+        rows = self._workbook_rows()
+        existing = [record["_id"] for record in self._raw_records()]
+        self._apply_sync(rows, [], existing)
+        self.metadata["last_import"] = datetime.now().isoformat()
+        return len(rows)
+
+    def sync_from_excel(self) -> Dict[str, Any]:
+        """Incrementally apply the workbook: write only rows whose content changed.
+
+        Rows pair up on (td_number, n-th occurrence) as in the SQLite store
+        and are compared on the sheet-sourced columns. Returns the change set
+        as TD numbers per operation plus the unchanged count.
+        """
+        existing: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        seen: Dict[str, int] = {}
+        for record in self._raw_records():
+            td_number = record.get("td_number", "")
+            occurrence = seen.get(td_number, 0)
+            seen[td_number] = occurrence + 1
+            existing[(td_number, occurrence)] = record
+
+        changes: Dict[str, Any] = {"inserted": [], "updated": [], "deleted": [], "unchanged": 0}
+        inserts, updates = [], []
+        seen = {}
+        for row in self._workbook_rows():
+            td_number = row["td_number"]
+            occurrence = seen.get(td_number, 0)
+            seen[td_number] = occurrence + 1
+            current = existing.pop((td_number, occurrence), None)
+            if current is None:
+                inserts.append(row)
+                changes["inserted"].append(td_number)
+            elif any(str(current.get(column) or "") != row[column] for column in HASH_COLUMNS):
+                updates.append({"id": current["_id"], "fields": row})
+                changes["updated"].append(td_number)
+            else:
+                changes["unchanged"] += 1
+        deletes = []
+        for (td_number, _), record in existing.items():
+            deletes.append(record["_id"])
+            changes["deleted"].append(td_number)
+
+        self._apply_sync(inserts, updates, deletes)
+        self.metadata["last_import"] = datetime.now().isoformat()
+        return changes
     
+    def data_version(self) -> Optional[int]:
+        """Sequence number of the latest journalled change (None if Convex is unreachable)."""
+        return self._call_query("psur:dataVersion")
+
+    def changes_since(self, since: int, limit: int = 1000) -> Dict[str, Any]:
+        """Journal entries after ``since``, oldest first (see PSURDatabaseStore.changes_since)."""
+        result = self._call_query("psur:changesSince", {"since": int(since), "limit": int(limit)})
+        if result is None:
+            # Unreachable: ask the caller to refetch rather than report no changes
+            return {"since": since, "version": None, "reset": True, "changes": [], "has_more": False}
+        return result
+
     def close(self):
         """Close HTTP client."""
         self.client.close()
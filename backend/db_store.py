@@ -1,24 +1,71 @@
 """SQLite store for PSUR schedule data enforcing 30-day due dates."""
 from __future__ import annotations
 
-import csv
+import base64
 import json
+import os
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import pandas as pd
+from .export_utils import csv_chunks, ndjson_chunks
+from .excel_utils import EXACT_HEADERS, PSUR_SCHEDULE_PATH, canon_frame, read_excel_cached, write_records_xlsx
 
-from .excel_utils import PSUR_SCHEDULE_PATH, canon_record, read_excel_auto
+if TYPE_CHECKING:
+    import pandas as pd
 
 DB_PATH = Path(__file__).parent.parent / "data" / "psur_schedule.db"
+# Created on first export (see _export_path), not at import time.
 EXPORTS_DIR = DB_PATH.parent / "exports"
-EXPORTS_DIR.mkdir(exist_ok=True)
 
 DUE_OFFSET_DAYS = 30
 
+# Maintain per-status/class/writer row counts in psur_stat_counters via
+# triggers so get_stats does not have to aggregate the table.
+STATS_COUNTERS = os.getenv("PSUR_STATS_COUNTERS", "1") != "0"
+
+# Answer filter_records/get_stats/get_schedule_for_years/find_missing_fields
+# from an in-process NumPy snapshot (backend.snapshot) kept in step with the
+# change journal. Off by default; needs numpy.
+SNAPSHOT_ENABLED = os.getenv("PSUR_SNAPSHOT", "0") == "1"
+
+# Memory-mapped copy of the snapshot shared by every worker process (see
+# backend.snapshot.write_snapshot_file). Defaults to a file next to the
+# database; set to an empty string to keep the snapshot per-process.
+SNAPSHOT_FILE = os.getenv("PSUR_SNAPSHOT_FILE")
+
+# Journal entries beyond which the snapshot is rebuilt rather than patched.
+SNAPSHOT_PATCH_LIMIT = 500
+
+# Released/closed reports move to psur_reports_archive once their due date
+# (end of period if undated) is more than this many days past; see
+# archive_released. Imports and syncs only re-apply it when
+# PSUR_ARCHIVE_ON_IMPORT=1, so by default every row stays in get_all/stats.
+ARCHIVE_HORIZON_DAYS = int(os.getenv("PSUR_ARCHIVE_HORIZON_DAYS", "365"))
+ARCHIVE_ON_IMPORT = os.getenv("PSUR_ARCHIVE_ON_IMPORT", "0") == "1"
+
+# Import the workbook into an empty database on a background thread so the
+# store (and server) are usable immediately; see PSURDatabaseStore.ready.
+BACKGROUND_IMPORT = os.getenv("PSUR_BACKGROUND_IMPORT", "1") != "0"
+
+# Applied to every pooled connection. journal_mode=WAL is persistent in the
+# database file; the rest are per-connection and trade a little durability on
+# power loss (synchronous=NORMAL) for far fewer fsyncs per commit.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
 TABLE_SQL = """
     CREATE TABLE IF NOT EXISTS psur_reports (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -40,16 +87,628 @@ TABLE_SQL = """
         class TEXT,
         created_at TEXT DEFAULT CURRENT_TIMESTAMP,
         updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        version INTEGER DEFAULT 1
+        version INTEGER DEFAULT 1,
+        content_hash TEXT
     )
 """
 
+# Columns added after the original schema; created on existing databases by
+# _migrate_content_hash.
+ADDED_COLUMNS = (
+    ("content_hash", "TEXT"),
+)
+
 INDEX_SQL = (
     "CREATE INDEX IF NOT EXISTS idx_td_number ON psur_reports(td_number)",
     "CREATE INDEX IF NOT EXISTS idx_psur_number ON psur_reports(psur_number)",
-    "CREATE INDEX IF NOT EXISTS idx_writer ON psur_reports(writer)",
-    "CREATE INDEX IF NOT EXISTS idx_status ON psur_reports(status)",
     "CREATE INDEX IF NOT EXISTS idx_due_date ON psur_reports(due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_due_page ON psur_reports(COALESCE(NULLIF(due_date, ''), '~'), td_number)",
+)
+
+SETTINGS_SQL = """
+    CREATE TABLE IF NOT EXISTS psur_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+"""
+
+# due_date is derived from end_period at write time using only built-in SQL,
+# so any client (sqlite3 CLI, scripts, backups) can still write the table.
+# The offset lives in psur_settings so a changed DUE_OFFSET_DAYS can be
+# applied with one set-based recompute. Dates are stored as ISO text (see
+# DATE_COLUMNS); anything else derives a blank due date.
+_DUE_OFFSET_SQL = (
+    f"COALESCE((SELECT value FROM psur_settings WHERE key = 'due_offset_days'), {DUE_OFFSET_DAYS})"
+)
+
+
+def _due_sql(end_period: str, offset: str = _DUE_OFFSET_SQL) -> str:
+    """SQL for ``end_period`` plus ``offset`` days as ISO text ('' if undated)."""
+    return f"COALESCE(date({end_period}, printf('%+d days', {offset})), '')"
+
+
+_DUE_EXPR = _due_sql("NEW.end_period")
+
+TRIGGER_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_due_insert
+    AFTER INSERT ON psur_reports
+    WHEN NEW.due_date IS NOT {_DUE_EXPR}
+    BEGIN
+        UPDATE psur_reports SET due_date = {_DUE_EXPR} WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_due_update
+    AFTER UPDATE OF end_period, due_date ON psur_reports
+    WHEN NEW.due_date IS NOT {_DUE_EXPR}
+    BEGIN
+        UPDATE psur_reports SET due_date = {_DUE_EXPR} WHERE id = NEW.id;
+    END
+    """,
+)
+
+# The due triggers as migration 2 installed them, calling the app-registered
+# psur_due_date(). Kept verbatim for databases still migrating through
+# version 2; migration 13 replaces them with TRIGGER_SQL.
+_LEGACY_DUE_EXPR = (
+    "psur_due_date(NEW.end_period, "
+    "(SELECT value FROM psur_settings WHERE key = 'due_offset_days'))"
+)
+
+LEGACY_TRIGGER_SQL = tuple(
+    statement.replace(_DUE_EXPR, _LEGACY_DUE_EXPR) for statement in TRIGGER_SQL
+)
+
+INSERT_COLUMNS = (
+    "td_number",
+    "psur_number",
+    "type",
+    "product_name",
+    "catalog_number",
+    "writer",
+    "email",
+    "start_period",
+    "end_period",
+    "frequency",
+    "due_date",
+    "status",
+    "canada_needed",
+    "canada_status",
+    "comments",
+    "class",
+)
+
+INSERT_SQL = f"""
+    INSERT INTO psur_reports ({', '.join(INSERT_COLUMNS)})
+    VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})
+"""
+
+# Sheet-sourced columns that make up a row's content hash (due_date is derived).
+HASH_COLUMNS = tuple(column for column in INSERT_COLUMNS if column != "due_date")
+
+IMPORT_COLUMNS = INSERT_COLUMNS + ("content_hash",)
+
+IMPORT_SQL = f"""
+    INSERT INTO psur_reports ({', '.join(IMPORT_COLUMNS)})
+    VALUES ({', '.join('?' for _ in IMPORT_COLUMNS)})
+"""
+
+SYNC_UPDATE_SQL = f"""
+    UPDATE psur_reports
+    SET {', '.join(f'{column} = ?' for column in IMPORT_COLUMNS)},
+        updated_at = ?, version = version + 1
+    WHERE id = ?
+"""
+
+# content_hash describes the row as last imported from the workbook; any other
+# edit invalidates it so the next incremental import rewrites the row.
+HASH_TRIGGER_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_hash_invalidate
+    AFTER UPDATE OF {', '.join(HASH_COLUMNS)} ON psur_reports
+    WHEN NEW.content_hash IS NOT NULL AND NEW.content_hash IS OLD.content_hash
+    BEGIN
+        UPDATE psur_reports SET content_hash = NULL WHERE id = NEW.id;
+    END
+    """
+
+def _stat_key(column: str, default: str) -> str:
+    """SQL for the get_stats bucket of a column: stripped, blank -> default."""
+    return f"COALESCE(NULLIF(trim({column}, ' ' || char(9, 10, 13)), ''), '{default}')"
+
+
+# (dimension, column, label for blank values)
+STAT_DIMENSIONS = (
+    ("status", "status", "Unknown"),
+    ("class", "class", "Unknown"),
+    ("writer", "writer", "Unassigned"),
+)
+
+STAT_COUNTERS_SQL = """
+    CREATE TABLE IF NOT EXISTS psur_stat_counters (
+        dimension TEXT NOT NULL,
+        key TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (dimension, key)
+    ) WITHOUT ROWID
+"""
+
+
+def _counter_increment(ref: str) -> str:
+    return "\n".join(
+        f"""INSERT INTO psur_stat_counters (dimension, key, n)
+        VALUES ('{dimension}', {_stat_key(f"{ref}.{column}", default)}, 1)
+        ON CONFLICT (dimension, key) DO UPDATE SET n = n + 1;"""
+        for dimension, column, default in STAT_DIMENSIONS
+    )
+
+
+def _counter_decrement(ref: str) -> str:
+    return "\n".join(
+        f"""UPDATE psur_stat_counters SET n = n - 1
+        WHERE dimension = '{dimension}' AND key = {_stat_key(f"{ref}.{column}", default)};"""
+        for dimension, column, default in STAT_DIMENSIONS
+    )
+
+
+STAT_TRIGGER_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_stats_insert
+    AFTER INSERT ON psur_reports
+    BEGIN
+        {_counter_increment("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_stats_delete
+    AFTER DELETE ON psur_reports
+    BEGIN
+        {_counter_decrement("OLD")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_stats_update
+    AFTER UPDATE OF status, class, writer ON psur_reports
+    BEGIN
+        {_counter_decrement("OLD")}
+        {_counter_increment("NEW")}
+    END
+    """,
+)
+
+STAT_TRIGGER_NAMES = ("trg_psur_stats_insert", "trg_psur_stats_delete", "trg_psur_stats_update")
+
+FTS_COLUMNS = (
+    "td_number",
+    "psur_number",
+    "product_name",
+    "catalog_number",
+    "writer",
+    "class",
+    "status",
+)
+
+# bm25 weights, in FTS_COLUMNS order: identifiers outrank product text,
+# which outranks the people/status columns.
+FTS_WEIGHTS = (10.0, 10.0, 5.0, 5.0, 2.0, 1.0, 1.0)
+
+# External-content index: the FTS table stores only the inverted index and
+# reads column values back from psur_reports by rowid = id.
+FTS_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS psur_reports_fts USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        content='psur_reports',
+        content_rowid='id',
+        prefix='2 3'
+    )
+"""
+
+_FTS_NEW = ", ".join(f"NEW.{column}" for column in FTS_COLUMNS)
+_FTS_OLD = ", ".join(f"OLD.{column}" for column in FTS_COLUMNS)
+
+FTS_TRIGGER_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_fts_insert
+    AFTER INSERT ON psur_reports
+    BEGIN
+        INSERT INTO psur_reports_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (NEW.id, {_FTS_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_fts_delete
+    AFTER DELETE ON psur_reports
+    BEGIN
+        INSERT INTO psur_reports_fts (psur_reports_fts, rowid, {', '.join(FTS_COLUMNS)})
+        VALUES ('delete', OLD.id, {_FTS_OLD});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_fts_update
+    AFTER UPDATE OF {', '.join(FTS_COLUMNS)} ON psur_reports
+    BEGIN
+        INSERT INTO psur_reports_fts (psur_reports_fts, rowid, {', '.join(FTS_COLUMNS)})
+        VALUES ('delete', OLD.id, {_FTS_OLD});
+        INSERT INTO psur_reports_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (NEW.id, {_FTS_NEW});
+    END
+    """,
+)
+
+# Change journal: one row per insert/update/delete on psur_reports (plus
+# comment/link appends, see COMMENTS_SQL), numbered
+# by a global monotonic seq (AUTOINCREMENT never reuses values, even after
+# pruning). A 'reset' row with no row_id tells consumers to refetch.
+CHANGES_SQL = """
+    CREATE TABLE IF NOT EXISTS psur_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        row_id INTEGER,
+        td_number TEXT,
+        columns TEXT,
+        version INTEGER,
+        changed_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    )
+"""
+
+# Journal rows kept when the log is pruned: after imports, and by
+# trg_psur_changes_prune every CHANGES_PRUNE_EVERY entries in between.
+CHANGES_RETENTION = int(os.getenv("PSUR_CHANGES_RETENTION", "10000"))
+
+CHANGES_PRUNE_EVERY = 100
+
+# User-visible columns whose changes are journalled (bookkeeping columns are
+# bumped on every write and carry no information of their own).
+CHANGE_COLUMNS = INSERT_COLUMNS
+
+_CHANGED_COLUMNS_EXPR = "rtrim(" + " || ".join(
+    f"CASE WHEN OLD.{column} IS NOT NEW.{column} THEN '{column},' ELSE '' END"
+    for column in CHANGE_COLUMNS
+) + ", ',')"
+
+CHANGE_TRIGGER_SQL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_psur_changes_insert
+    AFTER INSERT ON psur_reports
+    BEGIN
+        INSERT INTO psur_changes (op, row_id, td_number, version)
+        VALUES ('insert', NEW.id, NEW.td_number, NEW.version);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_psur_changes_delete
+    AFTER DELETE ON psur_reports
+    BEGIN
+        INSERT INTO psur_changes (op, row_id, td_number, version)
+        VALUES ('delete', OLD.id, OLD.td_number, OLD.version);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_changes_update
+    AFTER UPDATE ON psur_reports
+    WHEN {_CHANGED_COLUMNS_EXPR} != ''
+    BEGIN
+        INSERT INTO psur_changes (op, row_id, td_number, columns, version)
+        VALUES ('update', NEW.id, NEW.td_number, {_CHANGED_COLUMNS_EXPR}, NEW.version);
+    END
+    """,
+)
+
+# Retention is read from psur_settings ('changes_retention', kept in step
+# with CHANGES_RETENTION by init_database) so it can change without DDL.
+CHANGES_PRUNE_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_changes_prune
+    AFTER INSERT ON psur_changes
+    WHEN NEW.seq % {CHANGES_PRUNE_EVERY} = 0
+    BEGIN
+        DELETE FROM psur_changes
+        WHERE seq <= NEW.seq - (SELECT CAST(value AS INTEGER) FROM psur_settings WHERE key = 'changes_retention');
+    END
+"""
+
+# Named counters allocated atomically inside write transactions.
+SEQUENCES_SQL = """
+    CREATE TABLE IF NOT EXISTS psur_sequences (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# Numeric part of a canonical TD number ("TD" followed only by digits).
+_TD_CANONICAL = "{ref} GLOB 'TD[0-9]*' AND substr({ref}, 3) NOT GLOB '*[^0-9]*'"
+
+# Keep the sequence at or above every canonical TD number inserted with an
+# explicit value (imports, clones, user-chosen numbers).
+SEQUENCE_TRIGGER_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_td_sequence
+    AFTER INSERT ON psur_reports
+    WHEN {_TD_CANONICAL.format(ref="NEW.td_number")}
+    BEGIN
+        UPDATE psur_sequences SET value = MAX(value, CAST(substr(NEW.td_number, 3) AS INTEGER))
+        WHERE name = 'td_number';
+    END
+"""
+
+# Append-only notes per report (kind 'comment' or 'link'). Kept out of
+# psur_reports so appends are one INSERT and list reads stay small; the
+# sheet-sourced comments column is left as imported.
+COMMENTS_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS psur_comments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_id INTEGER NOT NULL,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')),
+        author TEXT,
+        body TEXT NOT NULL,
+        kind TEXT NOT NULL DEFAULT 'comment' CHECK (kind IN ('comment', 'link'))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_comments_report ON psur_comments(report_id, id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_psur_comments_cascade
+    AFTER DELETE ON psur_reports
+    BEGIN
+        DELETE FROM psur_comments WHERE report_id = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_psur_changes_comment
+    AFTER INSERT ON psur_comments
+    BEGIN
+        INSERT INTO psur_changes (op, row_id, td_number, columns)
+        SELECT NEW.kind, id, td_number, 'comments' FROM psur_reports WHERE id = NEW.report_id;
+    END
+    """,
+)
+
+# Date columns are stored as canonical ISO text (normalized on write) plus a
+# virtual integer day ordinal (date.toordinal(), NULL when the text is not an
+# ISO date) that range filters and the due index use.
+DATE_COLUMNS = ("start_period", "end_period", "due_date")
+
+ORDINAL_COLUMNS = {
+    "start_period": "start_ord",
+    "end_period": "end_ord",
+    "due_date": "due_ord",
+}
+
+# julianday('0001-01-01') is 1721425.5 and date(1, 1, 1).toordinal() is 1.
+_ORDINAL_EXPR = (
+    "CASE WHEN date({column}) = substr({column}, 1, 10) "
+    "THEN CAST(julianday({column}) - 1721424.5 AS INTEGER) END"
+)
+
+# Normalized shadow columns for the case-insensitive filters: trimmed and
+# lowercased by triggers that keep them in step with writer/status/class.
+# Each leads a (key, due) index; filter_records resolves the matching keys
+# from it and then seeks, instead of scanning mixed-case free text.
+LOOKUP_KEY_COLUMNS = {
+    "writer": "writer_key",
+    "status": "status_key",
+    "class": "class_key",
+}
+
+_LOOKUP_KEY_SET = ", ".join(
+    f"{key} = lower(trim(NEW.{column}))" for column, key in LOOKUP_KEY_COLUMNS.items()
+)
+
+LOOKUP_KEY_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_lookup_keys_insert
+    AFTER INSERT ON psur_reports
+    BEGIN
+        UPDATE psur_reports SET {_LOOKUP_KEY_SET} WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_lookup_keys_update
+    AFTER UPDATE OF {', '.join(LOOKUP_KEY_COLUMNS)} ON psur_reports
+    WHEN {' OR '.join(f"NEW.{key} IS NOT lower(trim(NEW.{column}))" for column, key in LOOKUP_KEY_COLUMNS.items())}
+    BEGIN
+        UPDATE psur_reports SET {_LOOKUP_KEY_SET} WHERE id = NEW.id;
+    END
+    """,
+    *(
+        f"CREATE INDEX IF NOT EXISTS idx_{column}_due ON psur_reports({key}, due_ord, td_number)"
+        for column, key in LOOKUP_KEY_COLUMNS.items()
+    ),
+    # Superseded by the key indexes above.
+    "DROP INDEX IF EXISTS idx_writer",
+    "DROP INDEX IF EXISTS idx_status",
+)
+
+# Every suffix of every lookup key, so a substring filter becomes a prefix
+# range seek on the primary key ("pranavi" is a prefix of a suffix of
+# "venkata sd, pranavi"). The positions come from json_each over a run of
+# length(key) zeros. Keys that fall out of use leave rows behind; a full
+# import clears the table and refills it.
+_INSERT_SUFFIXES = """
+    INSERT OR IGNORE INTO psur_lookup_suffixes (column_name, suffix, key)
+    SELECT k.column_name, substr(k.key, p.key + 1), k.key
+    FROM ({keys}) AS k,
+         json_each('[' || rtrim(replace(hex(zeroblob(length(k.key))), '00', '0,'), ',') || ']') AS p
+    WHERE k.key <> ''
+"""
+
+LOOKUP_SUFFIX_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS psur_lookup_suffixes (
+        column_name TEXT NOT NULL,
+        suffix TEXT NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (column_name, suffix, key)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_lookup_suffixes
+    AFTER UPDATE OF {', '.join(LOOKUP_KEY_COLUMNS.values())} ON psur_reports
+    BEGIN
+        {_INSERT_SUFFIXES.format(keys=" UNION ALL ".join(
+            f"SELECT '{column}' AS column_name, NEW.{key} AS key" for column, key in LOOKUP_KEY_COLUMNS.items()
+        ))};
+    END
+    """,
+)
+
+# Backfills the suffixes of the keys already stored in both tiers.
+LOOKUP_SUFFIX_BACKFILL_SQL = _INSERT_SUFFIXES.format(keys=" UNION ".join(
+    f"SELECT '{column}' AS column_name, {key} AS key FROM {table}"
+    for table in ("psur_reports", "psur_reports_archive")
+    for column, key in LOOKUP_KEY_COLUMNS.items()
+))
+
+# The key triggers and aliases as migration 12 installed them: keys were
+# whitespace-folded, casefolded and alias-mapped by the app-registered
+# psur_lookup_key(). Kept verbatim for databases still migrating through
+# version 12; migration 15 replaces them with LOOKUP_KEY_SQL.
+LEGACY_LOOKUP_ALIASES: Dict[str, Dict[str, str]] = {
+    "writer": {},
+    "status": {
+        "inprogress": "in progress",
+        "in-progress": "in progress",
+    },
+    "class": {
+        "class i": "i",
+        "class is": "is",
+        "class iia": "iia",
+        "class iib": "iib",
+        "class iii": "iii",
+    },
+}
+
+_LEGACY_LOOKUP_KEY_SET = ", ".join(
+    f"{key} = psur_lookup_key('{column}', NEW.{column})" for column, key in LOOKUP_KEY_COLUMNS.items()
+)
+
+LEGACY_LOOKUP_KEY_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_lookup_keys_insert
+    AFTER INSERT ON psur_reports
+    BEGIN
+        UPDATE psur_reports SET {_LEGACY_LOOKUP_KEY_SET} WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_psur_lookup_keys_update
+    AFTER UPDATE OF {', '.join(LOOKUP_KEY_COLUMNS)} ON psur_reports
+    WHEN {' OR '.join(f"NEW.{key} IS NOT psur_lookup_key('{column}', NEW.{column})" for column, key in LOOKUP_KEY_COLUMNS.items())}
+    BEGIN
+        UPDATE psur_reports SET {_LEGACY_LOOKUP_KEY_SET} WHERE id = NEW.id;
+    END
+    """,
+    *LOOKUP_KEY_SQL[2:],
+)
+
+# Hot/cold tiering. Archived rows keep their id (so comments stay attached)
+# and store the ordinals and lookup keys the hot table derives, so the same
+# range and filter predicates work on both tables.
+ARCHIVED_STATUSES = ("released", "completed", "closed")
+
+ROW_COLUMNS = ("id",) + INSERT_COLUMNS + ("created_at", "updated_at", "version", "content_hash")
+
+ARCHIVE_COLUMNS = ROW_COLUMNS + tuple(ORDINAL_COLUMNS.values()) + tuple(LOOKUP_KEY_COLUMNS.values())
+
+# Storage-only columns (import hash, day ordinals, lookup keys, the paging
+# sort key): they back imports, range scans and filters but are left out of
+# the records the store returns.
+INTERNAL_COLUMNS = frozenset(
+    {"content_hash", "sort_key", *ORDINAL_COLUMNS.values(), *LOOKUP_KEY_COLUMNS.values()}
+)
+
+ARCHIVE_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS psur_reports_archive (
+        id INTEGER PRIMARY KEY,
+        td_number TEXT NOT NULL,
+        psur_number TEXT,
+        type TEXT,
+        product_name TEXT,
+        catalog_number TEXT,
+        writer TEXT,
+        email TEXT,
+        start_period TEXT,
+        end_period TEXT,
+        frequency TEXT,
+        due_date TEXT,
+        status TEXT,
+        canada_needed TEXT,
+        canada_status TEXT,
+        comments TEXT,
+        class TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        version INTEGER,
+        content_hash TEXT,
+        start_ord INTEGER,
+        end_ord INTEGER,
+        due_ord INTEGER,
+        archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_archive_td_number ON psur_reports_archive(td_number)",
+    "CREATE INDEX IF NOT EXISTS idx_archive_due_ord ON psur_reports_archive(due_ord)",
+    # Comments follow a row between tiers and only go when it leaves both.
+    "DROP TRIGGER IF EXISTS trg_psur_comments_cascade",
+    """
+    CREATE TRIGGER trg_psur_comments_cascade
+    AFTER DELETE ON psur_reports
+    WHEN NOT EXISTS (SELECT 1 FROM psur_reports_archive WHERE id = OLD.id)
+    BEGIN
+        DELETE FROM psur_comments WHERE report_id = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_psur_archive_comments_cascade
+    AFTER DELETE ON psur_reports_archive
+    WHEN NOT EXISTS (SELECT 1 FROM psur_reports WHERE id = OLD.id)
+    BEGIN
+        DELETE FROM psur_comments WHERE report_id = OLD.id;
+    END
+    """,
+)
+
+_ARCHIVE_WHERE = (
+    f"lower(trim(status)) IN ({', '.join('?' for _ in ARCHIVED_STATUSES)}) "
+    "AND COALESCE(due_ord, end_ord) < ?"
+)
+
+# Row ids for one TD number across both tiers (binds the TD number twice).
+_TIERED_IDS_SQL = (
+    "SELECT id, 0 AS archived FROM psur_reports WHERE td_number = ? "
+    "UNION ALL SELECT id, 1 FROM psur_reports_archive WHERE td_number = ?"
+)
+
+# Calendar bucket label for a due ordinal (ordinal + 1721424.5 is its
+# julianday), so bucket counts read only idx_due_ord. Weeks start on Monday;
+# date(1, 1, 1), ordinal 1, is a Monday.
+_DUE_JULIAN = "(due_ord + 1721424.5)"
+
+DUE_BUCKET_SQL = {
+    "day": f"date({_DUE_JULIAN})",
+    "week": "date(due_ord - (due_ord - 1) % 7 + 1721424.5)",
+    "month": f"strftime('%Y-%m', {_DUE_JULIAN})",
+    "quarter": (
+        f"strftime('%Y', {_DUE_JULIAN}) || '-Q' || "
+        f"((CAST(strftime('%m', {_DUE_JULIAN}) AS INTEGER) + 2) / 3)"
+    ),
+    "year": f"strftime('%Y', {_DUE_JULIAN})",
+}
+
+# Bucket size used by due_in_period for each period length.
+PERIOD_BUCKETS = {"week": "day", "month": "week", "quarter": "month", "year": "month"}
+
+# Data-quality checks. A field is blank when NULL or only whitespace, the
+# same test find_missing_fields has always applied with str.strip().
+HEALTH_FIELDS = tuple(column for column in INSERT_COLUMNS if column != "comments")
+
+_BLANK_SQL = "({column} IS NULL OR trim({column}, ' ' || char(9, 10, 13)) = '')"
+
+# Partial indexes holding only the rows with a blank value, so "rows missing
+# X" for the commonly chased fields reads just those rows.
+BLANK_INDEXED_COLUMNS = ("writer", "due_date", "class")
+
+BLANK_INDEX_SQL = tuple(
+    f"CREATE INDEX IF NOT EXISTS idx_blank_{column} ON psur_reports(td_number, id) "
+    f"WHERE {_BLANK_SQL.format(column=column)}"
+    for column in BLANK_INDEXED_COLUMNS
 )
 
 COLUMN_LIST = (
@@ -74,6 +733,177 @@ COLUMN_LIST = (
     "version",
 )
 
+# Fixed column order for file / streaming exports.
+EXPORT_COLUMNS = ("id",) + COLUMN_LIST
+
+# Sheet layout first (reimportable via read_excel_auto), then bookkeeping columns.
+EXCEL_EXPORT_COLUMNS = tuple(
+    "td_number" if key == "row_id" else key for key in EXACT_HEADERS
+) + ("id", "created_at", "updated_at", "version")
+
+# Rows pulled per fetchmany() when streaming.
+STREAM_BATCH_SIZE = 500
+
+# (PRAGMA user_version, PSURDatabaseStore method) in apply order. Append new
+# steps; never renumber or edit an applied one.
+MIGRATIONS = (
+    (1, "_migrate_base_schema"),
+    (2, "_migrate_due_triggers"),
+    (3, "_migrate_content_hash"),
+    (4, "_migrate_search_index"),
+    (5, "_migrate_stat_counters"),
+    (6, "_migrate_change_journal"),
+    (7, "_migrate_td_sequence"),
+    (8, "_migrate_comments"),
+    (9, "_migrate_date_ordinals"),
+    (10, "_migrate_archive"),
+    (11, "_migrate_blank_indexes"),
+    (12, "_migrate_lookup_keys"),
+    (13, "_migrate_sql_due_triggers"),
+    (14, "_migrate_change_pruning"),
+    (15, "_migrate_sql_lookup_keys"),
+    (16, "_migrate_lookup_suffixes"),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Never written through update_record / bulk_update; the storage columns are
+# derived by triggers.
+PROTECTED_COLUMNS = frozenset({"id", "created_at", "updated_at", "version", "td_number"}) | INTERNAL_COLUMNS
+
+# UPDATE ... RETURNING needs SQLite 3.35+.
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Due date as a sort key: ISO text, with undated rows ('~' sorts after digits)
+# last. Matches the idx_due_page expression index.
+DUE_SORT_KEY_SQL = "COALESCE(NULLIF(due_date, ''), '~')"
+
+# Canonical listing order; also the keyset for page_records.
+DUE_ORDER_SQL = f"{DUE_SORT_KEY_SQL}, td_number, id"
+
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _compile_filters(
+    *,
+    writer: Optional[str] = None,
+    classification: Optional[str] = None,
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    within_days: Optional[int] = None,
+    overdue_only: bool = False,
+    today: Optional[date] = None,
+) -> Tuple[str, List[Any]]:
+    """Compile ``filter_records`` criteria into a parameterized WHERE clause.
+
+    Text filters keep their case-insensitive substring semantics ("pranavi"
+    finds "Venkata SD, Pranavi"); needles are lowercased here, in Python.
+    Writer, status and class look the needle up as a prefix range in
+    ``psur_lookup_suffixes`` and then seek ``idx_<column>_due`` with the
+    keys found; the due window compares day ordinals so it can range-scan
+    ``idx_due_ord``. SQLite's lower() only folds ASCII, so the keys cannot
+    answer a non-ASCII needle: those compare psur_lower() of the raw text.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+
+    for column, needle in (("writer", writer), ("status", status), ("class", classification)):
+        if not needle:
+            continue
+        needle = needle.lower()
+        if needle.isascii() and needle == needle.strip(" "):
+            clauses.append(
+                f"{LOOKUP_KEY_COLUMNS[column]} IN (SELECT key FROM psur_lookup_suffixes"
+                " WHERE column_name = ? AND suffix >= ? AND suffix < ?)"
+            )
+            params.extend([column, needle, needle + "\U0010ffff"])
+        else:
+            # Keys are trimmed, so a needle with outer spaces checks the raw text too.
+            clauses.append(f"instr(psur_lower({column}), ?)")
+            params.append(needle)
+    if type:
+        if type.isascii():
+            clauses.append("type LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(type))
+        else:
+            clauses.append("instr(psur_lower(type), ?)")
+            params.append(type.lower())
+
+    today = (today or datetime.now().date()).toordinal()
+    if overdue_only:
+        clauses.append("due_ord < ?")
+        params.append(today)
+    if within_days is not None:
+        clauses.append("due_ord BETWEEN ? AND ?")
+        params.extend([today, today + int(within_days)])
+
+    return (" AND ".join(clauses) or "1"), params
+
+
+def _fts_match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query: every word group must match, the last
+    word of each group as a prefix ("hyad inj" finds "Hyadase Injectable")."""
+    phrases = []
+    for chunk in query.split():
+        tokens = re.findall(r"\w+", chunk)
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"*')
+    return " ".join(phrases)
+
+
+def _encode_cursor(row: sqlite3.Row) -> str:
+    key = json.dumps([row["sort_key"], row["td_number"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_key, td_number, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(sort_key), str(td_number), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _filter_kwargs(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Map a tool-style filter dict onto filter_records keyword arguments."""
+    filters = filters or {}
+    return {
+        "writer": filters.get("writer"),
+        "classification": filters.get("classification") or filters.get("class"),
+        "status": filters.get("status"),
+        "type": filters.get("type"),
+        "within_days": filters.get("within_days"),
+        "overdue_only": bool(filters.get("overdue_only", False)),
+    }
+
+
+def _assignments(values: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+    """SET clauses and parameters for writing ``values`` to psur_reports.
+
+    due_date is never taken from ``values``: when end_period (or due_date)
+    is written it is derived in the same statement, so the due triggers have
+    nothing to fix up and one edit makes one journal entry.
+    """
+    values = dict(values)
+    touches_due = "due_date" in values
+    values.pop("due_date", None)
+    clauses = [f"{column} = ?" for column in values]
+    params = list(values.values())
+    if "end_period" in values:
+        clauses.append(f"due_date = {_due_sql('?')}")
+        params.append(values["end_period"])
+    elif touches_due:
+        clauses.append(f"due_date = {_due_sql('end_period')}")
+    return clauses, params
+
+
+def _insert_params(record: Dict[str, Any]) -> tuple:
+    return tuple(record.get(column) for column in INSERT_COLUMNS)
+
 
 def _parse_date(value: Any) -> Optional[date]:
     if not value:
@@ -85,7 +915,7 @@ def _parse_date(value: Any) -> Optional[date]:
     text = str(value).strip()
     if not text:
         return None
-    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d"):
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d-%b-%Y"):
         try:
             return datetime.strptime(text, fmt).date()
         except ValueError:
@@ -96,6 +926,55 @@ def _parse_date(value: Any) -> Optional[date]:
         return None
 
 
+def _normalize_dates(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Rewrite any DATE_COLUMNS in ``values`` as ISO text ("" for blank).
+
+    Raises ValueError for a non-blank value that is not a recognizable date.
+    """
+    out = dict(values)
+    for column in DATE_COLUMNS:
+        if column not in out:
+            continue
+        value = out[column]
+        if value is None or (isinstance(value, str) and not value.strip()):
+            out[column] = ""
+            continue
+        parsed = _parse_date(value)
+        if parsed is None:
+            raise ValueError(f"Invalid {column}: {value!r} (expected a date such as 2025-03-31)")
+        out[column] = parsed.isoformat()
+    return out
+
+
+def _required_date(value: Any, name: str) -> date:
+    parsed = _parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid {name}: {value!r} (expected a date such as 2025-03-31)")
+    return parsed
+
+
+def period_bounds(period: str, anchor: date, offset: int = 0) -> Tuple[date, date]:
+    """First and last day of the week (Mon-Sun), month, quarter or year that
+    contains ``anchor``, moved ``offset`` periods forward (or back)."""
+    if period == "week":
+        start = anchor - timedelta(days=anchor.weekday()) + timedelta(weeks=offset)
+        return start, start + timedelta(days=6)
+    if period == "year":
+        return date(anchor.year + offset, 1, 1), date(anchor.year + offset, 12, 31)
+    months = {"month": 1, "quarter": 3}.get(period)
+    if months is None:
+        raise ValueError(f"Unknown period: {period!r} (expected week, month, quarter or year)")
+    index = (anchor.year * 12 + anchor.month - 1) // months * months + offset * months
+    start = date(index // 12, index % 12 + 1, 1)
+    index += months
+    return start, date(index // 12, index % 12 + 1, 1) - timedelta(days=1)
+
+
+def _sql_iso_date(value: Any) -> Any:
+    parsed = _parse_date(value)
+    return parsed.isoformat() if parsed else value
+
+
 def _format_date(value: Optional[date]) -> str:
     return value.isoformat() if isinstance(value, date) else ""
 
@@ -107,19 +986,168 @@ def _compute_due(end_period: Any, *, offset_days: int = DUE_OFFSET_DAYS) -> Opti
     return end + timedelta(days=offset_days)
 
 
+def _normalize_date_series(values: pd.Series) -> pd.Series:
+    """Workbook-side _normalize_dates for one column, parsing each distinct value once.
+
+    Recognizable dates become ISO text; anything else keeps its text (and a
+    NULL ordinal, reported by data_health) instead of failing the import.
+    """
+    mapping = {value: _sql_iso_date(value) for value in values.unique()}
+    return values.map(mapping)
+
+
+def _compute_due_series(end_periods: pd.Series, *, offset_days: int = DUE_OFFSET_DAYS) -> pd.Series:
+    """Vectorized _compute_due over ISO date or datetime strings ("" when unparseable)."""
+    import pandas as pd
+
+    end = pd.to_datetime(end_periods, format="ISO8601", errors="coerce")
+    return (end + pd.Timedelta(days=offset_days)).dt.strftime("%Y-%m-%d").fillna("")
+
+
+def _content_hashes(frame: pd.DataFrame) -> List[str]:
+    """Stable per-row hash of the sheet-sourced columns."""
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(frame[list(HASH_COLUMNS)].fillna(""), index=False)
+    return [f"{value:016x}" for value in hashes]
+
+
+def _workbook_frame(lap: Callable[[str], None] = lambda stage: None) -> pd.DataFrame:
+    """Load the workbook as canonical rows in IMPORT_COLUMNS order."""
+    df, colmap = read_excel_cached(PSUR_SCHEDULE_PATH)
+    lap("read")
+    frame = canon_frame(df, colmap)
+    for column in DATE_COLUMNS:
+        if column in frame:
+            frame[column] = _normalize_date_series(frame[column])
+    lap("canonicalize")
+    if "end_period" in frame:
+        frame["due_date"] = _compute_due_series(frame["end_period"])
+    else:
+        frame["due_date"] = ""
+    lap("derive_due")
+    frame = frame.reindex(columns=INSERT_COLUMNS).astype(object)
+    frame = frame.where(frame.notna(), None)
+    frame["content_hash"] = _content_hashes(frame)
+    lap("prepare")
+    return frame
+
+
+def _export_path(filename: str) -> Path:
+    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    return EXPORTS_DIR / filename
+
+
+def _sql_due_date(end_period: Any, offset_days: Any) -> str:
+    offset = DUE_OFFSET_DAYS if offset_days is None else int(offset_days)
+    return _format_date(_compute_due(end_period, offset_days=offset))
+
+
+def _legacy_lookup_key(column: str, value: Any) -> str:
+    """Lookup key as migration 12 computed it (see LEGACY_LOOKUP_KEY_SQL)."""
+    key = " ".join(str(value or "").split()).casefold()
+    return LEGACY_LOOKUP_ALIASES.get(column, {}).get(key, key)
+
+
+def _sql_lower(value: Any) -> Optional[str]:
+    return None if value is None else str(value).lower()
+
+
+def _register_functions(conn: sqlite3.Connection) -> None:
+    # Only the migrations need these: psur_due_date and psur_lookup_key back
+    # the triggers of databases still below migrations 13 and 15 while they
+    # migrate; psur_iso_date is used by migration 9.
+    conn.create_function("psur_due_date", 2, _sql_due_date, deterministic=True)
+    conn.create_function("psur_lookup_key", 2, _legacy_lookup_key, deterministic=True)
+    conn.create_function("psur_iso_date", 1, _sql_iso_date, deterministic=True)
+    # Unicode-aware lower() for the non-ASCII filter fallback; queries only,
+    # never the schema, so plain sqlite3 clients can still write.
+    conn.create_function("psur_lower", 1, _sql_lower, deterministic=True)
+
+
 @dataclass
 class ScheduleRecord:
     data: Dict[str, Any]
 
-    def ensure_due(self) -> "ScheduleRecord":
-        due = _compute_due(self.data.get("end_period"))
-        self.data["due_date"] = _format_date(due)
-        return self
-
     def to_dict(self) -> Dict[str, Any]:
         return dict(self.data)
 
 
+class ConnectionPool:
+    """Thread-local pool of long-lived SQLite connections.
+
+    Each thread gets one connection, opened on first use in WAL mode with
+    :data:`CONNECTION_PRAGMAS` applied, and keeps it for the life of the pool.
+    Connections run in autocommit mode; :meth:`transaction` opens an explicit
+    transaction and is re-entrant, so nested units of work join the outermost
+    one instead of committing on their own.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        _register_functions(conn)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self, *, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        depth = self._local.depth
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0 and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth = depth
+        if depth == 0:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def dedicated(self) -> Iterator[sqlite3.Connection]:
+        """A connection outside the pool, rolled back and closed on exit.
+
+        For long-lived streams: unlike :meth:`connection` it is not tied to
+        the calling thread, so a generator holding it can resume anywhere.
+        """
+        conn = self._open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
 class PSURDatabaseStore:
     """SQLite database store - single source of truth"""
 
@@ -130,171 +1158,650 @@ class PSURDatabaseStore:
             "source": str(PSUR_SCHEDULE_PATH),
             "due_offset_days": DUE_OFFSET_DAYS,
         }
+        self.ready = threading.Event()
+        self.metadata["ready"] = False
+        self._importer: Optional[threading.Thread] = None
+        self._pool = ConnectionPool(self.db_path)
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: Optional[Any] = None
+        self._health: Optional[Tuple[int, int, Dict[str, Any]]] = None
+        self.snapshot_enabled = SNAPSHOT_ENABLED and self._snapshot_available()
+        self.archive_on_import = ARCHIVE_ON_IMPORT
+        if SNAPSHOT_FILE is None:
+            self.snapshot_file: Optional[Path] = self.db_path.with_suffix(".snapshot")
+        else:
+            self.snapshot_file = Path(SNAPSHOT_FILE) if SNAPSHOT_FILE else None
         self.init_database()
 
     # ------------------------------------------------------------------
     # Database primitives
     # ------------------------------------------------------------------
     def get_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Return this thread's pooled connection (do not close it)."""
+        return self._pool.connection()
+
+    @contextmanager
+    def unit_of_work(self, *, write: bool = True) -> Iterator[sqlite3.Cursor]:
+        """Run a group of statements on one connection inside one transaction.
+
+        Store methods open their own unit of work, so wrapping several calls in
+        an outer ``with store.unit_of_work():`` makes them share a single
+        connection and commit (one fsync) at the end. While the background
+        initial import runs, writes from other threads wait for it: the
+        import only fills an empty table, so an early write would cancel it.
+        """
+        importer = self._importer
+        if write and importer is not None and importer is not threading.current_thread():
+            self.ready.wait()
+        with self._pool.transaction(immediate=write) as conn:
+            yield conn.cursor()
+
+    def _query(self, query: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        return self.get_connection().execute(query, tuple(params)).fetchall()
+
+    def close(self) -> None:
+        self._pool.close_all()
 
     def init_database(self) -> None:
-        conn = self.get_connection()
-        cur = conn.cursor()
+        """Migrate the schema, apply runtime settings and make sure data exists.
+
+        On an up-to-date database this is a handful of reads: no DDL runs and
+        the first workbook import (empty table only) happens in the background.
+        """
+        self._table_rebuilt = False
+        self._run_migrations()
+        self.fts_enabled = bool(
+            self._query("SELECT 1 FROM sqlite_master WHERE type='table' AND name='psur_reports_fts'")
+        )
+        self._ensure_stat_counters(STATS_COUNTERS, rebuild=self._table_rebuilt)
+        if self._stored_due_offset() != DUE_OFFSET_DAYS:
+            self.recompute_due_dates(DUE_OFFSET_DAYS)
+        if self._get_setting("changes_retention") != str(CHANGES_RETENTION):
+            self._set_setting("changes_retention", CHANGES_RETENTION)
+        self._ensure_data()
+
+    # ------------------------------------------------------------------
+    # Schema migrations
+    # ------------------------------------------------------------------
+    def _run_migrations(self) -> None:
+        """Apply MIGRATIONS above the database's PRAGMA user_version, in order.
+
+        Each step runs in its own write transaction together with the
+        user_version bump, so a crash leaves the schema at a known version.
+        Databases created before versioning start at 0; every step is written
+        to be a no-op on objects that already exist.
+        """
+        if self._query("PRAGMA user_version")[0][0] >= SCHEMA_VERSION:
+            return
+        for version, method in MIGRATIONS:
+            with self.unit_of_work() as cur:
+                # Re-read under the write lock in case another process migrated.
+                if cur.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                getattr(self, method)(cur)
+                cur.execute(f"PRAGMA user_version = {version}")
+            print(f"🗄️  Schema migrated to version {version} ({method})")
+
+    def _migrate_base_schema(self, cur: sqlite3.Cursor) -> None:
+        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='psur_reports'")
+        row = cur.fetchone()
+        if row and "td_number TEXT UNIQUE" in row["sql"]:
+            self._rebuild_without_unique_td(cur)
         cur.execute(TABLE_SQL)
         for statement in INDEX_SQL:
             cur.execute(statement)
-        conn.commit()
-        conn.close()
+        cur.execute(SETTINGS_SQL)
 
-        self._ensure_td_duplicates_supported()
+    def _rebuild_without_unique_td(self, cur: sqlite3.Cursor) -> None:
+        """Copy a legacy table (UNIQUE td_number) into one allowing duplicates."""
+        columns = ", ".join(COLUMN_LIST)
+        cur.execute(
+            """
+            CREATE TABLE psur_reports_migrated (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                td_number TEXT NOT NULL,
+                psur_number TEXT,
+                type TEXT,
+                product_name TEXT,
+                catalog_number TEXT,
+                writer TEXT,
+                email TEXT,
+                start_period TEXT,
+                end_period TEXT,
+                frequency TEXT,
+                due_date TEXT,
+                status TEXT,
+                canada_needed TEXT,
+                canada_status TEXT,
+                comments TEXT,
+                class TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                version INTEGER DEFAULT 1
+            )
+            """
+        )
+        cur.execute(f"INSERT INTO psur_reports_migrated ({columns}) SELECT {columns} FROM psur_reports")
+        cur.execute("DROP TABLE psur_reports")
+        cur.execute("ALTER TABLE psur_reports_migrated RENAME TO psur_reports")
+        self._table_rebuilt = True
 
-        if self.count_records() == 0:
-            self.import_from_excel()
+    def _migrate_due_triggers(self, cur: sqlite3.Cursor) -> None:
+        for statement in LEGACY_TRIGGER_SQL:
+            cur.execute(statement)
 
-    def _ensure_td_duplicates_supported(self) -> None:
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='psur_reports'")
-        row = cur.fetchone()
-        table_sql = row["sql"] if row else None
-        if table_sql and "td_number TEXT UNIQUE" in table_sql:
-            conn.executescript(
-                """
-                BEGIN TRANSACTION;
-                CREATE TABLE psur_reports_migrated (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    td_number TEXT NOT NULL,
-                    psur_number TEXT,
-                    type TEXT,
-                    product_name TEXT,
-                    catalog_number TEXT,
-                    writer TEXT,
-                    email TEXT,
-                    start_period TEXT,
-                    end_period TEXT,
-                    frequency TEXT,
-                    due_date TEXT,
-                    status TEXT,
-                    canada_needed TEXT,
-                    canada_status TEXT,
-                    comments TEXT,
-                    class TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    version INTEGER DEFAULT 1
-                );
-                INSERT INTO psur_reports_migrated (
-                    td_number,
-                    psur_number,
-                    type,
-                    product_name,
-                    catalog_number,
-                    writer,
-                    email,
-                    start_period,
-                    end_period,
-                    frequency,
-                    due_date,
-                    status,
-                    canada_needed,
-                    canada_status,
-                    comments,
-                    class,
-                    created_at,
-                    updated_at,
-                    version
+    def _migrate_content_hash(self, cur: sqlite3.Cursor) -> None:
+        existing = {row["name"] for row in cur.execute("PRAGMA table_info(psur_reports)")}
+        for column, decl in ADDED_COLUMNS:
+            if column not in existing:
+                cur.execute(f"ALTER TABLE psur_reports ADD COLUMN {column} {decl}")
+        cur.execute(HASH_TRIGGER_SQL)
+
+    def _migrate_search_index(self, cur: sqlite3.Cursor) -> None:
+        """FTS5 index plus sync triggers; skipped when SQLite lacks FTS5 (LIKE fallback)."""
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='psur_reports_fts'")
+        exists = cur.fetchone() is not None
+        try:
+            cur.execute(FTS_TABLE_SQL)
+        except sqlite3.OperationalError:
+            return
+        for statement in FTS_TRIGGER_SQL:
+            cur.execute(statement)
+        if self._table_rebuilt or not exists:
+            cur.execute("INSERT INTO psur_reports_fts (psur_reports_fts) VALUES ('rebuild')")
+
+    def _migrate_stat_counters(self, cur: sqlite3.Cursor) -> None:
+        # Triggers are installed by _ensure_stat_counters (PSUR_STATS_COUNTERS).
+        cur.execute(STAT_COUNTERS_SQL)
+
+    def _migrate_change_journal(self, cur: sqlite3.Cursor) -> None:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='psur_changes'")
+        exists = cur.fetchone() is not None
+        cur.execute(CHANGES_SQL)
+        for statement in CHANGE_TRIGGER_SQL:
+            cur.execute(statement)
+        if self._table_rebuilt or not exists:
+            # Rows predating the journal (or with reassigned ids) were never
+            # journalled; consumers must start from a full fetch.
+            cur.execute("INSERT INTO psur_changes (op) VALUES ('reset')")
+
+    def _migrate_td_sequence(self, cur: sqlite3.Cursor) -> None:
+        cur.execute(SEQUENCES_SQL)
+        cur.execute(
+            f"""
+            INSERT OR IGNORE INTO psur_sequences (name, value)
+            SELECT 'td_number', COALESCE(MAX(CAST(substr(td_number, 3) AS INTEGER)), 0)
+            FROM psur_reports WHERE {_TD_CANONICAL.format(ref="td_number")}
+            """
+        )
+        cur.execute(SEQUENCE_TRIGGER_SQL)
+
+    def _migrate_comments(self, cur: sqlite3.Cursor) -> None:
+        for statement in COMMENTS_SQL:
+            cur.execute(statement)
+
+    def _migrate_date_ordinals(self, cur: sqlite3.Cursor) -> None:
+        # Canonicalize parseable legacy values; anything else keeps its text
+        # and a NULL ordinal (see data_health).
+        for column in DATE_COLUMNS:
+            cur.execute(
+                f"UPDATE psur_reports SET {column} = psur_iso_date({column}) "
+                f"WHERE {column} IS NOT psur_iso_date({column})"
+            )
+        existing = {row["name"] for row in cur.execute("PRAGMA table_xinfo(psur_reports)")}
+        for column, ordinal in ORDINAL_COLUMNS.items():
+            if ordinal not in existing:
+                cur.execute(
+                    f"ALTER TABLE psur_reports ADD COLUMN {ordinal} INTEGER "
+                    f"GENERATED ALWAYS AS ({_ORDINAL_EXPR.format(column=column)}) VIRTUAL"
                 )
-                SELECT
-                    td_number,
-                    psur_number,
-                    type,
-                    product_name,
-                    catalog_number,
-                    writer,
-                    email,
-                    start_period,
-                    end_period,
-                    frequency,
-                    due_date,
-                    status,
-                    canada_needed,
-                    canada_status,
-                    comments,
-                    class,
-                    created_at,
-                    updated_at,
-                    version
-                FROM psur_reports;
-                DROP TABLE psur_reports;
-                ALTER TABLE psur_reports_migrated RENAME TO psur_reports;
-                COMMIT;
-                """
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{ordinal} ON psur_reports({ordinal})")
+
+    def _migrate_archive(self, cur: sqlite3.Cursor) -> None:
+        for statement in ARCHIVE_SQL:
+            cur.execute(statement)
+
+    def _migrate_blank_indexes(self, cur: sqlite3.Cursor) -> None:
+        for statement in BLANK_INDEX_SQL:
+            cur.execute(statement)
+
+    def _migrate_sql_due_triggers(self, cur: sqlite3.Cursor) -> None:
+        # Earlier due triggers called psur_due_date(), which only this app
+        # registers; other clients could not write the table.
+        cur.execute("DROP TRIGGER IF EXISTS trg_psur_due_insert")
+        cur.execute("DROP TRIGGER IF EXISTS trg_psur_due_update")
+        for statement in TRIGGER_SQL:
+            cur.execute(statement)
+
+    def _migrate_change_pruning(self, cur: sqlite3.Cursor) -> None:
+        cur.execute(CHANGES_PRUNE_SQL)
+
+    def _migrate_lookup_keys(self, cur: sqlite3.Cursor) -> None:
+        for table in ("psur_reports", "psur_reports_archive"):
+            existing = {row["name"] for row in cur.execute(f"PRAGMA table_info({table})")}
+            for key in LOOKUP_KEY_COLUMNS.values():
+                if key not in existing:
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN {key} TEXT")
+        for statement in LEGACY_LOOKUP_KEY_SQL:
+            cur.execute(statement)
+        for table in ("psur_reports", "psur_reports_archive"):
+            assignments = ", ".join(
+                f"{key} = psur_lookup_key('{column}', {column})" for column, key in LOOKUP_KEY_COLUMNS.items()
             )
-            for statement in INDEX_SQL:
+            cur.execute(f"UPDATE {table} SET {assignments}")
+        self._set_setting("lookup_aliases", json.dumps(LEGACY_LOOKUP_ALIASES, sort_keys=True))
+
+    def _migrate_sql_lookup_keys(self, cur: sqlite3.Cursor) -> None:
+        # Earlier key triggers called psur_lookup_key(), which only this app
+        # registered, and folded aliases the substring filters never used.
+        cur.execute("DROP TRIGGER IF EXISTS trg_psur_lookup_keys_insert")
+        cur.execute("DROP TRIGGER IF EXISTS trg_psur_lookup_keys_update")
+        for statement in LOOKUP_KEY_SQL:
+            cur.execute(statement)
+        self._rekey_lookup_columns(cur)
+        cur.execute("DELETE FROM psur_settings WHERE key = 'lookup_aliases'")
+
+    def _migrate_lookup_suffixes(self, cur: sqlite3.Cursor) -> None:
+        for statement in LOOKUP_SUFFIX_SQL:
+            cur.execute(statement)
+        cur.execute(LOOKUP_SUFFIX_BACKFILL_SQL)
+
+    def _rekey_lookup_columns(self, cur: sqlite3.Cursor) -> None:
+        for table in ("psur_reports", "psur_reports_archive"):
+            assignments = ", ".join(
+                f"{key} = lower(trim({column}))" for column, key in LOOKUP_KEY_COLUMNS.items()
+            )
+            cur.execute(f"UPDATE {table} SET {assignments}")
+
+    def _ensure_stat_counters(self, enabled: bool, *, rebuild: bool = False) -> None:
+        """Install or remove the stats counter triggers.
+
+        Counters are rebuilt from the table whenever they are (re-)enabled,
+        since writes made while they were off were not counted.
+        """
+        was_enabled = self._get_setting("stat_counters") == "1"
+        if enabled == was_enabled and not rebuild:
+            return
+        with self.unit_of_work() as cur:
+            if not enabled:
+                for name in STAT_TRIGGER_NAMES:
+                    cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+                self._set_setting("stat_counters", "0")
+                return
+            for statement in STAT_TRIGGER_SQL:
                 cur.execute(statement)
-            conn.commit()
-        conn.close()
+            cur.execute("DELETE FROM psur_stat_counters")
+            for dimension, column, default in STAT_DIMENSIONS:
+                cur.execute(
+                    f"""
+                    INSERT INTO psur_stat_counters (dimension, key, n)
+                    SELECT '{dimension}', {_stat_key(column, default)} AS key, COUNT(*)
+                    FROM psur_reports GROUP BY key
+                    """
+                )
+            self._set_setting("stat_counters", "1")
+
+    # ------------------------------------------------------------------
+    # First import
+    # ------------------------------------------------------------------
+    def _ensure_data(self) -> None:
+        """Import the workbook into an empty table, in the background by default."""
+        if self._query("SELECT EXISTS (SELECT 1 FROM psur_reports)")[0][0]:
+            self._mark_ready()
+            return
+        if self.snapshot_file is not None:
+            # Left over from an earlier database; its versions mean nothing here.
+            self.snapshot_file.unlink(missing_ok=True)
+        if not BACKGROUND_IMPORT:
+            self._initial_import()
+            return
+        self._importer = threading.Thread(target=self._initial_import, name="psur-initial-import", daemon=True)
+        self._importer.start()
+
+    def _initial_import(self) -> None:
+        try:
+            self.import_from_excel(if_empty=True)
+        except Exception as e:
+            print(f"⚠️  Initial Excel import failed: {e}")
+            self.metadata["import_error"] = str(e)
+        finally:
+            self._mark_ready()
+
+    def _mark_ready(self) -> None:
+        self.metadata["ready"] = True
+        self.ready.set()
+        self._importer = None
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first import (if any) has finished."""
+        return self.ready.wait(timeout)
 
     def _execute(self, query: str, params: Iterable[Any]) -> int:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute(query, tuple(params))
-        affected = cur.rowcount
-        conn.commit()
-        conn.close()
-        return affected
+        with self.unit_of_work() as cur:
+            cur.execute(query, tuple(params))
+            return cur.rowcount
 
     # ------------------------------------------------------------------
     # Import/export helpers
     # ------------------------------------------------------------------
-    def import_from_excel(self) -> int:
-        df, colmap = read_excel_auto(PSUR_SCHEDULE_PATH)
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM psur_reports")
-
-        inserted = 0
-        for _, row in df.iterrows():
-            record = canon_record(row, colmap)
-            due = _compute_due(record.get("end_period"))
-            record["due_date"] = _format_date(due)
-            cur.execute(
+    def _import_timer(self) -> Tuple[Dict[str, float], Callable[[str], None]]:
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        def lap(stage: str) -> None:
+            nonlocal started
+            now = time.perf_counter()
+            timings[stage] = round((now - started) * 1000, 2)
+            started = now
+
+        return timings, lap
+
+    def import_from_excel(self, *, if_empty: bool = False) -> int:
+        """Replace the table with the workbook contents.
+
+        The sheet is canonicalized column-wise and due dates are derived as a
+        vector before the write transaction starts, so the write lock is only
+        held for the DELETE and one executemany. Per-stage timings (ms) are
+        recorded in ``metadata["last_import_timings"]``. With ``if_empty`` the
+        import is skipped (returning 0) if the table gained rows meanwhile.
+        """
+        timings, lap = self._import_timer()
+        frame = _workbook_frame(lap)
+        rows = list(frame.itertuples(index=False, name=None))
+
+        with self.unit_of_work() as cur:
+            if if_empty and cur.execute("SELECT EXISTS (SELECT 1 FROM psur_reports)").fetchone()[0]:
+                return 0
+            before = self.data_version()
+            cur.execute("DELETE FROM psur_reports")
+            # The workbook carries past cycles too; re-tier them from scratch.
+            cur.execute("DELETE FROM psur_reports_archive")
+            cur.execute("DELETE FROM psur_lookup_suffixes")
+            cur.executemany(IMPORT_SQL, rows)
+            if self.archive_on_import:
+                self._archive_rows(cur, max(ARCHIVE_HORIZON_DAYS, 0))
+            # A full replace is journalled as one reset, not 2N row events.
+            cur.execute("DELETE FROM psur_changes WHERE seq > ?", (before,))
+            cur.execute("INSERT INTO psur_changes (op) VALUES ('reset')")
+            self._prune_changes()
+        lap("write")
+
+        self.metadata["last_import"] = datetime.now().isoformat()
+        self.metadata["last_import_timings"] = timings
+        return len(rows)
+
+    def sync_from_excel(self) -> Dict[str, Any]:
+        """Incrementally apply the workbook: write only rows whose content changed.
+
+        Rows are matched on (td_number, n-th occurrence) so duplicate TD
+        numbers pair up in order, and compared by content hash. Unchanged rows
+        keep their id, created_at and version. Returns the change set as TD
+        numbers per operation plus the unchanged count. Archived rows are
+        matched too: unchanged ones stay archived, changed ones are restored
+        to the hot table before being updated.
+        """
+        timings, lap = self._import_timer()
+        frame = _workbook_frame(lap)
+        incoming: Dict[Tuple[Any, int], tuple] = {}
+        seen: Dict[Any, int] = {}
+        for row in frame.itertuples(index=False, name=None):
+            td_number = row[0]
+            occurrence = seen.get(td_number, 0)
+            seen[td_number] = occurrence + 1
+            incoming[(td_number, occurrence)] = row
+
+        changes: Dict[str, Any] = {"inserted": [], "updated": [], "deleted": [], "unchanged": 0}
+        with self.unit_of_work() as cur:
+            existing: Dict[Tuple[Any, int], Tuple[int, Optional[str], int]] = {}
+            seen = {}
+            for row in cur.execute(
                 """
-                INSERT INTO psur_reports (
-                    td_number, psur_number, type, product_name, catalog_number,
-                    writer, email, start_period, end_period, frequency,
-                    due_date, status, canada_needed, canada_status, comments, class
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    record.get("td_number"),
-                    record.get("psur_number"),
-                    record.get("type"),
-                    record.get("product_name"),
-                    record.get("catalog_number"),
-                    record.get("writer"),
-                    record.get("email"),
-                    record.get("start_period"),
-                    record.get("end_period"),
-                    record.get("frequency"),
-                    record.get("due_date"),
-                    record.get("status"),
-                    record.get("canada_needed"),
-                    record.get("canada_status"),
-                    record.get("comments"),
-                    record.get("class"),
-                ),
-            )
-            inserted += 1
+                SELECT id, td_number, content_hash, 0 AS archived FROM psur_reports
+                UNION ALL
+                SELECT id, td_number, content_hash, 1 FROM psur_reports_archive
+                ORDER BY id
+                """
+            ):
+                occurrence = seen.get(row["td_number"], 0)
+                seen[row["td_number"]] = occurrence + 1
+                existing[(row["td_number"], occurrence)] = (row["id"], row["content_hash"], row["archived"])
+            lap("diff_read")
+
+            now = datetime.now().isoformat()
+            inserts, updates, restores = [], [], []
+            deletes: Dict[int, List[Tuple[int]]] = {0: [], 1: []}
+            for key, row in incoming.items():
+                current = existing.pop(key, None)
+                if current is None:
+                    inserts.append(row)
+                    changes["inserted"].append(key[0])
+                elif current[1] != row[-1]:
+                    if current[2]:
+                        restores.append(current[0])
+                    updates.append(row + (now, current[0]))
+                    changes["updated"].append(key[0])
+                else:
+                    changes["unchanged"] += 1
+            for key, (row_id, _, archived) in existing.items():
+                deletes[archived].append((row_id,))
+                changes["deleted"].append(key[0])
+
+            cur.executemany("DELETE FROM psur_reports WHERE id = ?", deletes[0])
+            cur.executemany("DELETE FROM psur_reports_archive WHERE id = ?", deletes[1])
+            if restores:
+                self._restore_rows(cur, "id IN (SELECT value FROM json_each(?))", (json.dumps(restores),))
+            cur.executemany(SYNC_UPDATE_SQL, updates)
+            cur.executemany(IMPORT_SQL, inserts)
+            if self.archive_on_import:
+                self._archive_rows(cur, max(ARCHIVE_HORIZON_DAYS, 0))
+            self._prune_changes()
+        lap("write")
 
-        conn.commit()
-        conn.close()
         self.metadata["last_import"] = datetime.now().isoformat()
-        return inserted
+        self.metadata["last_import_timings"] = timings
+        return changes
+
+    # ------------------------------------------------------------------
+    # Archive tier
+    # ------------------------------------------------------------------
+    def _archive_rows(self, cur: sqlite3.Cursor, horizon_days: int) -> int:
+        cutoff = datetime.now().date().toordinal() - int(horizon_days)
+        params = (*ARCHIVED_STATUSES, cutoff)
+        columns = ", ".join(ARCHIVE_COLUMNS)
+        cur.execute(
+            f"INSERT INTO psur_reports_archive ({columns}) "
+            f"SELECT {columns} FROM psur_reports WHERE {_ARCHIVE_WHERE}",
+            params,
+        )
+        cur.execute(f"DELETE FROM psur_reports WHERE {_ARCHIVE_WHERE}", params)
+        return cur.rowcount
+
+    def _restore_rows(self, cur: sqlite3.Cursor, where: str, params: Iterable[Any]) -> int:
+        params = tuple(params)
+        columns = ", ".join(ROW_COLUMNS)
+        cur.execute(
+            f"INSERT INTO psur_reports ({columns}) SELECT {columns} FROM psur_reports_archive WHERE {where}",
+            params,
+        )
+        cur.execute(f"DELETE FROM psur_reports_archive WHERE {where}", params)
+        return cur.rowcount
+
+    def archive_released(self, horizon_days: Optional[int] = None) -> int:
+        """Move Released/closed reports due more than ``horizon_days`` ago
+        (default ARCHIVE_HORIZON_DAYS) to psur_reports_archive.
+
+        Runs in one transaction; the moves are journalled as deletes, so the
+        hot table, its indexes and the stats only cover open and recent work.
+        Returns the number of rows archived.
+        """
+        horizon = ARCHIVE_HORIZON_DAYS if horizon_days is None else int(horizon_days)
+        with self.unit_of_work() as cur:
+            archived = self._archive_rows(cur, max(horizon, 0))
+        if archived:
+            print(f"🗄️  Archived {archived} released reports")
+        return archived
+
+    def restore_archived(self, td_number: str) -> int:
+        """Move a TD number's archived rows back to the hot table."""
+        with self.unit_of_work() as cur:
+            return self._restore_rows(cur, "td_number = ?", (td_number,))
+
+    def count_archived(self) -> int:
+        return self._query("SELECT COUNT(*) FROM psur_reports_archive")[0][0]
+
+    def _tiered_records(
+        self,
+        where: Callable[[str], Tuple[str, List[Any]]],
+        *,
+        include_archived: bool = False,
+        order_by: str = DUE_ORDER_SQL,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Rows matching ``where(table)`` from the hot table, plus archived rows
+        (with their ``archived_at``) when ``include_archived`` is set."""
+        clause, params = where("psur_reports")
+        if include_archived:
+            archive_clause, archive_params = where("psur_reports_archive")
+            columns = ", ".join(ARCHIVE_COLUMNS)
+            query = (
+                f"SELECT * FROM (SELECT {columns}, NULL AS archived_at FROM psur_reports WHERE {clause} "
+                f"UNION ALL SELECT {columns}, archived_at FROM psur_reports_archive WHERE {archive_clause}) "
+                f"ORDER BY {order_by}"
+            )
+            params = list(params) + list(archive_params)
+        else:
+            query = f"SELECT * FROM psur_reports WHERE {clause} ORDER BY {order_by}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params = list(params) + [int(limit)]
+        return [self._row_to_record(row).to_dict() for row in self._query(query, params)]
+
+    # ------------------------------------------------------------------
+    # Columnar snapshot
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _snapshot_available() -> bool:
+        try:
+            from . import snapshot  # noqa: F401
+        except ImportError:
+            print("⚠️  PSUR_SNAPSHOT needs numpy; falling back to SQL")
+            return False
+        return True
+
+    def columnar_snapshot(self):
+        """The current ColumnarSnapshot, or None when snapshots are disabled.
+
+        Checking freshness costs one read of the journal version. A stale
+        snapshot is replaced by the shared snapshot file when another worker
+        has already written this version; otherwise it is patched from the
+        journal (or rebuilt after a reset or a large batch of changes) and
+        the file is rewritten for the other workers.
+        """
+        if not self.snapshot_enabled:
+            return None
+        version = self.data_version()
+        current = self._snapshot
+        if current is not None and current.version == version:
+            return current
+        with self._snapshot_lock:
+            current = self._snapshot
+            version = self.data_version()
+            if current is None or current.version != version:
+                current = self._load_snapshot_file(version)
+                if current is None:
+                    current = self._refresh_snapshot(self._snapshot)
+                    self._save_snapshot_file(current)
+                self._snapshot = current
+        return current
+
+    def _load_snapshot_file(self, version: int):
+        if self.snapshot_file is None:
+            return None
+        from .snapshot import read_snapshot_file
+
+        return read_snapshot_file(self.snapshot_file, version=version, columns=INSERT_COLUMNS)
+
+    def _save_snapshot_file(self, snapshot) -> None:
+        if self.snapshot_file is None:
+            return
+        from .snapshot import write_snapshot_file
+
+        try:
+            write_snapshot_file(snapshot, self.snapshot_file)
+        except OSError as e:
+            print(f"⚠️  Could not write snapshot file {self.snapshot_file}: {e}")
+
+    def _refresh_snapshot(self, current):
+        from .snapshot import ColumnarSnapshot
+
+        select = f"SELECT id, due_ord, end_ord, {', '.join(INSERT_COLUMNS)} FROM psur_reports"
+        with self.unit_of_work(write=False) as cur:
+            if current is not None:
+                delta = self.changes_since(current.version, limit=SNAPSHOT_PATCH_LIMIT)
+                if not delta["reset"] and not delta["has_more"]:
+                    changed = sorted({c["row_id"] for c in delta["changes"] if c["row_id"] is not None})
+                    rows = cur.execute(
+                        f"{select} WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(changed),)
+                    ).fetchall()
+                    return current.patch(delta["version"], changed, rows)
+            version = self.data_version()
+            rows = cur.execute(select).fetchall()
+        return ColumnarSnapshot.build(version, rows, INSERT_COLUMNS)
+
+    # ------------------------------------------------------------------
+    # Change journal
+    # ------------------------------------------------------------------
+    def data_version(self) -> int:
+        """Sequence number of the latest journalled change (0 if none)."""
+        rows = self._query("SELECT seq FROM sqlite_sequence WHERE name = 'psur_changes'")
+        return rows[0][0] if rows else 0
+
+    def _prune_changes(self) -> None:
+        self._execute(
+            "DELETE FROM psur_changes WHERE seq <= (SELECT MAX(seq) FROM psur_changes) - ?",
+            (CHANGES_RETENTION,),
+        )
+
+    def changes_since(self, since: int, limit: int = 1000) -> Dict[str, Any]:
+        """Journal entries after ``since``, oldest first.
+
+        ``reset`` is True when the caller cannot catch up incrementally (the
+        entries it needs were pruned, or the table was replaced wholesale); it
+        should then refetch everything and resume from ``version``.
+        """
+        since = int(since)
+        with self.unit_of_work(write=False) as cur:
+            version = self.data_version()
+            oldest = cur.execute("SELECT MIN(seq) FROM psur_changes").fetchone()[0]
+            reset = since > version or (oldest is not None and since < oldest - 1)
+            if not reset:
+                cur.execute(
+                    "SELECT 1 FROM psur_changes WHERE seq > ? AND op = 'reset' LIMIT 1", (since,)
+                )
+                reset = cur.fetchone() is not None
+            if reset:
+                return {"since": since, "version": version, "reset": True, "changes": [], "has_more": False}
+            rows = cur.execute(
+                """
+                SELECT seq, op, row_id, td_number, columns, version, changed_at
+                FROM psur_changes WHERE seq > ? ORDER BY seq LIMIT ?
+                """,
+                (since, int(limit) + 1),
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        changes = []
+        for row in rows[:limit]:
+            change = dict(row)
+            change["columns"] = change["columns"].split(",") if change["columns"] else []
+            changes.append(change)
+        return {
+            "since": since,
+            "version": changes[-1]["seq"] if has_more else version,
+            "reset": False,
+            "changes": changes,
+            "has_more": has_more,
+        }
 
     def convert_from_excel(self) -> int:
         return self.import_from_excel()
@@ -302,78 +1809,122 @@ class PSURDatabaseStore:
     # ------------------------------------------------------------------
     # Row post-processing
     # ------------------------------------------------------------------
-    def _row_to_record(self, row: sqlite3.Row, *, persist: bool = True) -> ScheduleRecord:
-        record = ScheduleRecord(dict(row))
-        original_due = record.data.get("due_date")
-        record.ensure_due()
-        computed_due = record.data.get("due_date")
-        if persist and computed_due and original_due != computed_due:
-            self._write_due(row["td_number"], computed_due)
-        return record
-
-    def _write_due(self, td_number: str, due_iso: str) -> None:
+    def _row_to_record(self, row: sqlite3.Row) -> ScheduleRecord:
+        return ScheduleRecord({key: row[key] for key in row.keys() if key not in INTERNAL_COLUMNS})
+
+    # ------------------------------------------------------------------
+    # Due-date derivation
+    # ------------------------------------------------------------------
+    def _get_setting(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM psur_settings WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def _set_setting(self, key: str, value: Any) -> None:
         self._execute(
-            "UPDATE psur_reports SET due_date = ?, updated_at = ?, version = version + 1 WHERE td_number = ?",
-            (due_iso, datetime.now().isoformat(), td_number),
+            """
+            INSERT INTO psur_settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """,
+            (key, str(value)),
         )
 
-    def _refresh_due(self, td_number: str) -> None:
-        self.find_by_td(td_number, persist=True)
+    def _stored_due_offset(self) -> Optional[int]:
+        value = self._get_setting("due_offset_days")
+        return int(value) if value is not None else None
+
+    def recompute_due_dates(self, offset_days: int = DUE_OFFSET_DAYS) -> int:
+        """Store a new due offset and re-derive every due_date in one statement.
+
+        Returns the number of rows whose due date changed.
+        """
+        with self.unit_of_work() as cur:
+            self._set_setting("due_offset_days", offset_days)
+            due = _due_sql("end_period", "?")
+            cur.execute(
+                f"""
+                UPDATE psur_reports
+                SET due_date = {due}, updated_at = ?, version = version + 1
+                WHERE due_date IS NOT {due}
+                """,
+                (offset_days, datetime.now().isoformat(), offset_days),
+            )
+            changed = cur.rowcount
+        self.metadata["due_offset_days"] = offset_days
+        return changed
 
     # ------------------------------------------------------------------
     # CRUD operations
     # ------------------------------------------------------------------
     def count_records(self) -> int:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM psur_reports")
-        count = cur.fetchone()[0]
-        conn.close()
-        return count
-
-    def get_all(self, *, persist: bool = True) -> List[Dict[str, Any]]:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM psur_reports ORDER BY td_number")
-        rows = cur.fetchall()
-        conn.close()
-        return [self._row_to_record(row, persist=persist).to_dict() for row in rows]
-
-    def find_by_td(self, td_number: str, *, persist: bool = True) -> Optional[Dict[str, Any]]:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM psur_reports WHERE td_number = ?", (td_number,))
-        row = cur.fetchone()
-        conn.close()
-        if not row:
-            return None
-        return self._row_to_record(row, persist=persist).to_dict()
-
-    def find_all_by_td(self, td_number: str, *, persist: bool = True) -> List[Dict[str, Any]]:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM psur_reports WHERE td_number = ? ORDER BY id", (td_number,))
-        rows = cur.fetchall()
-        conn.close()
-        return [self._row_to_record(row, persist=persist).to_dict() for row in rows]
-
-    def find_by_psur(self, psur_number: str, *, persist: bool = True) -> Optional[Dict[str, Any]]:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM psur_reports WHERE psur_number = ?", (psur_number,))
-        row = cur.fetchone()
-        conn.close()
-        if not row:
-            return None
-        return self._row_to_record(row, persist=persist).to_dict()
+        return self._query("SELECT COUNT(*) FROM psur_reports")[0][0]
+
+    def get_all(self, *, include_archived: bool = False) -> List[Dict[str, Any]]:
+        return self._tiered_records(
+            lambda table: ("1", []), include_archived=include_archived, order_by="td_number"
+        )
+
+    def _find_one(self, column: str, value: str) -> Optional[Dict[str, Any]]:
+        """First row with ``column = value``; the archive is only read on a hot miss."""
+        for table in ("psur_reports", "psur_reports_archive"):
+            rows = self._query(f"SELECT * FROM {table} WHERE {column} = ? ORDER BY id LIMIT 1", (value,))
+            if rows:
+                return self._row_to_record(rows[0]).to_dict()
+        return None
+
+    def find_by_td(self, td_number: str) -> Optional[Dict[str, Any]]:
+        return self._find_one("td_number", td_number)
+
+    def find_all_by_td(self, td_number: str, *, include_archived: bool = True) -> List[Dict[str, Any]]:
+        return self._tiered_records(
+            lambda table: ("td_number = ?", [td_number]),
+            include_archived=include_archived,
+            order_by="archived_at IS NOT NULL, id" if include_archived else "id",
+        )
+
+    def find_by_psur(self, psur_number: str) -> Optional[Dict[str, Any]]:
+        return self._find_one("psur_number", psur_number)
 
     def find_by_query(self, query: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """Free-text search, best matches first.
+
+        Uses the FTS5 index with bm25 ranking and prefix matching; falls back
+        to substring LIKE scans when FTS5 is unavailable or finds nothing
+        (e.g. a fragment from the middle of a catalog number). Archived
+        reports are not in the FTS index; their LIKE matches come last.
+        """
+        records: List[Dict[str, Any]] = []
+        if self.fts_enabled:
+            records = [self._row_to_record(row).to_dict() for row in self._search_fts(query, limit)]
+        if not records:
+            records = self._search_like(query, limit)
+        if len(records) < limit:
+            records += self._search_like(query, limit - len(records), table="psur_reports_archive")
+        return records
+
+    def _search_fts(self, query: str, limit: int) -> List[sqlite3.Row]:
+        match = _fts_match_expression(query)
+        if not match:
+            return []
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        try:
+            return self._query(
+                f"""
+                SELECT r.* FROM psur_reports_fts f
+                JOIN psur_reports r ON r.id = f.rowid
+                WHERE psur_reports_fts MATCH ?
+                ORDER BY bm25(psur_reports_fts, {weights}), r.td_number
+                LIMIT ?
+                """,
+                (match, limit),
+            )
+        except sqlite3.OperationalError:
+            return []
+
+    def _search_like(self, query: str, limit: int, table: str = "psur_reports") -> List[Dict[str, Any]]:
         like = f"%{query}%"
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT * FROM psur_reports
+        rows = self._query(
+            f"""
+            SELECT * FROM {table}
             WHERE td_number LIKE ?
                OR psur_number LIKE ?
                OR product_name LIKE ?
@@ -386,8 +1937,6 @@ class PSURDatabaseStore:
             """,
             (like, like, like, like, like, like, like, limit),
         )
-        rows = cur.fetchall()
-        conn.close()
         return [self._row_to_record(row).to_dict() for row in rows]
 
     def filter_records(
@@ -396,131 +1945,178 @@ class PSURDatabaseStore:
         writer: Optional[str] = None,
         classification: Optional[str] = None,
         status: Optional[str] = None,
+        type: Optional[str] = None,
         within_days: Optional[int] = None,
         overdue_only: bool = False,
+        limit: Optional[int] = None,
+        include_archived: bool = False,
     ) -> List[Dict[str, Any]]:
-        records = self.get_all()
-        results = []
-        today = datetime.now().date()
-        window_end = today + timedelta(days=within_days) if within_days is not None else None
-
-        for record in records:
-            due = _parse_date(record.get("due_date"))
-
-            if writer and writer.lower() not in (record.get("writer") or "").lower():
-                continue
-            if classification and classification.lower() not in (record.get("class") or "").lower():
-                continue
-            if status and status.lower() not in (record.get("status") or "").lower():
-                continue
-            if overdue_only:
-                if not due or due >= today:
-                    continue
-            if within_days is not None:
-                if not due:
-                    continue
-                if due < today or due > window_end:
-                    continue
-
-            results.append(record)
+        snapshot = None if include_archived else self.columnar_snapshot()
+        if snapshot is not None:
+            mask = snapshot.mask(
+                today=datetime.now().date().toordinal(),
+                writer=writer,
+                classification=classification,
+                status=status,
+                type=type,
+                within_days=within_days,
+                overdue_only=overdue_only,
+            )
+            return self._records_by_ids(snapshot.select(mask, limit))
+        return self._tiered_records(
+            lambda table: _compile_filters(
+                writer=writer,
+                classification=classification,
+                status=status,
+                type=type,
+                within_days=within_days,
+                overdue_only=overdue_only,
+            ),
+            include_archived=include_archived,
+            limit=limit,
+        )
 
-        results.sort(key=lambda r: (_parse_date(r.get("due_date")) or date.max, r.get("td_number", "")))
-        return results
+    def page_records(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """One page of filtered records in (due_date, td_number, id) order.
+
+        Pass the returned ``next_cursor`` back to get the following page; each
+        page is an index seek past the previous page's last key plus LIMIT, so
+        paging through the schedule is linear overall. ``offset`` is only
+        honoured without a cursor. ``total`` counts all matching rows.
+        """
+        where, params = _compile_filters(**_filter_kwargs(filters))
+        limit = max(1, int(limit))
+        with self.unit_of_work(write=False) as cur:
+            cur.execute(f"SELECT COUNT(*) FROM psur_reports WHERE {where}", params)
+            total = cur.fetchone()[0]
+
+            query = f"SELECT *, {DUE_SORT_KEY_SQL} AS sort_key FROM psur_reports WHERE {where}"
+            page_params = list(params)
+            if cursor:
+                sort_key, td_number, row_id = _decode_cursor(cursor)
+                # The plain >= lets SQLite seek idx_due_page; the row value is exact.
+                query += (
+                    f" AND {DUE_SORT_KEY_SQL} >= ?"
+                    f" AND ({DUE_SORT_KEY_SQL}, td_number, id) > (?, ?, ?)"
+                )
+                page_params.extend([sort_key, sort_key, td_number, row_id])
+            query += f" ORDER BY {DUE_ORDER_SQL} LIMIT ?"
+            page_params.append(limit + 1)
+            if offset and not cursor:
+                query += " OFFSET ?"
+                page_params.append(int(offset))
+            rows = cur.execute(query, page_params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [self._row_to_record(row).to_dict() for row in rows]
+        return {
+            "items": items,
+            "count": len(items),
+            "total": total,
+            "next_cursor": _encode_cursor(rows[-1]) if has_more and rows else None,
+        }
 
     def update_record(self, td_number: str, updates: Dict[str, Any]) -> bool:
         if not updates:
             return False
 
-        allowed = {k: v for k, v in updates.items() if k not in {"id", "created_at", "updated_at", "version", "td_number"}}
+        allowed = {k: v for k, v in updates.items() if k not in PROTECTED_COLUMNS}
         if not allowed:
             return False
+        allowed = _normalize_dates(allowed)
 
-        set_clauses = []
-        params: List[Any] = []
-        for key, value in allowed.items():
-            set_clauses.append(f"{key} = ?")
-            params.append(value)
-
+        set_clauses, params = _assignments(allowed)
         set_clauses.append("updated_at = ?")
         set_clauses.append("version = version + 1")
         params.append(datetime.now().isoformat())
         params.append(td_number)
 
         query = f"UPDATE psur_reports SET {', '.join(set_clauses)} WHERE td_number = ?"
-        affected = self._execute(query, params)
-        if affected:
-            self._refresh_due(td_number)
+        with self.unit_of_work() as cur:
+            # Editing brings any archived rows of the TD back to the hot table,
+            # so the update covers every row, not just the hot ones.
+            self._restore_rows(cur, "td_number = ?", (td_number,))
+            cur.execute(query, params)
+            affected = cur.rowcount
         return affected > 0
 
-    def add_record(self, record: Dict[str, Any]) -> str:
-        conn = self.get_connection()
-        cur = conn.cursor()
-
-        td_number = record.get("td_number")
-        if not td_number:
-            cur.execute("SELECT td_number FROM psur_reports WHERE td_number LIKE 'TD%' ORDER BY td_number DESC LIMIT 1")
-            row = cur.fetchone()
-            if row:
-                try:
-                    num = int(row["td_number"][2:]) + 1
-                except ValueError:
-                    num = 1
-            else:
-                num = 1
-            td_number = f"TD{num:03d}"
-            record["td_number"] = td_number
-
-        due = _compute_due(record.get("end_period"))
-        record["due_date"] = _format_date(due)
+    def _allocate_td_numbers(self, cur: sqlite3.Cursor, count: int) -> List[str]:
+        """Advance the TD sequence by ``count`` in the caller's transaction."""
+        params = (count,)
+        if _SUPPORTS_RETURNING:
+            cur.execute("UPDATE psur_sequences SET value = value + ? WHERE name = 'td_number' RETURNING value", params)
+            last = cur.fetchone()[0]
+        else:
+            cur.execute("UPDATE psur_sequences SET value = value + ? WHERE name = 'td_number'", params)
+            last = cur.execute("SELECT value FROM psur_sequences WHERE name = 'td_number'").fetchone()[0]
+        return [f"TD{num:03d}" for num in range(last - count + 1, last + 1)]
+
+    def reserve_td_numbers(self, count: int = 1) -> List[str]:
+        """Reserve ``count`` fresh TD numbers, never handed out again."""
+        if count < 1:
+            return []
+        with self.unit_of_work() as cur:
+            return self._allocate_td_numbers(cur, count)
+
+    def add_records(self, records: List[Dict[str, Any]]) -> List[str]:
+        """Insert several records in one transaction; returns their TD numbers.
+
+        Records without a td_number get consecutive numbers from the sequence.
+        """
+        records = [_normalize_dates(record) for record in records]
+        with self.unit_of_work() as cur:
+            missing = [record for record in records if not record.get("td_number")]
+            if missing:
+                for record, td_number in zip(missing, self._allocate_td_numbers(cur, len(missing))):
+                    record["td_number"] = td_number
+            for record in records:
+                record["due_date"] = _format_date(_compute_due(record.get("end_period")))
+            cur.executemany(INSERT_SQL, [_insert_params(record) for record in records])
+        return [record["td_number"] for record in records]
 
-        cur.execute(
-            """
-            INSERT INTO psur_reports (
-                td_number, psur_number, type, product_name, catalog_number,
-                writer, email, start_period, end_period, frequency,
-                due_date, status, canada_needed, canada_status, comments, class
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                record.get("td_number"),
-                record.get("psur_number"),
-                record.get("type"),
-                record.get("product_name"),
-                record.get("catalog_number"),
-                record.get("writer"),
-                record.get("email"),
-                record.get("start_period"),
-                record.get("end_period"),
-                record.get("frequency"),
-                record.get("due_date"),
-                record.get("status"),
-                record.get("canada_needed"),
-                record.get("canada_status"),
-                record.get("comments"),
-                record.get("class"),
-            ),
-        )
-        conn.commit()
-        conn.close()
-        return td_number
+    def add_record(self, record: Dict[str, Any]) -> str:
+        return self.add_records([record])[0]
 
     def delete_record(self, td_number: str) -> bool:
-        affected = self._execute("DELETE FROM psur_reports WHERE td_number = ?", (td_number,))
+        affected = 0
+        with self.unit_of_work() as cur:
+            for table in ("psur_reports", "psur_reports_archive"):
+                cur.execute(f"DELETE FROM {table} WHERE td_number = ?", (td_number,))
+                affected += cur.rowcount
         return affected > 0
 
     # ------------------------------------------------------------------
     # Higher-level utilities used by tools
     # ------------------------------------------------------------------
-    def add_comment(self, td_number: str, comment: str) -> bool:
-        record = self.find_by_td(td_number, persist=False)
-        if not record:
-            return False
-        stamped = f"[{datetime.now().strftime('%Y-%m-%d %H:%M')}] {comment}"
-        existing = record.get("comments") or ""
-        combined = f"{existing}\n{stamped}" if existing else stamped
-        return self.update_record(td_number, {"comments": combined})
+    def _append_note(self, td_number: str, body: str, kind: str, author: Optional[str]) -> bool:
+        # Attach to the first row with this TD number, as find_by_td does.
+        affected = self._execute(
+            f"""
+            INSERT INTO psur_comments (report_id, author, body, kind)
+            SELECT id, ?, ?, ? FROM ({_TIERED_IDS_SQL}) ORDER BY archived, id LIMIT 1
+            """,
+            (author, body, kind, td_number, td_number),
+        )
+        return affected > 0
+
+    def add_comment(self, td_number: str, comment: str, author: Optional[str] = None) -> bool:
+        return self._append_note(td_number, comment, "comment", author)
 
-    def link_references(self, td_number: str, mc_url: Optional[str], sp_url: Optional[str]) -> bool:
+    def link_references(
+        self,
+        td_number: str,
+        mc_url: Optional[str],
+        sp_url: Optional[str],
+        author: Optional[str] = None,
+    ) -> bool:
         parts = []
         if mc_url:
             parts.append(f"MC: {mc_url}")
@@ -528,79 +2124,304 @@ class PSURDatabaseStore:
             parts.append(f"SP: {sp_url}")
         if not parts:
             return False
-        return self.add_comment(td_number, " | ".join(parts))
+        return self._append_note(td_number, " | ".join(parts), "link", author)
 
-    def bulk_update_status(self, filters: Dict[str, Any], new_status: str) -> int:
-        records = self.filter_records(
-            writer=filters.get("writer"),
-            classification=filters.get("class"),
-            status=filters.get("status"),
-            within_days=filters.get("within_days"),
-            overdue_only=filters.get("overdue_only", False),
+    def get_comments(
+        self,
+        td_number: str,
+        limit: Optional[int] = 20,
+        kind: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Newest-first notes on a TD number (all of its rows)."""
+        query = f"""
+            SELECT c.id, ? AS td_number, c.created_at, c.author, c.body, c.kind
+            FROM psur_comments c JOIN ({_TIERED_IDS_SQL}) r ON r.id = c.report_id
+        """
+        params: List[Any] = [td_number, td_number, td_number]
+        if kind:
+            query += " WHERE c.kind = ?"
+            params.append(kind)
+        query += " ORDER BY c.id DESC LIMIT ?"
+        params.append(-1 if limit is None else int(limit))
+        return [dict(row) for row in self._query(query, params)]
+
+    def attach_comments(self, records: List[Dict[str, Any]], limit: int = 3) -> List[Dict[str, Any]]:
+        """Add the ``limit`` newest notes to each record as ``recent_comments``."""
+        if not records or limit <= 0:
+            return records
+        rows = self._query(
+            """
+            SELECT report_id, created_at, author, body, kind FROM (
+                SELECT c.*, ROW_NUMBER() OVER (PARTITION BY report_id ORDER BY id DESC) AS rn
+                FROM psur_comments c
+                WHERE report_id IN (SELECT value FROM json_each(?))
+            )
+            WHERE rn <= ?
+            ORDER BY report_id, rn
+            """,
+            (json.dumps([record["id"] for record in records]), int(limit)),
         )
-        count = 0
+        by_report: Dict[int, List[Dict[str, Any]]] = {}
+        for row in rows:
+            note = dict(row)
+            by_report.setdefault(note.pop("report_id"), []).append(note)
         for record in records:
-            if self.update_record(record["td_number"], {"status": new_status}):
-                count += 1
-        return count
+            record["recent_comments"] = by_report.get(record["id"], [])
+        return records
+
+    def bulk_update(self, filters: Dict[str, Any], updates: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Apply ``updates`` to every row matching ``filters`` in one statement.
+
+        ``filters`` takes the filter_records keys (``class`` is accepted for
+        ``classification``). The filter and assignments compile into a single
+        ``UPDATE ... WHERE ... RETURNING id`` that also bumps version and
+        updated_at; the changed rows are read back in the same transaction
+        and returned in due order.
+        """
+        assignments = {k: v for k, v in updates.items() if k not in PROTECTED_COLUMNS}
+        unknown = set(assignments) - set(INSERT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+        if not assignments:
+            return []
+        assignments = _normalize_dates(assignments)
+
+        where, where_params = _compile_filters(**_filter_kwargs(filters))
+        set_clauses, set_params = _assignments(assignments)
+        set_sql = ", ".join(set_clauses)
+        now = datetime.now().isoformat()
+        params = [*set_params, now, *where_params]
+        with self.unit_of_work() as cur:
+            if _SUPPORTS_RETURNING:
+                cur.execute(
+                    f"UPDATE psur_reports SET {set_sql}, updated_at = ?, version = version + 1 "
+                    f"WHERE {where} RETURNING id",
+                    params,
+                )
+                ids = [row[0] for row in cur.fetchall()]
+            else:
+                ids = [row[0] for row in cur.execute(f"SELECT id FROM psur_reports WHERE {where}", where_params)]
+                cur.executemany(
+                    f"UPDATE psur_reports SET {set_sql}, updated_at = ?, version = version + 1 WHERE id = ?",
+                    [(*set_params, now, row_id) for row_id in ids],
+                )
+            return self._records_by_ids(ids)
+
+    def _records_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        rows = self._query(
+            f"SELECT * FROM psur_reports WHERE id IN (SELECT value FROM json_each(?)) ORDER BY {DUE_ORDER_SQL}",
+            (json.dumps(ids),),
+        )
+        return [self._row_to_record(row).to_dict() for row in rows]
+
+    def bulk_update_status(self, filters: Dict[str, Any], new_status: str) -> int:
+        return len(self.bulk_update(filters, {"status": new_status}))
 
     def find_missing_fields(self, fields: List[str]) -> List[Dict[str, Any]]:
+        snapshot = self.columnar_snapshot()
+        if snapshot is not None and fields and set(fields) <= set(INSERT_COLUMNS):
+            blank = snapshot.missing(fields)
+            hits = blank.any(axis=1)
+            missing_by_id = {
+                row_id: [field for field, is_blank in zip(fields, row) if is_blank]
+                for row_id, row in zip(snapshot.ids[hits].tolist(), blank[hits].tolist())
+            }
+            rows = self._query(
+                "SELECT * FROM psur_reports WHERE id IN (SELECT value FROM json_each(?)) ORDER BY td_number, id",
+                (json.dumps(list(missing_by_id)),),
+            )
+            results = []
+            for row in rows:
+                record = self._row_to_record(row).to_dict()
+                record["missing_fields"] = missing_by_id[record["id"]]
+                results.append(record)
+            return results
+
+        if not fields:
+            return []
+        unknown = [field for field in fields if field not in INSERT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        # One arm per field so each can use its idx_blank_* partial index.
+        matches = " UNION ".join(
+            f"SELECT id FROM psur_reports"
+            f"{f' INDEXED BY idx_blank_{field}' if field in BLANK_INDEXED_COLUMNS else ''} "
+            f"WHERE {_BLANK_SQL.format(column=field)}"
+            for field in fields
+        )
+        rows = self._query(f"SELECT * FROM psur_reports WHERE id IN ({matches}) ORDER BY td_number, id")
         results = []
-        for record in self.get_all():
-            missing = [field for field in fields if not (record.get(field) or "").strip()]
-            if missing:
-                record_copy = dict(record)
-                record_copy["missing_fields"] = missing
-                results.append(record_copy)
+        for row in rows:
+            record = self._row_to_record(row).to_dict()
+            record["missing_fields"] = [field for field in fields if not str(record.get(field) or "").strip()]
+            results.append(record)
         return results
 
     # ------------------------------------------------------------------
     # Scheduling + projections
     # ------------------------------------------------------------------
-    def get_schedule_for_year(self, year: int) -> List[Dict[str, Any]]:
-        records = self.get_all()
-        selected: List[Dict[str, Any]] = []
+    def records_due_between(
+        self,
+        start: Any,
+        end: Any,
+        *,
+        include_archived: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Reports due from ``start`` through ``end`` (inclusive), in due order.
+
+        Dates may be ``date`` objects or any format _parse_date accepts; the
+        bounds become day ordinals, so this is a range seek on idx_due_ord.
+        """
+        lo = _required_date(start, "start").toordinal()
+        hi = _required_date(end, "end").toordinal()
+        snapshot = None if include_archived else self.columnar_snapshot()
+        if snapshot is not None:
+            mask = (snapshot.due_ord >= lo) & (snapshot.due_ord <= hi)
+            return self._records_by_ids(snapshot.select(mask, limit))
+        return self._tiered_records(
+            lambda table: ("due_ord BETWEEN ? AND ?", [lo, hi]),
+            include_archived=include_archived,
+            limit=limit,
+        )
 
-        for record in records:
-            due = _parse_date(record.get("due_date"))
-            if not due:
-                if year <= 2025:
-                    selected.append(record)
-                continue
+    def due_bucket_counts(
+        self,
+        start: Any,
+        end: Any,
+        bucket: str = "month",
+        *,
+        include_archived: bool = False,
+    ) -> Dict[str, int]:
+        """Number of reports due per day/week/month/quarter/year bucket between
+        ``start`` and ``end``, keyed by bucket label in date order. Empty
+        buckets are omitted; week labels are the Monday's date."""
+        expr = DUE_BUCKET_SQL.get(bucket)
+        if expr is None:
+            raise ValueError(f"Unknown bucket: {bucket!r} (expected one of {', '.join(DUE_BUCKET_SQL)})")
+        lo = _required_date(start, "start").toordinal()
+        hi = _required_date(end, "end").toordinal()
+        source, params = "psur_reports WHERE due_ord BETWEEN ? AND ?", [lo, hi]
+        if include_archived:
+            source = (
+                "(SELECT due_ord FROM psur_reports WHERE due_ord BETWEEN ? AND ? "
+                "UNION ALL SELECT due_ord FROM psur_reports_archive WHERE due_ord BETWEEN ? AND ?)"
+            )
+            params += [lo, hi]
+        rows = self._query(
+            f"SELECT {expr} AS bucket, COUNT(*) FROM {source} GROUP BY bucket ORDER BY bucket", params
+        )
+        return {bucket_label: n for bucket_label, n in rows}
 
-            if year <= 2025 and due.year <= 2025:
-                selected.append(record)
-            elif year >= 2026 and due.year >= 2026:
-                selected.append(record)
+    def due_in_period(
+        self,
+        period: str,
+        *,
+        offset: int = 0,
+        anchor: Any = None,
+        include_archived: bool = False,
+    ) -> Dict[str, Any]:
+        """Reports due in this (offset=0), next (1) or last (-1) week, month,
+        quarter or year relative to ``anchor`` (default today), with counts
+        per PERIOD_BUCKETS sub-period."""
+        day = _required_date(anchor, "anchor") if anchor else datetime.now().date()
+        start, end = period_bounds(period, day, int(offset))
+        items = self.records_due_between(start, end, include_archived=include_archived)
+        return {
+            "period": period,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "items": items,
+            "count": len(items),
+            "buckets": self.due_bucket_counts(
+                start, end, PERIOD_BUCKETS[period], include_archived=include_archived
+            ),
+        }
 
-        selected.sort(key=lambda r: (_parse_date(r.get("due_date")) or date.max, r.get("td_number", "")))
-        return selected
+    def records_due_in_week(self, day: Any = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        """Reports due in the Monday-Sunday week containing ``day`` (default today)."""
+        start, end = period_bounds("week", _required_date(day, "day") if day else datetime.now().date())
+        return self.records_due_between(start, end, **kwargs)
+
+    def records_due_in_month(self, year: int, month: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        start, end = period_bounds("month", date(int(year), int(month), 1))
+        return self.records_due_between(start, end, **kwargs)
+
+    def records_due_in_quarter(self, year: int, quarter: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        if not 1 <= int(quarter) <= 4:
+            raise ValueError(f"Invalid quarter: {quarter!r} (expected 1-4)")
+        start, end = period_bounds("quarter", date(int(year), 3 * int(quarter) - 2, 1))
+        return self.records_due_between(start, end, **kwargs)
+
+    def get_schedule_for_years(
+        self,
+        first_year: int,
+        last_year: Optional[int] = None,
+        *,
+        include_archived: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Reports due in ``first_year`` through ``last_year`` (inclusive), in due order."""
+        last_year = first_year if last_year is None else last_year
+        return self.records_due_between(
+            date(int(first_year), 1, 1), date(int(last_year), 12, 31), include_archived=include_archived
+        )
+
+    def get_schedule_for_year(self, year: int, *, include_archived: bool = False) -> List[Dict[str, Any]]:
+        return self.get_schedule_for_years(year, year, include_archived=include_archived)
 
     # ------------------------------------------------------------------
     # Export helpers
     # ------------------------------------------------------------------
+    def iter_records(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        *,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield filtered records in due order, ``batch_size`` rows at a time.
+
+        Runs on its own connection inside one read transaction, so the stream
+        sees a consistent snapshot and can be resumed from any thread.
+        """
+        where, params = _compile_filters(**_filter_kwargs(filters))
+        with self._pool.dedicated() as conn:
+            conn.execute("BEGIN")
+            cur = conn.execute(
+                f"SELECT * FROM psur_reports WHERE {where} ORDER BY {DUE_ORDER_SQL}", params
+            )
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_record(row).to_dict()
+
+    def iter_csv(self, filters: Optional[Dict[str, Any]] = None, *, compress: bool = False) -> Iterator[bytes]:
+        return csv_chunks(self.iter_records(filters), EXPORT_COLUMNS, compress=compress)
+
+    def iter_ndjson(self, filters: Optional[Dict[str, Any]] = None, *, compress: bool = False) -> Iterator[bytes]:
+        return ndjson_chunks(self.iter_records(filters), fieldnames=EXPORT_COLUMNS, compress=compress)
+
     def export_csv(self, filter_criteria: Optional[Dict[str, Any]], filename: str) -> str:
-        records = self.filter_records(
-            writer=(filter_criteria or {}).get("writer"),
-            classification=(filter_criteria or {}).get("class"),
-            status=(filter_criteria or {}).get("status"),
-            within_days=(filter_criteria or {}).get("within_days"),
-            overdue_only=(filter_criteria or {}).get("overdue_only", False),
-        )
-        path = EXPORTS_DIR / filename
-        fieldnames = list(records[0].keys()) if records else ["td_number"]
-        with path.open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.DictWriter(fh, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(records)
+        path = _export_path(filename)
+        with path.open("wb") as fh:
+            for chunk in self.iter_csv(filter_criteria):
+                fh.write(chunk)
         return str(path)
 
-    def export_excel(self, records: Optional[List[Dict[str, Any]]], filename: str) -> str:
+    def export_excel(
+        self,
+        records: Optional[List[Dict[str, Any]]],
+        filename: str,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Write records (or a filtered stream from the DB) to an .xlsx file."""
         if records is None:
-            records = self.get_all()
-        df = pd.DataFrame(records)
-        path = EXPORTS_DIR / filename
-        df.to_excel(path, index=False)
+            records = self.iter_records(filters)
+        path = _export_path(filename)
+        write_records_xlsx(str(path), records, EXCEL_EXPORT_COLUMNS)
         return str(path)
 
     def export_calendar(self, filter_criteria: Optional[Dict[str, Any]], within_days: Optional[int], filename: str) -> str:
@@ -628,7 +2449,7 @@ class PSURDatabaseStore:
                 ]
             )
         ics_lines.append("END:VCALENDAR")
-        path = EXPORTS_DIR / filename
+        path = _export_path(filename)
         path.write_text("\n".join(ics_lines), encoding="utf-8")
         return str(path)
 
@@ -636,42 +2457,122 @@ class PSURDatabaseStore:
     # Diagnostics
     # ------------------------------------------------------------------
     def get_stats(self) -> Dict[str, Any]:
-        records = self.get_all()
-        stats: Dict[str, Any] = {
-            "total_records": len(records),
-            "by_status": {},
-            "by_class": {},
-            "by_writer": {},
-            "overdue": 0,
-            "due_soon": 0,
-        }
-        today = datetime.now().date()
-        thirty = today + timedelta(days=30)
-
-        for record in records:
-            status = (record.get("status") or "Unknown").strip() or "Unknown"
-            stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
-
-            klass = (record.get("class") or "Unknown").strip() or "Unknown"
-            stats["by_class"][klass] = stats["by_class"].get(klass, 0) + 1
-
-            writer = (record.get("writer") or "Unassigned").strip() or "Unassigned"
-            stats["by_writer"][writer] = stats["by_writer"].get(writer, 0) + 1
-
-            due = _parse_date(record.get("due_date"))
-            if due and due < today:
-                stats["overdue"] += 1
-            if due and today <= due <= thirty:
-                stats["due_soon"] += 1
-
-        stats["duplicate_td_numbers"] = self.find_duplicate_td_numbers()
+        """Status/class/writer histograms plus overdue and due-in-30-days counts.
+
+        Histograms come from psur_stat_counters when the counter triggers are
+        enabled (O(groups)), otherwise from GROUP BY aggregates. Everything is
+        read inside one transaction so the numbers are mutually consistent.
+        """
+        today = datetime.now().date().toordinal()
+        snapshot = self.columnar_snapshot()
+        if snapshot is not None:
+            stats = {
+                "total_records": len(snapshot),
+                "overdue": int(snapshot.mask(today=today, overdue_only=True).sum()),
+                "due_soon": int(snapshot.mask(today=today, within_days=30).sum()),
+            }
+            for dimension, column, default in STAT_DIMENSIONS:
+                stats[f"by_{dimension}"] = snapshot.histogram(column, default)
+            stats["duplicate_td_numbers"] = snapshot.duplicates()
+            return stats
+        with self.unit_of_work(write=False) as cur:
+            cur.execute(
+                """
+                SELECT COUNT(*),
+                       COALESCE(SUM(due_ord < :today), 0),
+                       COALESCE(SUM(due_ord BETWEEN :today AND :thirty), 0)
+                FROM psur_reports
+                """,
+                {"today": today, "thirty": today + 30},
+            )
+            total, overdue, due_soon = cur.fetchone()
+            stats: Dict[str, Any] = {
+                "total_records": total,
+                "by_status": {},
+                "by_class": {},
+                "by_writer": {},
+                "overdue": overdue,
+                "due_soon": due_soon,
+            }
+            use_counters = STATS_COUNTERS and self._get_setting("stat_counters") == "1"
+            for dimension, column, default in STAT_DIMENSIONS:
+                if use_counters:
+                    cur.execute(
+                        "SELECT key, n FROM psur_stat_counters WHERE dimension = ? AND n > 0 ORDER BY key",
+                        (dimension,),
+                    )
+                else:
+                    cur.execute(
+                        f"SELECT {_stat_key(column, default)} AS key, COUNT(*) "
+                        "FROM psur_reports GROUP BY key ORDER BY key"
+                    )
+                stats[f"by_{dimension}"] = {key: n for key, n in cur.fetchall()}
+
+            stats["duplicate_td_numbers"] = self.find_duplicate_td_numbers()
 
         return stats
 
+    def data_health(self, sample_size: int = 5) -> Dict[str, Any]:
+        """Per-field completeness, unparseable dates and duplicate TD numbers.
+
+        Counts come from a single aggregate pass; a second pass over just the
+        incomplete rows collects up to ``sample_size`` TD numbers per problem.
+        The result is cached until the data version changes, so repeated QA
+        sweeps cost one journal lookup.
+        """
+        version = self.data_version()
+        if self._health is not None and self._health[:2] == (version, sample_size):
+            return self._health[2]
+
+        blank = {field: _BLANK_SQL.format(column=field) for field in HEALTH_FIELDS}
+        invalid = {
+            column: f"({column} IS NOT NULL AND {column} != '' AND {ordinal} IS NULL)"
+            for column, ordinal in ORDINAL_COLUMNS.items()
+        }
+        any_blank = " OR ".join(blank.values())
+        with self.unit_of_work(write=False) as cur:
+            version = self.data_version()
+            sums = ", ".join(
+                [f"COALESCE(SUM({expr}), 0)" for expr in blank.values()]
+                + [f"COALESCE(SUM({expr}), 0)" for expr in invalid.values()]
+            )
+            row = cur.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(NOT ({any_blank})), 0), {sums} FROM psur_reports"
+            ).fetchone()
+            total, complete, counts = row[0], row[1], list(row[2:])
+
+            samples: Dict[str, List[str]] = {name: [] for name in [*blank, *(f"invalid:{c}" for c in invalid)]}
+            flags = ", ".join([*blank.values(), *invalid.values()])
+            for problem_row in cur.execute(
+                f"SELECT td_number, {flags} FROM psur_reports "
+                f"WHERE {any_blank} OR {' OR '.join(invalid.values())} ORDER BY td_number, id"
+            ):
+                for name, flagged in zip(samples, problem_row[1:]):
+                    if flagged and len(samples[name]) < sample_size:
+                        samples[name].append(problem_row[0])
+            duplicates = self.find_duplicate_td_numbers()
+
+        health: Dict[str, Any] = {
+            "version": version,
+            "total_records": total,
+            "complete_records": complete,
+            "fields": {},
+            "invalid_dates": {},
+            "duplicate_td_numbers": duplicates,
+        }
+        for field, missing in zip(blank, counts):
+            health["fields"][field] = {
+                "missing": missing,
+                "completeness": round(100.0 * (total - missing) / total, 1) if total else 100.0,
+                "sample": samples[field],
+            }
+        for column, bad in zip(invalid, counts[len(blank):]):
+            health["invalid_dates"][column] = {"count": bad, "sample": samples[f"invalid:{column}"]}
+        self._health = (version, sample_size, health)
+        return health
+
     def find_duplicate_td_numbers(self) -> List[str]:
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute(
+        rows = self._query(
             """
             SELECT td_number
             FROM psur_reports
@@ -681,9 +2582,7 @@ class PSURDatabaseStore:
             ORDER BY td_number
             """
         )
-        duplicates = [row[0] for row in cur.fetchall()]
-        conn.close()
-        return duplicates
+        return [row[0] for row in rows]
 
 
 _store: Optional[PSURDatabaseStore] = None
@@ -1,19 +1,32 @@
 """
 Shared utilities for PSUR schedule processing
 """
+from __future__ import annotations
+
+import hashlib
 import os
+import pickle
 import re
+import shutil
 from datetime import datetime, date
-from typing import Dict, Any, Tuple
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Optional, Sequence, Tuple
 from pathlib import Path
 
+# pandas is imported inside the functions that need it: it dominates import
+# time and most callers (server, Convex backend) never read a workbook.
+if TYPE_CHECKING:
+    import pandas as pd
+
 # >>> Set this to your actual .xlsx path or via env
 PSUR_SCHEDULE_PATH = os.getenv(
     "PSUR_SCHEDULE_PATH",
     r"C:\Users\tmuso\OneDrive\Printer Friendly Receipt Detail_files\Desktop\FUN PROJECTS\skej\2025 Periodic Safety Update Report Master Schedule (2).xlsx"
 )
 
+# Sidecar cache of parsed workbooks (see read_excel_cached)
+WORKBOOK_CACHE_DIR = Path(os.getenv("PSUR_CACHE_DIR", Path(__file__).parent.parent / "data" / "cache"))
+WORKBOOK_CACHE_FORMAT = 1
+
 # ---------------- Exact headers from your sheet ----------------
 EXACT_HEADERS = {
     "row_id": "TD Number",                     # used as the unique key (renamed to td_number in canon)
@@ -34,37 +47,60 @@ EXACT_HEADERS = {
     "comments": "Comments",
 }
 
+# Column widths (characters) for exported workbooks, keyed like EXACT_HEADERS
+EXPORT_COLUMN_WIDTHS = {
+    "row_id": 12,
+    "psur_number": 14,
+    "class": 8,
+    "type": 10,
+    "product_name": 40,
+    "catalog_number": 20,
+    "writer": 18,
+    "email": 28,
+    "start_period": 12,
+    "end_period": 12,
+    "frequency": 10,
+    "due_date": 12,
+    "status": 14,
+    "canada_needed": 14,
+    "canada_status": 14,
+    "comments": 50,
+}
+
+# Written as real Excel dates rather than text
+EXPORT_DATE_COLUMNS = frozenset({"start_period", "end_period", "due_date"})
+
 def norm(s: Any) -> str:
     """Normalize string for comparison"""
     s = "" if s is None else str(s)
     return re.sub(r"[^a-z0-9]+", "", s.strip().lower())
 
+def _header_score(columns) -> int:
+    return sum(h in columns for h in EXACT_HEADERS.values())
+
 def read_excel_auto(path: str) -> Tuple[pd.DataFrame, Dict[str, str]]:
-    """Auto-detect and read Excel with exact header mapping"""
-    xl = pd.ExcelFile(path)
-    best_df, best_score = None, -1
-    best_map = {}
-
-    # Try every sheet, pick the one that contains all the exact headers
-    for sheet in xl.sheet_names:
-        df = pd.read_excel(path, sheet_name=sheet)
-        if df.empty:
-            continue
-        have_all = all(h in df.columns for h in EXACT_HEADERS.values())
-        score = sum(h in df.columns for h in EXACT_HEADERS.values())
-        if have_all and score > best_score:
-            best_df = df.copy()
-            best_score = score
-    if best_df is None:
-        # fallback: pick the sheet with max overlap
+    """Auto-detect and read Excel with exact header mapping.
+
+    The workbook is opened once. Only the header row of each sheet is read to
+    score it against EXACT_HEADERS; just the winning sheet is then parsed in
+    full, restricted to the mapped columns.
+    """
+    import pandas as pd
+
+    with pd.ExcelFile(path) as xl:
+        best_sheet, best_score = None, -1
         for sheet in xl.sheet_names:
-            df = pd.read_excel(path, sheet_name=sheet)
-            score = sum(h in df.columns for h in EXACT_HEADERS.values())
+            columns = set(xl.parse(sheet, nrows=0).columns)
+            score = _header_score(columns)
             if score > best_score:
-                best_df = df.copy(); best_score = score
-        if best_df is None:
+                best_sheet, best_score = sheet, score
+        if best_sheet is None:
             raise RuntimeError("Workbook has no readable sheets")
 
+        wanted = set(EXACT_HEADERS.values())
+        usecols = (lambda col: col in wanted) if best_score > 0 else None
+        best_df = xl.parse(best_sheet, usecols=usecols)
+
     # Use exact header map where present
     best_map = {k: v for k, v in EXACT_HEADERS.items() if v in best_df.columns}
 
@@ -82,8 +118,76 @@ def read_excel_auto(path: str) -> Tuple[pd.DataFrame, Dict[str, str]]:
 
     return best_df, best_map
 
+def _file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _workbook_cache_path(path: Path) -> Path:
+    key = hashlib.blake2b(str(path).encode("utf-8"), digest_size=10).hexdigest()
+    return WORKBOOK_CACHE_DIR / f"{path.stem[:40]}-{key}.pkl"
+
+def _load_workbook_cache(cache_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with cache_path.open("rb") as fh:
+            entry = pickle.load(fh)
+    except Exception:
+        return None
+    if not isinstance(entry, dict) or entry.get("format") != WORKBOOK_CACHE_FORMAT:
+        return None
+    return entry
+
+def _store_workbook_cache(cache_path: Path, entry: Dict[str, Any]) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(f".tmp-{os.getpid()}")
+        with tmp.open("wb") as fh:
+            pickle.dump(entry, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        print(f"⚠️  Could not write workbook cache {cache_path}: {e}")
+
+def read_excel_cached(path: str) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """read_excel_auto behind a sidecar pickle cache.
+
+    The cache entry is keyed by the workbook's resolved path and fingerprinted
+    by size, mtime and content digest. A size/mtime match is a hit without
+    touching the workbook bytes; if only the mtime moved (file copied or
+    re-saved unchanged) the digest decides. Anything else re-parses the
+    workbook and rewrites the cache.
+    """
+    source = Path(path).resolve()
+    st = source.stat()
+    cache_path = _workbook_cache_path(source)
+    entry = _load_workbook_cache(cache_path)
+
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["df"].copy(), dict(entry["colmap"])
+
+    digest = _file_digest(source)
+    if entry and entry["size"] == st.st_size and entry["digest"] == digest:
+        entry["mtime_ns"] = st.st_mtime_ns
+        _store_workbook_cache(cache_path, entry)
+        return entry["df"].copy(), dict(entry["colmap"])
+
+    df, colmap = read_excel_auto(str(source))
+    _store_workbook_cache(cache_path, {
+        "format": WORKBOOK_CACHE_FORMAT,
+        "path": str(source),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "digest": digest,
+        "df": df,
+        "colmap": colmap,
+    })
+    return df.copy(), dict(colmap)
+
 def canon_record(row, colmap: Dict[str, str]) -> Dict[str, Any]:
     """Convert a DataFrame row to canonical dict format"""
+    import pandas as pd
+
     out = {}
     for ckey, actual_col in colmap.items():
         val = row.get(actual_col)
@@ -99,10 +203,66 @@ def canon_record(row, colmap: Dict[str, str]) -> Dict[str, Any]:
         out["td_number"] = out.pop("row_id")
     return out
 
+def canon_frame(df: pd.DataFrame, colmap: Dict[str, str]) -> pd.DataFrame:
+    """Column-wise canon_record for a whole sheet.
+
+    Returns one string column per canonical key (row_id renamed to
+    td_number), with "" for missing cells and ISO text for dates.
+    """
+    import pandas as pd
+
+    out = {}
+    for ckey, actual_col in colmap.items():
+        col = df[actual_col]
+        missing = col.isna()
+        if pd.api.types.is_datetime64_any_dtype(col):
+            text = col.dt.strftime("%Y-%m-%dT%H:%M:%S")
+        else:
+            # date objects stringify to their ISO form
+            text = col.astype(str)
+        out["td_number" if ckey == "row_id" else ckey] = text.mask(missing, "")
+    return pd.DataFrame(out, index=df.index)
+
+def _excel_value(key: str, value: Any) -> Any:
+    if value is None or value == "":
+        return None
+    if key in EXPORT_DATE_COLUMNS and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).date()
+        except ValueError:
+            return value
+    return value
+
+def write_records_xlsx(path: str, records: Iterable[Dict[str, Any]], columns: Sequence[str]) -> int:
+    """Stream canonical records into an .xlsx in openpyxl write-only mode.
+
+    Rows are written as they arrive, so memory stays flat however many
+    records there are. Known columns get their EXACT_HEADERS label and
+    preset width; date columns are written as Excel dates. Returns the
+    number of data rows written.
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    keys = ["row_id" if col == "td_number" else col for col in columns]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("PSUR Schedule")
+    for i, key in enumerate(keys, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = EXPORT_COLUMN_WIDTHS.get(key, 12)
+    ws.append([EXACT_HEADERS.get(key, key) for key in keys])
+
+    count = 0
+    for record in records:
+        ws.append([_excel_value(key, record.get(col)) for key, col in zip(keys, columns)])
+        count += 1
+    wb.save(path)
+    return count
+
 def save_with_backup(df: pd.DataFrame, path: str):
     """Save DataFrame to Excel with timestamped backup"""
     ts = datetime.now().strftime("%Y%m%d%H%M%S")
     bak = path.replace(".xlsx", f".bak-{ts}.xlsx")
-    df.to_excel(bak, index=False)
     df.to_excel(path, index=False)
+    # Backup is a byte copy of the file just written, not a second render
+    shutil.copyfile(path, bak)
     print(f"Saved to {path} (backup: {bak})")
@@ -0,0 +1,85 @@
+"""
+Incremental CSV / NDJSON encoders for streaming exports
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+# Flush encoded rows once this many bytes are buffered
+CHUNK_BYTES = 64 * 1024
+
+
+class _Sink:
+    """Collects encoded bytes, optionally gzip-compressing them on the fly."""
+
+    def __init__(self, compress: bool):
+        # wbits=31 writes a gzip header/trailer rather than a raw zlib stream
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> None:
+        if self._gzip is not None:
+            data = self._gzip.compress(data)
+        self._buffer += data
+
+    def ready(self) -> bool:
+        return len(self._buffer) >= CHUNK_BYTES
+
+    def drain(self, *, final: bool = False, sync: bool = False) -> bytes:
+        if self._gzip is not None and (final or sync):
+            self._buffer += self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        out = bytes(self._buffer)
+        self._buffer.clear()
+        return out
+
+
+def csv_chunks(
+    rows: Iterable[Dict[str, Any]],
+    fieldnames: Sequence[str],
+    *,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Yield UTF-8 CSV for ``rows`` in ~CHUNK_BYTES pieces, header first."""
+    sink = _Sink(compress)
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=list(fieldnames), extrasaction="ignore")
+
+    def take() -> bytes:
+        data = text.getvalue().encode("utf-8")
+        text.seek(0)
+        text.truncate()
+        return data
+
+    writer.writeheader()
+    sink.write(take())
+    # Send the header right away so clients see the first byte immediately
+    yield sink.drain(sync=True)
+    for row in rows:
+        writer.writerow(row)
+        sink.write(take())
+        if sink.ready():
+            yield sink.drain()
+    tail = sink.drain(final=True)
+    if tail:
+        yield tail
+
+
+def ndjson_chunks(
+    rows: Iterable[Dict[str, Any]],
+    *,
+    fieldnames: Optional[Sequence[str]] = None,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Yield one JSON object per line for ``rows`` in ~CHUNK_BYTES pieces."""
+    sink = _Sink(compress)
+    for row in rows:
+        if fieldnames is not None:
+            row = {name: row.get(name) for name in fieldnames}
+        sink.write(json.dumps(row, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+        if sink.ready():
+            yield sink.drain()
+    tail = sink.drain(final=True)
+    if tail:
+        yield tail
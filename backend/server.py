@@ -1,17 +1,17 @@
 # server.py
 import os, re
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Tuple
 
-import pandas as pd
 import httpx
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Body, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from .db_universal import get_store
+from .async_store import close_async_store, get_async_store
 from .excel_utils import EXACT_HEADERS, PSUR_SCHEDULE_PATH, read_excel_auto, canon_record, save_with_backup
 
 load_dotenv()
@@ -129,7 +129,12 @@ def classify_intent(text: str) -> str:
             return intent
     return "UNKNOWN"
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    close_async_store()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for live updates
 app.add_middleware(
@@ -155,6 +160,7 @@ def canonicalize_updates(updates: Dict[str, Any], m: Dict[str, str]) -> Dict[str
         actual = m.get(k, k)  # if already an exact header, this is a no-op
         out[actual] = v
     # date coercion for known fields
+    import pandas as pd
     for k in list(out.keys()):
         if any(tok in k.lower() for tok in ["date", "due", "period"]) and out[k]:
             try:
@@ -230,14 +236,18 @@ async def create_ephemeral_session():
             {"type":"function","name":"get_all_duplicates","description":"Get all records sharing the same TD Number.","parameters":{"type":"object","properties":{"td_number":{"type":"string"}},"required":["td_number"]}},
             {"type":"function","name":"get_field_value","description":"Get a specific field value from a record.","parameters":{"type":"object","properties":{"row_id":{"type":"string"},"field_name":{"type":"string"}},"required":["row_id","field_name"]}},
             {"type":"function","name":"find_reports","description":"Hybrid/semantic search across TD Number, PSURNumber, Product Name, Catalog Number, Writer, Class, Status.","parameters":{"type":"object","properties":{"query":{"type":"string"},"limit":{"type":"integer","default":50}},"required":["query"]}},
-            {"type":"function","name":"list_reports","description":"List reports with optional filters and pagination.","parameters":{"type":"object","properties":{"offset":{"type":"integer","default":0},"limit":{"type":"integer","default":100},"filters":{"type":"object","additionalProperties":True}}}},
+            {"type":"function","name":"list_reports","description":"List reports with optional filters and pagination.","parameters":{"type":"object","properties":{"offset":{"type":"integer","default":0},"limit":{"type":"integer","default":100},"cursor":{"type":"string","description":"next_cursor from the previous page"},"filters":{"type":"object","additionalProperties":True}}}},
             {"type":"function","name":"list_due_items","description":"Items due within N days; optional filters.","parameters":{"type":"object","properties":{"within_days":{"type":"integer","default":60},"classification":{"type":"string"},"writer":{"type":"string"},"status":{"type":"string"}}}},
             {"type":"function","name":"list_overdue_items","description":"Items past their Due Date; optional filters.","parameters":{"type":"object","properties":{"classification":{"type":"string"},"writer":{"type":"string"}}}},
-            {"type":"function","name":"list_by_writer","description":"List items for a writer; optional status filter.","parameters":{"type":"object","properties":{"writer":{"type":"string"},"status":{"type":"string"}},"required":["writer"]}},
-            {"type":"function","name":"list_by_class_type","description":"List by Class/Type; optional status filter.","parameters":{"type":"object","properties":{"classification":{"type":"string"},"type":{"type":"string"},"status":{"type":"string"}}}},
-            {"type":"function","name":"list_by_status","description":"List all reports with a specific status.","parameters":{"type":"object","properties":{"status":{"type":"string"}},"required":["status"]}},
+            {"type":"function","name":"list_by_writer","description":"List items for a writer; optional status filter.","parameters":{"type":"object","properties":{"writer":{"type":"string"},"status":{"type":"string"},"include_archived":{"type":"boolean","default":False}},"required":["writer"]}},
+            {"type":"function","name":"list_by_class_type","description":"List by Class/Type; optional status filter.","parameters":{"type":"object","properties":{"classification":{"type":"string"},"type":{"type":"string"},"status":{"type":"string"},"include_archived":{"type":"boolean","default":False}}}},
+            {"type":"function","name":"list_by_status","description":"List all reports with a specific status. Released reports from past cycles are archived; set include_archived for history.","parameters":{"type":"object","properties":{"status":{"type":"string"},"include_archived":{"type":"boolean","default":False}},"required":["status"]}},
+            {"type":"function","name":"list_due_between","description":"Items due between two dates (inclusive), in due order, with counts per bucket (day/week/month/quarter/year).","parameters":{"type":"object","properties":{"start_date":{"type":"string"},"end_date":{"type":"string"},"bucket":{"type":"string","enum":["day","week","month","quarter","year"],"default":"month"},"include_archived":{"type":"boolean","default":False}},"required":["start_date","end_date"]}},
+            {"type":"function","name":"list_due_in_period","description":"Items due this/next/last week, month, quarter or year (offset 0/1/-1), relative to anchor_date (default today). For a specific quarter like Q3 pass any date in it as anchor_date.","parameters":{"type":"object","properties":{"period":{"type":"string","enum":["week","month","quarter","year"]},"offset":{"type":"integer","default":0},"anchor_date":{"type":"string"},"include_archived":{"type":"boolean","default":False}},"required":["period"]}},
+            {"type":"function","name":"list_by_year","description":"Reports due in a year or range of years; include_archived for past cycles.","parameters":{"type":"object","properties":{"start_year":{"type":"integer"},"end_year":{"type":"integer"},"include_archived":{"type":"boolean","default":False}},"required":["start_year"]}},
             {"type":"function","name":"list_by_product","description":"Find all reports for a product name.","parameters":{"type":"object","properties":{"product_name":{"type":"string"}},"required":["product_name"]}},
             {"type":"function","name":"list_missing_fields","description":"Find rows missing any of the given fields.","parameters":{"type":"object","properties":{"fields":{"type":"array","items":{"type":"string"}}},"required":["fields"]}},
+            {"type":"function","name":"data_health","description":"Data quality: per-field completeness, invalid dates and duplicate TD Numbers, with sample TD Numbers.","parameters":{"type":"object","properties":{"sample_size":{"type":"integer","default":5}}}},
             {"type":"function","name":"get_stats","description":"Get database statistics (counts by status, class, writer, overdue, duplicates).","parameters":{"type":"object","properties":{}}},
             {"type":"function","name":"compute_expected_due_date","description":"Compute expected due given End Period & Frequency.","parameters":{"type":"object","properties":{"end_period":{"type":"string"},"frequency":{"type":"string"},"buffer_days":{"type":"integer","default":0}},"required":["end_period","frequency"]}},
             {"type":"function","name":"validate_row","description":"Compliance checks for a single row.","parameters":{"type":"object","properties":{"row_id":{"type":"string"},"psur_id":{"type":"string"}}}},
@@ -257,11 +267,12 @@ async def create_ephemeral_session():
             {"type":"function","name":"add_psur_item","description":"Create a new row (auto TD if omitted).","parameters":{"type":"object","properties":{"td_number":{"type":"string"},"psur_number":{"type":"string"},"class":{"type":"string"},"type":{"type":"string"},"product_name":{"type":"string"},"catalog_number":{"type":"string"},"writer":{"type":"string"},"email":{"type":"string"},"start_period":{"type":"string"},"end_period":{"type":"string"},"frequency":{"type":"string"},"due_date":{"type":"string"},"status":{"type":"string"},"canada_needed":{"type":"string"},"canada_status":{"type":"string"},"comments":{"type":"string"}}}},
             {"type":"function","name":"delete_report","description":"Delete a report by TD Number (removes ALL records with that TD).","parameters":{"type":"object","properties":{"row_id":{"type":"string"}},"required":["row_id"]}},
             {"type":"function","name":"clone_report","description":"Duplicate a report with a new TD Number.","parameters":{"type":"object","properties":{"source_td":{"type":"string"},"new_td":{"type":"string"},"modifications":{"type":"object","additionalProperties":True}},"required":["source_td"]}},
+            {"type":"function","name":"get_comments","description":"Most recent comments/links on a row, newest first.","parameters":{"type":"object","properties":{"row_id":{"type":"string"},"limit":{"type":"integer","default":10}},"required":["row_id"]}},
             {"type":"function","name":"link_references","description":"Attach MC/SharePoint URLs to a row.","parameters":{"type":"object","properties":{"row_id":{"type":"string"},"mastercontrol_url":{"type":"string"},"sharepoint_url":{"type":"string"}},"required":["row_id"]}},
             {"type":"function","name":"export_calendar","description":"Export ICS of items (returns file URL).","parameters":{"type":"object","properties":{"filter":{"type":"object","additionalProperties":True},"within_days":{"type":"integer"},"filename":{"type":"string","default":"psur_schedule.ics"}}}},
             {"type":"function","name":"export_csv","description":"Export CSV (returns file URL).","parameters":{"type":"object","properties":{"filter":{"type":"object","additionalProperties":True},"filename":{"type":"string","default":"psur_export.csv"}}}},
             {"type":"function","name":"export_excel","description":"Export Excel workbook (returns file URL).","parameters":{"type":"object","properties":{"filter":{"type":"object","additionalProperties":True},"filename":{"type":"string","default":"psur_export.xlsx"}}}},
-            {"type":"function","name":"reload_from_excel","description":"Reload all data from the source Excel file.","parameters":{"type":"object","properties":{}}}
+            {"type":"function","name":"reload_from_excel","description":"Reload data from the source Excel file (only changed rows are written).","parameters":{"type":"object","properties":{}}}
         ]
     }
     async with httpx.AsyncClient(timeout=15.0) as client:
@@ -292,9 +303,18 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         connected_clients.remove(websocket)
 
+# Events that report a change to the records. Only these carry the data
+# version, so clients can resume /data/changes from it.
+DATA_EVENTS = frozenset({
+    "add", "update", "delete", "bulk_update", "changes", "reload", "archive",
+    "auto_schedule", "comment", "link",
+})
+
 async def broadcast_update(event_type: str, data: Any):
     """Broadcast updates to all connected clients"""
     message = {"type": event_type, "data": data}
+    if event_type in DATA_EVENTS:
+        message["version"] = await get_async_store().data_version()
     disconnected = set()
     for client in connected_clients:
         try:
@@ -306,25 +326,94 @@ async def broadcast_update(event_type: str, data: Any):
 
 # ---------------- JSON Data Store Endpoints ----------------
 @app.get("/data/all")
-async def get_all_data():
-    """Get all records from JSON store"""
-    store = get_store()
-    items = store.get_all()
-    return {"items": items, "count": len(items), "metadata": store.metadata}
+async def get_all_data(limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Get all records, or one keyset page when limit/cursor is given"""
+    store = get_async_store()
+    if limit is None and cursor is None:
+        # Read the version first: replaying changes since it may repeat some, never miss any
+        version = await store.data_version()
+        items = await store.get_all()
+        return {"items": items, "count": len(items), "version": version, "metadata": store.metadata}
+    try:
+        page = await store.page_records(limit=limit or 100, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "metadata": store.metadata}
+
+def _stream_export(chunks, media_type: str, filename: str, compress: bool) -> StreamingResponse:
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@app.get("/data/export.csv")
+async def stream_csv(
+    writer: Optional[str] = None,
+    classification: Optional[str] = None,
+    status: Optional[str] = None,
+    within_days: Optional[int] = None,
+    overdue_only: bool = False,
+    gzip: bool = False,
+):
+    """Stream filtered records as CSV without building the file in memory"""
+    filters = {"writer": writer, "classification": classification, "status": status,
+               "within_days": within_days, "overdue_only": overdue_only}
+    chunks = await get_async_store().iter_csv(filters, compress=gzip)
+    return _stream_export(chunks, "text/csv; charset=utf-8", "psur_export.csv", gzip)
+
+@app.get("/data/export.ndjson")
+async def stream_ndjson(
+    writer: Optional[str] = None,
+    classification: Optional[str] = None,
+    status: Optional[str] = None,
+    within_days: Optional[int] = None,
+    overdue_only: bool = False,
+    gzip: bool = False,
+):
+    """Stream filtered records as newline-delimited JSON"""
+    filters = {"writer": writer, "classification": classification, "status": status,
+               "within_days": within_days, "overdue_only": overdue_only}
+    chunks = await get_async_store().iter_ndjson(filters, compress=gzip)
+    return _stream_export(chunks, "application/x-ndjson", "psur_export.ndjson", gzip)
+
+@app.get("/data/changes")
+async def get_changes(since: int = 0, limit: int = 1000):
+    """Journalled record changes after a data version (see /data/all "version")"""
+    return await get_async_store().changes_since(since, limit=limit)
+
+@app.get("/data/health")
+async def get_data_health(sample: int = 5):
+    """Per-field completeness, invalid dates and duplicates with sample TD Numbers"""
+    return await get_async_store().data_health(sample)
 
 @app.get("/data/stats")
 async def get_stats():
     """Get statistics about the data"""
-    store = get_store()
-    return store.get_stats()
+    store = get_async_store()
+    return await store.get_stats()
 
 @app.post("/data/reload")
-async def reload_from_excel():
-    """Reload data from Excel file"""
-    store = get_store()
-    store.convert_from_excel()
-    await broadcast_update("reload", {"count": len(store.data)})
-    return {"ok": True, "count": len(store.data)}
+async def reload_from_excel(full: bool = False):
+    """Reload data from Excel file (incremental unless full=true)"""
+    store = get_async_store()
+    if full:
+        count = await store.import_from_excel()
+        await broadcast_update("reload", {"count": count})
+        return {"ok": True, "count": count}
+    changes = await store.sync_from_excel()
+    await broadcast_update("changes", changes)
+    return {"ok": True, **changes}
+
+@app.post("/data/archive")
+async def archive_released(horizon_days: Optional[int] = None):
+    """Move Released/closed reports past the horizon to the archive table"""
+    store = get_async_store()
+    if not hasattr(store.sync, "archive_released"):
+        # Convex keeps a single table; there is nothing to archive into.
+        raise HTTPException(status_code=501, detail="Archiving is only supported by the SQLite store")
+    count = await store.archive_released(horizon_days)
+    await broadcast_update("archive", {"count": count})
+    return {"ok": True, "count": count}
 
 # ---------------- Debug Tool Call Endpoint ----------------
 @app.post("/test-tool")
@@ -376,6 +465,7 @@ def parse_date(date_str):
     """Parse date string into date object"""
     if not date_str:
         return None
+    import pandas as pd
     try:
         if isinstance(date_str, str):
             return pd.to_datetime(date_str).date()
@@ -456,7 +546,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
     conversation_history.append(dialog_entry)
     await broadcast_update("dialog", dialog_entry)
     
-    store = get_store()
+    store = get_async_store()
 
     try:
         if name == "list_due_items":
@@ -481,7 +571,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not query:
                 return {"items": [], "count": 0}
             
-            items = store.find_by_query(query, limit)
+            items = await store.find_by_query(query, limit)
             return {"items": items, "count": len(items)}
 
         elif name == "get_report":
@@ -490,10 +580,11 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id:
                 return {"error": "row_id (TD Number) required"}
             
-            item = store.find_by_td(row_id)
+            item = await store.find_by_td(row_id)
             if not item:
                 result = {"items": [], "count": 0, "message": f"No record found for TD Number {row_id}"}
             else:
+                await store.attach_comments([item], 5)
                 result = {"items": [item], "count": 1}
             
             print(f"📊 GET_REPORT RESULT: {result}")
@@ -526,7 +617,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
 
             if not canonical_updates:
                 return {"error": "No valid fields provided to update"}
-            success = store.update_record(row_id, canonical_updates)
+            success = await store.update_record(row_id, canonical_updates)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
 
@@ -534,13 +625,13 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             new_status = canonical_updates.get("status", "").strip()
             if new_status.lower() in ["released", "completed"]:
                 # Check if record has the required fields for auto-generation
-                record = store.find_by_td(row_id)
+                record = await store.find_by_td(row_id)
                 if record and record.get("end_period"):
                     # Check if next schedule already exists
-                    child_schedules = store.get_child_schedules(row_id)
+                    child_schedules = await store.get_child_schedules(row_id)
                     if not child_schedules:
                         # Generate next schedule
-                        result = store.generate_next_schedule(row_id)
+                        result = await store.generate_next_schedule(row_id)
                         if result and result.get("success"):
                             print(f"✅ Auto-generated next schedule: {result.get('new_td_number')} (year {result.get('year')})")
                             # Broadcast the new schedule creation
@@ -573,7 +664,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
                 if field in args and field not in new_record:
                     new_record[field] = args[field]
             
-            td_number = store.add_record(new_record)
+            td_number = await store.add_record(new_record)
             
             # Broadcast new item to connected clients
             await broadcast_update("add", {"td_number": td_number, "record": new_record})
@@ -590,7 +681,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not psur_id:
                 return {"error": "psur_id required"}
             
-            item = store.find_by_psur(psur_id)
+            item = await store.find_by_psur(psur_id)
             if not item:
                 return {"items": [], "count": 0}
             return {"items": [item], "count": 1}
@@ -600,7 +691,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not td_number:
                 return {"error": "td_number required"}
             
-            items = store.find_all_by_td(td_number)
+            items = await store.find_all_by_td(td_number)
             return {"items": items, "count": len(items)}
 
         elif name == "get_field_value":
@@ -609,7 +700,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id or not field_name:
                 return {"error": "row_id and field_name required"}
             
-            item = store.find_by_td(row_id)
+            item = await store.find_by_td(row_id)
             if not item:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -620,17 +711,16 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             offset = int(args.get("offset", 0))
             limit = int(args.get("limit", 100))
             filters = args.get("filters") or {}
-            
-            items = store.filter_records(**filters)
-            # Apply pagination
-            paginated = items[offset:offset + limit]
-            return {"items": paginated, "count": len(paginated), "total": len(items)}
+            try:
+                return await store.page_records(filters, limit=limit, cursor=args.get("cursor"), offset=offset)
+            except ValueError as e:
+                return {"error": str(e)}
 
         elif name == "list_overdue_items":
             classification = args.get("classification")
             writer = args.get("writer")
             
-            items = store.filter_records(
+            items = await store.filter_records(
                 classification=classification,
                 writer=writer,
                 overdue_only=True
@@ -643,7 +733,11 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not writer:
                 return {"error": "writer required"}
             
-            items = store.filter_records(writer=writer, status=status)
+            items = await store.filter_records(
+                writer=writer,
+                status=status,
+                include_archived=bool(args.get("include_archived", False))
+            )
             return {"items": items, "count": len(items)}
 
         elif name == "list_by_class_type":
@@ -651,10 +745,11 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             type_filter = args.get("type")
             status = args.get("status")
             
-            items = store.filter_records(
+            items = await store.filter_records(
                 classification=classification,
                 type=type_filter,
-                status=status
+                status=status,
+                include_archived=bool(args.get("include_archived", False))
             )
             return {"items": items, "count": len(items)}
 
@@ -663,7 +758,54 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not status:
                 return {"error": "status required"}
             
-            items = store.filter_records(status=status)
+            items = await store.filter_records(
+                status=status,
+                include_archived=bool(args.get("include_archived", False))
+            )
+            return {"items": items, "count": len(items)}
+
+        elif name == "list_due_between":
+            start_date = (args.get("start_date") or "").strip()
+            end_date = (args.get("end_date") or "").strip()
+            if not start_date or not end_date:
+                return {"error": "start_date and end_date required"}
+            include_archived = bool(args.get("include_archived", False))
+
+            try:
+                items = await store.records_due_between(start_date, end_date, include_archived=include_archived)
+                buckets = await store.due_bucket_counts(
+                    start_date, end_date, args.get("bucket") or "month", include_archived=include_archived
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+            return {"items": items, "count": len(items), "buckets": buckets}
+
+        elif name == "list_due_in_period":
+            period = str(args.get("period") or "").strip().lower()
+            if not period:
+                return {"error": "period required"}
+
+            try:
+                return await store.due_in_period(
+                    period,
+                    offset=int(args.get("offset", 0)),
+                    anchor=args.get("anchor_date") or None,
+                    include_archived=bool(args.get("include_archived", False))
+                )
+            except ValueError as e:
+                return {"error": str(e)}
+
+        elif name == "list_by_year":
+            start_year = args.get("start_year")
+            if start_year is None:
+                return {"error": "start_year required"}
+            end_year = args.get("end_year")
+
+            items = await store.get_schedule_for_years(
+                int(start_year),
+                int(end_year) if end_year is not None else None,
+                include_archived=bool(args.get("include_archived", False))
+            )
             return {"items": items, "count": len(items)}
 
         elif name == "list_by_product":
@@ -671,7 +813,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not product_name:
                 return {"error": "product_name required"}
             
-            items = store.find_by_query(product_name, limit=500)
+            items = await store.find_by_query(product_name, limit=500)
             return {"items": items, "count": len(items)}
 
         elif name == "list_missing_fields":
@@ -679,11 +821,23 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not fields:
                 return {"error": "fields array required"}
             
-            items = store.find_missing_fields(fields)
+            # Accept exact headers ("Writer", "Due Date") as well as canonical names
+            headers = {exact.lower(): canon for canon, exact in EXACT_HEADERS.items()}
+            headers["td number"] = "td_number"
+            fields = [headers.get(str(field).strip().lower(), str(field).strip()) for field in fields]
+            fields = ["td_number" if field == "row_id" else field for field in fields]
+
+            try:
+                items = await store.find_missing_fields(fields)
+            except ValueError as e:
+                return {"error": str(e)}
             return {"items": items, "count": len(items)}
 
+        elif name == "data_health":
+            return await store.data_health(int(args.get("sample_size", 5)))
+
         elif name == "get_stats":
-            return store.get_stats()
+            return await store.get_stats()
 
         elif name == "compute_expected_due_date":
             end_period = args.get("end_period")
@@ -698,9 +852,9 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             psur_id = args.get("psur_id")
             
             if row_id:
-                item = store.find_by_td(row_id)
+                item = await store.find_by_td(row_id)
             elif psur_id:
-                item = store.find_by_psur(psur_id)
+                item = await store.find_by_psur(psur_id)
             else:
                 return {"error": "row_id or psur_id required"}
             
@@ -714,9 +868,9 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             psur_id = args.get("psur_id")
             
             if row_id:
-                item = store.find_by_td(row_id)
+                item = await store.find_by_td(row_id)
             elif psur_id:
-                item = store.find_by_psur(psur_id)
+                item = await store.find_by_psur(psur_id)
             else:
                 return {"error": "row_id or psur_id required"}
             
@@ -731,7 +885,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not new_status:
                 return {"error": "new_status required"}
             
-            count = store.bulk_update_status(filter_criteria, new_status)
+            count = await store.bulk_update_status(filter_criteria, new_status)
             await broadcast_update("bulk_update", {"filter": filter_criteria, "new_status": new_status, "count": count})
             return {"ok": True, "updated_count": count}
 
@@ -742,7 +896,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id or not field_name:
                 return {"error": "row_id and field_name required"}
             
-            success = store.update_record(row_id, {field_name: field_value})
+            success = await store.update_record(row_id, {field_name: field_value})
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -755,7 +909,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id or not status:
                 return {"error": "row_id and status required"}
             
-            success = store.update_record(row_id, {"status": status})
+            success = await store.update_record(row_id, {"status": status})
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -773,7 +927,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if email:
                 updates["email"] = email
             
-            success = store.update_record(row_id, updates)
+            success = await store.update_record(row_id, updates)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -786,7 +940,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id or not due_date:
                 return {"error": "row_id and due_date required"}
             
-            success = store.update_record(row_id, {"due_date": due_date})
+            success = await store.update_record(row_id, {"due_date": due_date})
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -809,7 +963,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not updates:
                 return {"error": "start_period or end_period required"}
             
-            success = store.update_record(row_id, updates)
+            success = await store.update_record(row_id, updates)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -832,7 +986,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not updates:
                 return {"error": "canada_needed or canada_status required"}
             
-            success = store.update_record(row_id, updates)
+            success = await store.update_record(row_id, updates)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -846,17 +1000,14 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not new_writer:
                 return {"error": "new_writer required"}
             
-            records = store.filter_records(**filter_criteria)
-            count = 0
-            for record in records:
-                updates = {"writer": new_writer}
-                if new_email:
-                    updates["email"] = new_email
-                if store.update_record(record["td_number"], updates):
-                    count += 1
+            updates = {"writer": new_writer}
+            if new_email:
+                updates["email"] = new_email
+            changed = await store.bulk_update(filter_criteria, updates)
+            td_numbers = [record["td_number"] for record in changed]
             
-            await broadcast_update("bulk_update", {"filter": filter_criteria, "writer": new_writer, "count": count})
-            return {"ok": True, "updated_count": count}
+            await broadcast_update("bulk_update", {"filter": filter_criteria, "writer": new_writer, "count": len(changed), "td_numbers": td_numbers})
+            return {"ok": True, "updated_count": len(changed), "td_numbers": td_numbers}
 
         elif name == "bulk_update_field":
             filter_criteria = args.get("filter") or {}
@@ -865,14 +1016,11 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not field_name:
                 return {"error": "field_name required"}
             
-            records = store.filter_records(**filter_criteria)
-            count = 0
-            for record in records:
-                if store.update_record(record["td_number"], {field_name: field_value}):
-                    count += 1
+            changed = await store.bulk_update(filter_criteria, {field_name: field_value})
+            td_numbers = [record["td_number"] for record in changed]
             
-            await broadcast_update("bulk_update", {"filter": filter_criteria, "field": field_name, "value": field_value, "count": count})
-            return {"ok": True, "updated_count": count}
+            await broadcast_update("bulk_update", {"filter": filter_criteria, "field": field_name, "value": field_value, "count": len(changed), "td_numbers": td_numbers})
+            return {"ok": True, "updated_count": len(changed), "td_numbers": td_numbers}
 
         elif name == "clear_field":
             row_id = str(args.get("row_id") or "").strip()
@@ -880,7 +1028,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id or not field_name:
                 return {"error": "row_id and field_name required"}
             
-            success = store.update_record(row_id, {field_name: ""})
+            success = await store.update_record(row_id, {field_name: ""})
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -892,7 +1040,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id:
                 return {"error": "row_id required"}
             
-            success = store.delete_record(row_id)
+            success = await store.delete_record(row_id)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -906,7 +1054,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not source_td:
                 return {"error": "source_td required"}
             
-            source = store.find_by_td(source_td)
+            source = await store.find_by_td(source_td)
             if not source:
                 return {"error": f"Source TD {source_td} not found"}
             
@@ -925,7 +1073,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             # Apply modifications
             new_record.update(modifications)
             
-            created_td = store.add_record(new_record)
+            created_td = await store.add_record(new_record)
             await broadcast_update("add", {"td_number": created_td, "cloned_from": source_td})
             return {"ok": True, "td_number": created_td}
 
@@ -935,13 +1083,20 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id or not comment:
                 return {"error": "row_id and comment required"}
             
-            success = store.add_comment(row_id, comment)
+            success = await store.add_comment(row_id, comment)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
             await broadcast_update("comment", {"td_number": row_id, "comment": comment})
             return {"ok": True}
 
+        elif name == "get_comments":
+            row_id = str(args.get("row_id") or "").strip()
+            if not row_id:
+                return {"error": "row_id required"}
+            comments = await store.get_comments(row_id, int(args.get("limit", 10)))
+            return {"td_number": row_id, "comments": comments, "count": len(comments)}
+
         elif name == "link_references":
             row_id = str(args.get("row_id") or "").strip()
             mc_url = args.get("mastercontrol_url")
@@ -949,7 +1104,7 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             if not row_id:
                 return {"error": "row_id required"}
             
-            success = store.link_references(row_id, mc_url, sp_url)
+            success = await store.link_references(row_id, mc_url, sp_url)
             if not success:
                 return {"error": f"TD Number {row_id} not found"}
             
@@ -961,28 +1116,33 @@ async def tool_entry(payload: Dict[str, Any] = Body(...)):
             within_days = args.get("within_days")
             filename = args.get("filename", "psur_schedule.ics")
             
-            file_url = store.export_calendar(filter_criteria, within_days, filename)
+            file_url = await store.export_calendar(filter_criteria, within_days, filename)
             return {"file_url": file_url}
 
         elif name == "export_csv":
             filter_criteria = args.get("filter") or {}
             filename = args.get("filename", "psur_export.csv")
             
-            file_url = store.export_csv(filter_criteria, filename)
+            file_url = await store.export_csv(filter_criteria, filename)
             return {"file_url": file_url}
 
         elif name == "export_excel":
             filter_criteria = args.get("filter") or {}
             filename = args.get("filename", "psur_export.xlsx")
             
-            records = store.filter_records(**filter_criteria) if filter_criteria else None
-            file_url = store.export_excel(records, filename)
+            file_url = await store.export_excel(None, filename, filters=filter_criteria)
             return {"file_url": file_url}
 
         elif name == "reload_from_excel":
-            count = store.import_from_excel()
-            await broadcast_update("reload", {"count": count})
-            return {"ok": True, "loaded_count": count}
+            changes = await store.sync_from_excel()
+            await broadcast_update("changes", changes)
+            return {
+                "ok": True,
+                "inserted_count": len(changes["inserted"]),
+                "updated_count": len(changes["updated"]),
+                "deleted_count": len(changes["deleted"]),
+                "unchanged_count": changes["unchanged"],
+            }
 
         else:
             return {"error": f"Unknown tool {name}"}
@@ -1050,7 +1210,7 @@ async def clear_dialog():
 # ---------------- Diagnostics for UI ----------------
 @app.get("/schedule/health")
 async def schedule_health():
-    store = get_store()
+    store = get_async_store()
     return {
         "json_exists": True,
         "excel_exists": os.path.exists(PSUR_SCHEDULE_PATH),
@@ -1061,12 +1221,17 @@ async def schedule_health():
 
 @app.get("/schedule/snapshot")
 async def schedule_snapshot(limit: int = 50):
-    store = get_store()
-    items = store.get_all()[:limit]
-    return {"items": items, "count": len(items)}
+    store = get_async_store()
+    page = await store.page_records(limit=limit)
+    return {"items": page["items"], "count": page["count"]}
 
 @app.get("/schedule/all")
-async def schedule_all():
-    store = get_store()
-    items = store.get_all()
-    return {"items": items, "count": len(items)}
+async def schedule_all(limit: Optional[int] = None, cursor: Optional[str] = None):
+    store = get_async_store()
+    if limit is None and cursor is None:
+        items = await store.get_all()
+        return {"items": items, "count": len(items)}
+    try:
+        return await store.page_records(limit=limit or 100, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
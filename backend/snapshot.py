@@ -0,0 +1,355 @@
+"""In-process columnar snapshot of psur_reports for vectorized analytics.
+
+Holds one NumPy array per column the analytical reads need: row ids, due/end
+day ordinals, dictionary-encoded td_number/writer/class/status/type codes and
+a per-column "blank" bitmap. Rows are kept in the store's due order
+(DUE_ORDER_SQL), so any boolean mask selects ids already sorted. A snapshot is
+immutable; PSURDatabaseStore swaps in a rebuilt or patched copy when the
+change-journal version moves.
+
+write_snapshot_file/read_snapshot_file persist a snapshot as one flat file
+(fixed-width arrays plus a string heap for the dictionaries) that worker
+processes map read-only, so they share the pages instead of each building
+their own copy.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Stands in for a NULL ordinal; sorts undated rows last like DUE_ORDER_SQL.
+NULL_ORD = np.iinfo(np.int64).max
+
+ENCODED_COLUMNS = ("td_number", "writer", "class", "status", "type")
+
+# filter_records keyword -> encoded column
+TEXT_FILTERS = {
+    "writer": "writer",
+    "classification": "class",
+    "status": "status",
+    "type": "type",
+}
+
+_STRIP = " \t\n\r"
+
+# File layout: prefix (magic, format, header length), JSON header, then
+# 8-byte aligned sections whose offsets/dtypes/shapes the header lists.
+SNAPSHOT_MAGIC = b"PSURSNAP"
+SNAPSHOT_FORMAT = 1
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or not str(value).strip()
+
+
+class ColumnarSnapshot:
+    """Immutable column arrays for one data version of psur_reports."""
+
+    def __init__(
+        self,
+        version: int,
+        columns: Sequence[str],
+        ids: np.ndarray,
+        due_ord: np.ndarray,
+        end_ord: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        dictionaries: Dict[str, List[Optional[str]]],
+        blank: np.ndarray,
+    ) -> None:
+        self.version = version
+        self.columns = tuple(columns)
+        self.ids = ids
+        self.due_ord = due_ord
+        self.end_ord = end_ord
+        self.codes = codes
+        self.dictionaries = dictionaries
+        self.blank = blank
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, version: int, rows: Iterable[Any], columns: Sequence[str]) -> "ColumnarSnapshot":
+        """Encode rows that expose id, due_ord, end_ord and every name in ``columns``."""
+        rows = list(rows)
+
+        def ords(name: str) -> np.ndarray:
+            return np.array([NULL_ORD if row[name] is None else row[name] for row in rows], dtype=np.int64)
+
+        dictionaries: Dict[str, List[Optional[str]]] = {}
+        codes: Dict[str, np.ndarray] = {}
+        for name in ENCODED_COLUMNS:
+            index: Dict[Optional[str], int] = {}
+            codes[name] = np.array(
+                [index.setdefault(row[name], len(index)) for row in rows], dtype=np.int32
+            )
+            dictionaries[name] = list(index)
+        blank = np.array(
+            [[_is_blank(row[name]) for name in columns] for row in rows], dtype=bool
+        ).reshape(len(rows), len(columns))
+        snapshot = cls(
+            version,
+            columns,
+            np.array([row["id"] for row in rows], dtype=np.int64),
+            ords("due_ord"),
+            ords("end_ord"),
+            codes,
+            dictionaries,
+            blank,
+        )
+        return snapshot._sorted()
+
+    def _take(self, index: np.ndarray) -> "ColumnarSnapshot":
+        return ColumnarSnapshot(
+            self.version,
+            self.columns,
+            self.ids[index],
+            self.due_ord[index],
+            self.end_ord[index],
+            {name: codes[index] for name, codes in self.codes.items()},
+            self.dictionaries,
+            self.blank[index],
+        )
+
+    def _sorted(self) -> "ColumnarSnapshot":
+        # Due ordinal, then td_number (rank of its dictionary value), then id.
+        values = self.dictionaries["td_number"]
+        rank = np.empty(len(values), dtype=np.int64)
+        keys = np.array(["" if value is None else value for value in values], dtype=object)
+        rank[np.argsort(keys, kind="stable")] = np.arange(len(values))
+        order = np.lexsort((self.ids, rank[self.codes["td_number"]], self.due_ord))
+        return self._take(order)
+
+    def patch(self, version: int, changed_ids: Iterable[int], rows: Iterable[Any]) -> "ColumnarSnapshot":
+        """New snapshot with ``changed_ids`` dropped and ``rows`` (their current state) added."""
+        keep = ~np.isin(self.ids, np.fromiter(changed_ids, dtype=np.int64))
+        base = self._take(np.flatnonzero(keep))
+        piece = ColumnarSnapshot.build(version, rows, self.columns)
+
+        codes: Dict[str, np.ndarray] = {}
+        dictionaries: Dict[str, List[Optional[str]]] = {}
+        for name in ENCODED_COLUMNS:
+            values = list(self.dictionaries[name])
+            index = {value: code for code, value in enumerate(values)}
+            remap = np.array(
+                [index.setdefault(value, len(index)) for value in piece.dictionaries[name]],
+                dtype=np.int32,
+            )
+            values.extend(list(index)[len(values):])
+            dictionaries[name] = values
+            codes[name] = np.concatenate([base.codes[name], remap[piece.codes[name]]])
+
+        merged = ColumnarSnapshot(
+            version,
+            self.columns,
+            np.concatenate([base.ids, piece.ids]),
+            np.concatenate([base.due_ord, piece.due_ord]),
+            np.concatenate([base.end_ord, piece.end_ord]),
+            codes,
+            dictionaries,
+            np.concatenate([base.blank, piece.blank]),
+        )
+        return merged._sorted()
+
+    # ------------------------------------------------------------------
+    # Vectorized queries
+    # ------------------------------------------------------------------
+    def _contains(self, name: str, needle: str) -> np.ndarray:
+        """Case-insensitive substring match, resolved once per dictionary entry."""
+        needle = needle.lower()
+        hits = [code for code, value in enumerate(self.dictionaries[name]) if value is not None and needle in value.lower()]
+        return np.isin(self.codes[name], hits)
+
+    def mask(
+        self,
+        *,
+        today: int,
+        writer: Optional[str] = None,
+        classification: Optional[str] = None,
+        status: Optional[str] = None,
+        type: Optional[str] = None,
+        within_days: Optional[int] = None,
+        overdue_only: bool = False,
+    ) -> np.ndarray:
+        """filter_records criteria as a boolean mask (``today`` is an ordinal)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for keyword, needle in (
+            ("writer", writer),
+            ("classification", classification),
+            ("status", status),
+            ("type", type),
+        ):
+            if needle:
+                mask &= self._contains(TEXT_FILTERS[keyword], needle)
+        if overdue_only:
+            mask &= self.due_ord < today
+        if within_days is not None:
+            mask &= (self.due_ord >= today) & (self.due_ord <= today + int(within_days))
+        return mask
+
+    def missing(self, fields: Sequence[str]) -> np.ndarray:
+        """Blank bitmap restricted to ``fields`` (shape: rows x fields)."""
+        return self.blank[:, [self.columns.index(field) for field in fields]]
+
+    def select(self, mask: np.ndarray, limit: Optional[int] = None) -> List[int]:
+        """Ids under ``mask`` in due order."""
+        ids = self.ids[mask]
+        if limit is not None:
+            ids = ids[: int(limit)]
+        return ids.tolist()
+
+    def histogram(self, name: str, default: str) -> Dict[str, int]:
+        """Row counts per stripped value (blank -> ``default``), as get_stats reports them."""
+        counts = np.bincount(self.codes[name], minlength=len(self.dictionaries[name]))
+        out: Dict[str, int] = {}
+        for value, n in zip(self.dictionaries[name], counts.tolist()):
+            if n:
+                key = (value or "").strip(_STRIP) or default
+                out[key] = out.get(key, 0) + n
+        return dict(sorted(out.items()))
+
+    def duplicates(self, name: str = "td_number") -> List[str]:
+        counts = np.bincount(self.codes[name], minlength=len(self.dictionaries[name]))
+        values = self.dictionaries[name]
+        return sorted(values[code] for code in np.flatnonzero(counts > 1) if values[code] is not None)
+
+
+# ----------------------------------------------------------------------
+# Shared snapshot file
+# ----------------------------------------------------------------------
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _sections(snapshot: ColumnarSnapshot) -> Dict[str, np.ndarray]:
+    sections = {
+        "ids": snapshot.ids.astype("<i8", copy=False),
+        "due_ord": snapshot.due_ord.astype("<i8", copy=False),
+        "end_ord": snapshot.end_ord.astype("<i8", copy=False),
+        "blank": snapshot.blank.astype("|b1", copy=False),
+    }
+    for name in ENCODED_COLUMNS:
+        values = snapshot.dictionaries[name]
+        encoded = [(value or "").encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        offsets[1:] = np.cumsum([len(item) for item in encoded], dtype=np.int64)
+        sections[f"codes/{name}"] = snapshot.codes[name].astype("<i4", copy=False)
+        sections[f"heap/{name}/offsets"] = offsets
+        sections[f"heap/{name}/nulls"] = np.array([value is None for value in values], dtype="|b1")
+        sections[f"heap/{name}/bytes"] = np.frombuffer(b"".join(encoded), dtype="|u1")
+    return sections
+
+
+def write_snapshot_file(snapshot: ColumnarSnapshot, path: Path) -> None:
+    """Write ``snapshot`` to ``path`` atomically (temp file + os.replace)."""
+    sections = _sections(snapshot)
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, array in sections.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(
+        {"version": snapshot.version, "columns": list(snapshot.columns), "sections": layout}
+    ).encode("utf-8")
+    start = _aligned(_PREFIX.size + len(header))
+
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, len(header)))
+            f.write(header)
+            for name, array in sections.items():
+                f.seek(start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _read_header(f) -> Optional[Tuple[Dict[str, Any], int]]:
+    prefix = f.read(_PREFIX.size)
+    if len(prefix) < _PREFIX.size:
+        return None
+    magic, fmt, length = _PREFIX.unpack(prefix)
+    if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT:
+        return None
+    return json.loads(f.read(length)), _aligned(_PREFIX.size + length)
+
+
+def read_snapshot_file(
+    path: Path,
+    *,
+    version: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> Optional[ColumnarSnapshot]:
+    """Map a snapshot file read-only; None if it is missing, foreign or stale.
+
+    The arrays are views over the mapping (no copy), so every process that
+    maps the same file shares its pages. The mapping stays valid after the
+    file is replaced; callers re-read when the data version moves.
+    """
+    try:
+        with open(path, "rb") as f:
+            parsed = _read_header(f)
+            if parsed is None:
+                return None
+            header, start = parsed
+            if version is not None and header["version"] != version:
+                return None
+            if columns is not None and header["columns"] != list(columns):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    def section(name: str) -> np.ndarray:
+        spec = header["sections"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start + spec["offset"])
+        return array.reshape(spec["shape"])
+
+    try:
+        return _mapped_snapshot(header, section)
+    except (KeyError, ValueError):
+        return None
+
+
+def _mapped_snapshot(header: Dict[str, Any], section) -> ColumnarSnapshot:
+    codes: Dict[str, np.ndarray] = {}
+    dictionaries: Dict[str, List[Optional[str]]] = {}
+    for name in ENCODED_COLUMNS:
+        offsets = section(f"heap/{name}/offsets").tolist()
+        nulls = section(f"heap/{name}/nulls").tolist()
+        heap = section(f"heap/{name}/bytes").tobytes()
+        dictionaries[name] = [
+            None if null else heap[lo:hi].decode("utf-8")
+            for null, lo, hi in zip(nulls, offsets, offsets[1:])
+        ]
+        codes[name] = section(f"codes/{name}")
+    return ColumnarSnapshot(
+        header["version"],
+        header["columns"],
+        section("ids"),
+        section("due_ord"),
+        section("end_ord"),
+        codes,
+        dictionaries,
+        section("blank"),
+    )
@@ -1,7 +1,143 @@
 // Convex Functions for PSUR Schedule Operations
-import { mutation, query } from "./_generated/server";
+import { mutation, query, MutationCtx } from "./_generated/server";
+import { Doc } from "./_generated/dataModel";
 import { v } from "convex/values";
 
+// ========== TD NUMBER SEQUENCE ==========
+
+const TD_PATTERN = /^TD\d+$/;
+
+const formatTd = (n: number) => `TD${String(n).padStart(3, '0')}`;
+
+// Counter document for TD numbers. Seeded once from the table's highest
+// TD; afterwards allocation reads and patches a single document, and
+// Convex's serializable mutations keep parallel allocations distinct.
+async function tdCounter(ctx: MutationCtx) {
+  const counter = await ctx.db
+    .query("counters")
+    .withIndex("by_name", (q) => q.eq("name", "td_number"))
+    .first();
+  if (counter) return counter;
+
+  const all = await ctx.db.query("psur_reports").collect();
+  const maxTd = all
+    .map(r => r.td_number)
+    .filter(td => TD_PATTERN.test(td))
+    .reduce((max, td) => Math.max(max, parseInt(td.substring(2))), 0);
+  const id = await ctx.db.insert("counters", { name: "td_number", value: maxTd });
+  return (await ctx.db.get(id))!;
+}
+
+// Allocate `count` consecutive TD numbers.
+async function nextTdNumbers(ctx: MutationCtx, count: number): Promise<string[]> {
+  const counter = await tdCounter(ctx);
+  await ctx.db.patch(counter._id, { value: counter.value + count });
+  return Array.from({ length: count }, (_, i) => formatTd(counter.value + i + 1));
+}
+
+// Keep the counter ahead of explicitly supplied TD numbers.
+async function observeTdNumber(ctx: MutationCtx, tdNumber: string) {
+  if (!TD_PATTERN.test(tdNumber)) return;
+  const counter = await tdCounter(ctx);
+  const n = parseInt(tdNumber.substring(2));
+  if (n > counter.value) {
+    await ctx.db.patch(counter._id, { value: n });
+  }
+}
+
+// ========== CHANGE JOURNAL ==========
+
+// Journal entries kept (PSUR_CHANGES_RETENTION in backend/db_store.py);
+// older ones are pruned every CHANGES_PRUNE_EVERY entries.
+const CHANGES_RETENTION = 10000;
+const CHANGES_PRUNE_EVERY = 100;
+
+// User-visible fields whose changes are journalled (CHANGE_COLUMNS).
+const CHANGE_FIELDS = [
+  "td_number", "psur_number", "type", "product_name", "catalog_number",
+  "writer", "email", "start_period", "end_period", "frequency", "due_date",
+  "status", "canada_needed", "canada_status", "comments", "class",
+] as const;
+
+// Fields of `patch` whose value differs from `record`.
+function changedFields(record: Record<string, any>, patch: Record<string, any>): string[] {
+  return CHANGE_FIELDS.filter(field => field in patch && (patch[field] ?? null) !== (record[field] ?? null));
+}
+
+// Append one journal entry under the next data version.
+async function journal(
+  ctx: MutationCtx,
+  op: string,
+  record: { _id: string; td_number?: string; version?: number },
+  columns?: string[],
+) {
+  let counter = await ctx.db
+    .query("counters")
+    .withIndex("by_name", (q) => q.eq("name", "data_version"))
+    .first();
+  if (!counter) {
+    const id = await ctx.db.insert("counters", { name: "data_version", value: 0 });
+    counter = (await ctx.db.get(id))!;
+  }
+  const seq = counter.value + 1;
+  await ctx.db.patch(counter._id, { value: seq });
+  await ctx.db.insert("psur_changes", {
+    seq,
+    op,
+    row_id: record._id,
+    td_number: record.td_number,
+    columns: columns?.join(","),
+    version: record.version,
+    changed_at: new Date().toISOString(),
+  });
+
+  if (seq % CHANGES_PRUNE_EVERY === 0) {
+    const stale = await ctx.db
+      .query("psur_changes")
+      .withIndex("by_seq", (q) => q.lte("seq", seq - CHANGES_RETENTION))
+      .take(CHANGES_PRUNE_EVERY * 2);
+    for (const entry of stale) {
+      await ctx.db.delete(entry._id);
+    }
+  }
+}
+
+// Patch a report and journal the fields that changed (if any), bumping
+// its version and updated_at.
+async function patchReport(ctx: MutationCtx, record: Doc<"psur_reports">, fields: Record<string, any>) {
+  const version = (record.version || 1) + 1;
+  await ctx.db.patch(record._id, {
+    ...fields,
+    ...lookupKeys(fields),
+    updated_at: new Date().toISOString(),
+    version,
+  });
+  const columns = changedFields(record, fields);
+  if (columns.length > 0) {
+    await journal(ctx, "update", { ...record, version }, columns);
+  }
+}
+
+// ========== LOOKUP KEYS ==========
+
+// Trimmed, lowercased writer/status/class, as the key triggers in
+// backend/db_store.py store them. Only used to seek the by_*_key indexes;
+// the filter still applies its own matching rules to what it reads.
+const LOOKUP_FIELDS = ["writer", "status", "class"] as const;
+
+function lookupKey(value: unknown): string {
+  return String(value ?? "").trim().toLowerCase();
+}
+
+// `<field>_key` values for whichever lookup fields `fields` sets.
+function lookupKeys(fields: Record<string, any>): Record<string, string> {
+  const keys: Record<string, string> = {};
+  for (const field of LOOKUP_FIELDS) {
+    if (field in fields) keys[`${field}_key`] = lookupKey(fields[field]);
+  }
+  return keys;
+}
+
 // ========== QUERIES ==========
 
 export const getByTd = query({
@@ -70,8 +206,33 @@ export const filter = query({
     overdue: v.optional(v.boolean()),
   },
   handler: async (ctx, args) => {
-    let results = await ctx.db.query("psur_reports").collect();
-    
+    // Status and class match exactly, so one of them can seek its key
+    // index. Rows without a key yet (written before the key fields, not
+    // backfilled) are read too; the checks below decide on the raw values.
+    const exact = [
+      ["status", args.status],
+      ["class", args.classification],
+    ] as const;
+    const seek = exact.find(([, value]) => value);
+
+    let results;
+    if (seek) {
+      const [field, value] = seek;
+      const index = `by_${field}_key` as "by_status_key" | "by_class_key";
+      const column = `${field}_key` as "status_key" | "class_key";
+      const keyed = await ctx.db
+        .query("psur_reports")
+        .withIndex(index, (q) => q.eq(column, lookupKey(value)))
+        .collect();
+      const unkeyed = await ctx.db
+        .query("psur_reports")
+        .withIndex(index, (q) => q.eq(column, undefined))
+        .collect();
+      results = [...keyed, ...unkeyed];
+    } else {
+      results = await ctx.db.query("psur_reports").collect();
+    }
+
     // Apply filters
     if (args.writer) {
       const writerLower = args.writer.toLowerCase();
@@ -181,6 +342,58 @@ export const getStats = query({
   },
 });
 
+// Latest journalled data version (0 before the first change).
+export const dataVersion = query({
+  handler: async (ctx) => {
+    const counter = await ctx.db
+      .query("counters")
+      .withIndex("by_name", (q) => q.eq("name", "data_version"))
+      .first();
+    return counter?.value ?? 0;
+  },
+});
+
+// Journal entries after `since`, oldest first, in the shape of
+// PSURDatabaseStore.changes_since. `reset` means the entries the caller
+// needs were pruned (or `since` is ahead of us): refetch and resume.
+export const changesSince = query({
+  args: { since: v.number(), limit: v.optional(v.number()) },
+  handler: async (ctx, args) => {
+    const limit = args.limit ?? 1000;
+    const counter = await ctx.db
+      .query("counters")
+      .withIndex("by_name", (q) => q.eq("name", "data_version"))
+      .first();
+    const version = counter?.value ?? 0;
+    const oldest = await ctx.db.query("psur_changes").withIndex("by_seq").first();
+    if (args.since > version || (oldest && args.since < oldest.seq - 1)) {
+      return { since: args.since, version, reset: true, changes: [], has_more: false };
+    }
+
+    const rows = await ctx.db
+      .query("psur_changes")
+      .withIndex("by_seq", (q) => q.gt("seq", args.since))
+      .take(limit + 1);
+    const hasMore = rows.length > limit;
+    const changes = rows.slice(0, limit).map(({ seq, op, row_id, td_number, columns, version, changed_at }) => ({
+      seq,
+      op,
+      row_id,
+      td_number,
+      columns: columns ? columns.split(",") : [],
+      version,
+      changed_at,
+    }));
+    return {
+      since: args.since,
+      version: hasMore ? changes[changes.length - 1].seq : version,
+      reset: false,
+      changes,
+      has_more: hasMore,
+    };
+  },
+});
+
 // ========== MUTATIONS ==========
 
 export const create = mutation({
@@ -207,30 +420,35 @@ export const create = mutation({
     let tdNumber = args.td_number;
     
     if (!tdNumber) {
-      const all = await ctx.db.query("psur_reports").collect();
-      const tdNumbers = all
-        .map(r => r.td_number)
-        .filter(td => /^TD\d+$/.test(td))
-        .map(td => parseInt(td.substring(2)));
-      
-      const maxTd = tdNumbers.length > 0 ? Math.max(...tdNumbers) : 0;
-      tdNumber = `TD${String(maxTd + 1).padStart(3, '0')}`;
+      [tdNumber] = await nextTdNumbers(ctx, 1);
+    } else {
+      await observeTdNumber(ctx, tdNumber);
     }
     
     const now = new Date().toISOString();
     
     const id = await ctx.db.insert("psur_reports", {
       ...args,
+      ...lookupKeys({ writer: args.writer, status: args.status, class: args.class }),
       td_number: tdNumber,
       created_at: now,
       updated_at: now,
       version: 1,
     });
+    await journal(ctx, "insert", { _id: id, td_number: tdNumber, version: 1 });
     
     return { td_number: tdNumber, id };
   },
 });
 
+export const reserveTdNumbers = mutation({
+  args: { count: v.number() },
+  handler: async (ctx, args) => {
+    if (args.count < 1) return [];
+    return await nextTdNumbers(ctx, Math.floor(args.count));
+  },
+});
+
 export const update = mutation({
   args: {
     tdNumber: v.string(),
@@ -246,13 +464,7 @@ export const update = mutation({
       return false;
     }
     
-    const now = new Date().toISOString();
-    
-    await ctx.db.patch(record._id, {
-      ...args.updates,
-      updated_at: now,
-      version: (record.version || 1) + 1,
-    });
+    await patchReport(ctx, record, args.updates);
     
     return true;
   },
@@ -266,8 +478,19 @@ export const deleteRecord = mutation({
       .withIndex("by_td_number", (q) => q.eq("td_number", args.tdNumber))
       .collect();
     
+    // Comments are keyed by TD number too, so one index range covers the
+    // notes of every deleted row
+    const comments = await ctx.db
+      .query("psur_comments")
+      .withIndex("by_td_number", (q) => q.eq("td_number", args.tdNumber))
+      .collect();
+    for (const comment of comments) {
+      await ctx.db.delete(comment._id);
+    }
+
     for (const record of records) {
       await ctx.db.delete(record._id);
+      await journal(ctx, "delete", record);
     }
     
     return records.length > 0;
@@ -294,15 +517,10 @@ export const bulkUpdateStatus = mutation({
       records = records.filter(r => (r.class || "").toLowerCase() === classLower);
     }
     
-    const now = new Date().toISOString();
     let count = 0;
     
     for (const record of records) {
-      await ctx.db.patch(record._id, {
-        status: args.newStatus,
-        updated_at: now,
-        version: (record.version || 1) + 1,
-      });
+      await patchReport(ctx, record, { status: args.newStatus });
       count++;
     }
     
@@ -310,10 +528,101 @@ export const bulkUpdateStatus = mutation({
   },
 });
 
+// Patch the given documents (ConvexStore.bulk_update passes the ids its
+// psur:filter query matched) in one transaction; returns them updated.
+export const bulkUpdate = mutation({
+  args: {
+    ids: v.array(v.id("psur_reports")),
+    updates: v.any(),
+  },
+  handler: async (ctx, args) => {
+    const updated = [];
+
+    for (const id of args.ids) {
+      const record = await ctx.db.get(id);
+      if (!record) continue;
+      await patchReport(ctx, record, args.updates);
+      updated.push(await ctx.db.get(id));
+    }
+
+    return updated;
+  },
+});
+
+// One batch of a workbook sync (ConvexStore.sync_from_excel diffs the sheet
+// against getAll and sends the difference here): insert new rows, patch
+// changed ones by document id and delete rows gone from the sheet along
+// with their comments.
+export const applySync = mutation({
+  args: {
+    inserts: v.array(v.any()),
+    updates: v.array(v.object({ id: v.id("psur_reports"), fields: v.any() })),
+    deletes: v.array(v.id("psur_reports")),
+  },
+  handler: async (ctx, args) => {
+    const now = new Date().toISOString();
+
+    for (const id of args.deletes) {
+      const record = await ctx.db.get(id);
+      if (!record) continue;
+      const comments = await ctx.db
+        .query("psur_comments")
+        .withIndex("by_report", (q) => q.eq("report_id", id))
+        .collect();
+      for (const comment of comments) {
+        await ctx.db.delete(comment._id);
+      }
+      await ctx.db.delete(id);
+      await journal(ctx, "delete", record);
+    }
+
+    for (const { id, fields } of args.updates) {
+      const record = await ctx.db.get(id);
+      if (!record) continue;
+      await patchReport(ctx, record, fields);
+    }
+
+    for (const fields of args.inserts) {
+      await observeTdNumber(ctx, fields.td_number);
+      const id = await ctx.db.insert("psur_reports", {
+        ...fields,
+        ...lookupKeys({ writer: fields.writer, status: fields.status, class: fields.class }),
+        created_at: now,
+        updated_at: now,
+        version: 1,
+      });
+      await journal(ctx, "insert", { _id: id, td_number: fields.td_number, version: 1 });
+    }
+
+    return { inserted: args.inserts.length, updated: args.updates.length, deleted: args.deletes.length };
+  },
+});
+
+// One-off backfill of writer_key/status_key/class_key for rows written
+// before the key columns existed; until it runs, filter reads them unkeyed.
+export const backfillLookupKeys = mutation({
+  args: {},
+  handler: async (ctx) => {
+    const records = await ctx.db.query("psur_reports").collect();
+    let count = 0;
+
+    for (const record of records) {
+      const keys = lookupKeys({ writer: record.writer, status: record.status, class: record.class });
+      if (LOOKUP_FIELDS.some(field => (record as any)[`${field}_key`] !== keys[`${field}_key`])) {
+        await ctx.db.patch(record._id, keys);
+        count++;
+      }
+    }
+
+    return count;
+  },
+});
+
 export const addComment = mutation({
   args: {
     tdNumber: v.string(),
     comment: v.string(),
+    author: v.optional(v.string()),
   },
   handler: async (ctx, args) => {
     const record = await ctx.db
@@ -325,30 +634,61 @@ export const addComment = mutation({
       return false;
     }
     
-    const existingComments = record.comments || "";
-    const newComments = existingComments 
-      ? `${existingComments}\n${args.comment}`
-      : args.comment;
-    
-    const now = new Date().toISOString();
-    
-    await ctx.db.patch(record._id, {
-      comments: newComments,
-      updated_at: now,
-      version: (record.version || 1) + 1,
+    // Single insert into the comment log; the report document is untouched
+    await ctx.db.insert("psur_comments", {
+      report_id: record._id,
+      td_number: record.td_number,
+      ts: new Date().toISOString(),
+      author: args.author,
+      text: args.comment,
+      kind: "comment",
     });
+    await journal(ctx, "comment", { _id: record._id, td_number: record.td_number }, ["comments"]);
     
     return true;
   },
 });
 
+export const getComments = query({
+  args: {
+    tdNumber: v.string(),
+    limit: v.optional(v.number()),
+    kind: v.optional(v.union(v.literal("comment"), v.literal("link"))),
+  },
+  handler: async (ctx, args) => {
+    let q = ctx.db
+      .query("psur_comments")
+      .withIndex("by_td_number", (q) => q.eq("td_number", args.tdNumber))
+      .order("desc");
+    if (args.kind) {
+      q = q.filter((q) => q.eq(q.field("kind"), args.kind));
+    }
+    const rows = await q.take(args.limit ?? 20);
+    return rows.map(({ ts, author, text, kind, td_number }) => ({
+      td_number,
+      created_at: ts,
+      author,
+      body: text,
+      kind,
+    }));
+  },
+});
+
 export const linkReferences = mutation({
   args: {
     tdNumber: v.string(),
     mastercontrolUrl: v.optional(v.string()),
     sharepointUrl: v.optional(v.string()),
+    author: v.optional(v.string()),
   },
   handler: async (ctx, args) => {
+    const parts = [];
+    if (args.mastercontrolUrl) parts.push(`MC: ${args.mastercontrolUrl}`);
+    if (args.sharepointUrl) parts.push(`SP: ${args.sharepointUrl}`);
+    if (parts.length === 0) {
+      return false;
+    }
+
     const record = await ctx.db
       .query("psur_reports")
       .withIndex("by_td_number", (q) => q.eq("td_number", args.tdNumber))
@@ -358,17 +698,16 @@ export const linkReferences = mutation({
       return false;
     }
 
-    const now = new Date().toISOString();
-    const updates: any = { updated_at: now, version: (record.version || 1) + 1 };
-
-    if (args.mastercontrolUrl) {
-      updates.mastercontrol_url = args.mastercontrolUrl;
-    }
-    if (args.sharepointUrl) {
-      updates.sharepoint_url = args.sharepointUrl;
-    }
-
-    await ctx.db.patch(record._id, updates);
+    // Logged like a comment (kind 'link'); the report document is untouched
+    await ctx.db.insert("psur_comments", {
+      report_id: record._id,
+      td_number: record.td_number,
+      ts: new Date().toISOString(),
+      author: args.author,
+      text: parts.join(" | "),
+      kind: "link",
+    });
+    await journal(ctx, "link", { _id: record._id, td_number: record.td_number }, ["comments"]);
 
     return true;
   },
@@ -436,14 +775,7 @@ export const generateNextSchedule = mutation({
     );
 
     // Generate new TD number
-    const all = await ctx.db.query("psur_reports").collect();
-    const tdNumbers = all
-      .map(r => r.td_number)
-      .filter(td => /^TD\d+$/.test(td))
-      .map(td => parseInt(td.substring(2)));
-
-    const maxTd = tdNumbers.length > 0 ? Math.max(...tdNumbers) : 0;
-    const newTdNumber = `TD${String(maxTd + 1).padStart(3, '0')}`;
+    const [newTdNumber] = await nextTdNumbers(ctx, 1);
 
     // Increment PSUR number if exists
     let newPsurNumber = undefined;
@@ -478,12 +810,14 @@ export const generateNextSchedule = mutation({
       comments: `Auto-generated from ${args.closedTdNumber} on ${now.split('T')[0]}. Previous period: ${closedRecord.start_period} to ${closedRecord.end_period}`,
       parent_td_number: args.closedTdNumber,
       auto_generated: true,
+      ...lookupKeys({ writer: closedRecord.writer, status: "Not started", class: closedRecord.class }),
       created_at: now,
       updated_at: now,
       version: 1,
     };
 
     const newId = await ctx.db.insert("psur_reports", newSchedule);
+    await journal(ctx, "insert", { _id: newId, td_number: newTdNumber, version: 1 });
 
     return {
       success: true,
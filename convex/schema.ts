@@ -42,6 +42,12 @@ export default defineSchema({
     parent_td_number: v.optional(v.string()), // Links to previous period's TD
     auto_generated: v.optional(v.boolean()),  // Flag for auto-created schedules
 
+    // Trimmed, lowercased writer/status/class for the filter's index seeks;
+    // kept in step by the mutations in psur.ts
+    writer_key: v.optional(v.string()),
+    status_key: v.optional(v.string()),
+    class_key: v.optional(v.string()),
+
     // Metadata
     created_at: v.optional(v.string()),
     updated_at: v.optional(v.string()),
@@ -55,5 +61,40 @@ export default defineSchema({
     .index("by_class", ["class"])
     .index("by_due_date", ["due_date"])
     .index("by_parent_td", ["parent_td_number"])
-    .index("by_auto_generated", ["auto_generated"]),
+    .index("by_auto_generated", ["auto_generated"])
+    .index("by_writer_key", ["writer_key", "due_date"])
+    .index("by_status_key", ["status_key", "due_date"])
+    .index("by_class_key", ["class_key", "due_date"]),
+
+  // Append-only comment/link log per report
+  psur_comments: defineTable({
+    report_id: v.id("psur_reports"),
+    td_number: v.string(),
+    ts: v.string(),
+    author: v.optional(v.string()),
+    text: v.string(),
+    kind: v.union(v.literal("comment"), v.literal("link")),
+  })
+    .index("by_report", ["report_id"])
+    .index("by_td_number", ["td_number"]),
+
+  // Change journal, as psur_changes in backend/db_store.py: one entry per
+  // insert/update/delete or comment/link append, numbered by seq
+  psur_changes: defineTable({
+    seq: v.number(),
+    op: v.string(),
+    row_id: v.optional(v.string()),
+    td_number: v.optional(v.string()),
+    columns: v.optional(v.string()),
+    version: v.optional(v.number()),
+    changed_at: v.string(),
+  })
+    .index("by_seq", ["seq"]),
+
+  // Named monotonic counters (e.g. "td_number", "data_version"), bumped inside mutations
+  counters: defineTable({
+    name: v.string(),
+    value: v.number(),
+  })
+    .index("by_name", ["name"]),
 });
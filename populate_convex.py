@@ -6,7 +6,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from backend.db_convex import get_store
-from backend.excel_utils import read_excel_auto, canon_record, PSUR_SCHEDULE_PATH
+from backend.excel_utils import read_excel_cached, canon_record, PSUR_SCHEDULE_PATH
 
 def populate_convex():
     """Load data from Excel and populate Convex database."""
@@ -25,7 +25,7 @@ def populate_convex():
     
     # Read Excel data
     try:
-        df, colmap = read_excel_auto(str(excel_path))
+        df, colmap = read_excel_cached(str(excel_path))
         print(f"✅ Found {len(df)} records in Excel")
     except Exception as e:
         print(f"❌ Failed to read Excel file: {e}")
@@ -0,0 +1,201 @@
+"""Test that concurrent tool calls run off the event loop and overlap"""
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import backend.server as server
+from backend.async_store import AsyncStore
+
+DELAY = 0.3
+
+
+class SlowStore:
+    """Stand-in store whose calls block like slow SQLite/Convex I/O."""
+
+    metadata = {"source": "test"}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.writes = []
+
+    def _block(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(DELAY)
+        with self.lock:
+            self.active -= 1
+
+    def data_version(self):
+        return 0
+
+    def find_by_td(self, td_number):
+        self._block()
+        return {"td_number": td_number}
+
+    def attach_comments(self, records, limit=3):
+        return records
+
+    def update_record(self, td_number, updates):
+        self._block()
+        self.writes.append(td_number)
+        return True
+
+
+async def _run(calls):
+    ticks = 0
+    done = False
+
+    async def heartbeat():
+        nonlocal ticks
+        while not done:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(server.tool_entry(call) for call in calls))
+    elapsed = time.perf_counter() - started
+    done = True
+    await beat
+    return results, elapsed, ticks
+
+
+def _with_store(store):
+    async_store = AsyncStore(store, read_workers=4)
+    original = server.get_async_store
+    server.get_async_store = lambda: async_store
+    return async_store, original
+
+
+def test_concurrent_reads_overlap():
+    store = SlowStore()
+    async_store, original = _with_store(store)
+    try:
+        calls = [{"name": "get_report", "args": {"row_id": f"TD00{i}"}} for i in range(4)]
+        results, elapsed, ticks = asyncio.run(_run(calls))
+    finally:
+        server.get_async_store = original
+        async_store.shutdown()
+
+    assert [r["items"][0]["td_number"] for r in results] == [f"TD00{i}" for i in range(4)]
+    assert store.max_active == 4
+    # Four 0.3s lookups in parallel, not back to back
+    assert elapsed < DELAY * 2, elapsed
+    # The event loop kept running while the store blocked
+    assert ticks >= 10, ticks
+
+
+def test_writes_are_serialized():
+    store = SlowStore()
+    async_store, original = _with_store(store)
+    try:
+        calls = [
+            {"name": "update_status", "args": {"row_id": f"TD00{i}", "status": "Done"}}
+            for i in range(3)
+        ]
+        results, elapsed, ticks = asyncio.run(_run(calls))
+    finally:
+        server.get_async_store = original
+        async_store.shutdown()
+
+    assert store.max_active == 1
+    assert store.writes == ["TD000", "TD001", "TD002"]
+    assert ticks >= 10, ticks
+
+
+class ThreadRecorder:
+    """Records which pool thread ran each call."""
+
+    def __init__(self):
+        self.threads = {}
+
+    def _record(self, name):
+        self.threads[name] = threading.current_thread().name
+
+    def reserve_td_numbers(self, count=1):
+        self._record("reserve_td_numbers")
+        return ["TD900"]
+
+    def add_records(self, records):
+        self._record("add_records")
+        return ["TD900"]
+
+    def find_by_td(self, td_number):
+        self._record("find_by_td")
+
+
+def test_td_allocation_runs_on_the_write_thread():
+    store = ThreadRecorder()
+    async_store = AsyncStore(store, read_workers=2)
+
+    async def calls():
+        await async_store.reserve_td_numbers(1)
+        await async_store.add_records([{}])
+        await async_store.find_by_td("TD900")
+
+    try:
+        asyncio.run(calls())
+    finally:
+        async_store.shutdown()
+
+    assert store.threads["reserve_td_numbers"].startswith("store-write")
+    assert store.threads["add_records"].startswith("store-write")
+    assert store.threads["find_by_td"].startswith("store-read")
+
+
+class VersionStore:
+    """Counts data_version() reads."""
+
+    metadata = {"source": "test"}
+
+    def __init__(self):
+        self.reads = 0
+
+    def data_version(self):
+        self.reads += 1
+        return 42
+
+
+class Client:
+    def __init__(self):
+        self.messages = []
+
+    async def send_json(self, message):
+        self.messages.append(message)
+
+
+def test_only_data_events_carry_the_version():
+    store = VersionStore()
+    async_store, original = _with_store(store)
+    client = Client()
+    server.connected_clients.add(client)
+
+    async def broadcasts():
+        await server.broadcast_update("dialog", {"text": "hi"})
+        await server.broadcast_update("dialog_clear", {})
+        await server.broadcast_update("update", {"td_number": "TD001"})
+
+    try:
+        asyncio.run(broadcasts())
+    finally:
+        server.connected_clients.discard(client)
+        server.get_async_store = original
+        async_store.shutdown()
+
+    assert store.reads == 1
+    assert ["version" in m for m in client.messages] == [False, False, True]
+    assert client.messages[-1]["version"] == 42
+
+
+if __name__ == "__main__":
+    test_concurrent_reads_overlap()
+    test_writes_are_serialized()
+    test_td_allocation_runs_on_the_write_thread()
+    test_only_data_events_carry_the_version()
+    print("✅ Async store tests passed")
@@ -0,0 +1,805 @@
+"""Tests for the SQLite store, each on a fresh database built from the workbook"""
+import csv
+import io
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import backend.db_store as db_store
+
+WORKBOOK = Path(__file__).parent / "2025 Periodic Safety Update Report Master Schedule (2).xlsx"
+# Shipped database from before schema versioning (user_version 0)
+LEGACY_DB = Path(__file__).parent / "data" / "psur_schedule.db"
+
+
+@pytest.fixture
+def make_store(tmp_path, monkeypatch):
+    """Factory for stores on a new database under ``tmp_path`` with the workbook imported."""
+    monkeypatch.setattr(db_store, "PSUR_SCHEDULE_PATH", WORKBOOK)
+    monkeypatch.setattr(db_store, "DB_PATH", tmp_path / "psur_schedule.db")
+    monkeypatch.setattr(db_store, "EXPORTS_DIR", tmp_path / "exports")
+    stores = []
+
+    def make(*, ready: bool = True) -> db_store.PSURDatabaseStore:
+        store = db_store.PSURDatabaseStore()
+        stores.append(store)
+        if ready:
+            store.wait_ready()
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def store(make_store):
+    return make_store()
+
+
+def test_pool_keeps_one_connection_per_thread(tmp_path):
+    pool = db_store.ConnectionPool(tmp_path / "pool.db")
+    main = pool.connection()
+    assert pool.connection() is main
+    assert main.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main
+
+    pool.close_all()
+    assert pool.connection() is not main
+    pool.close_all()
+
+
+def test_unit_of_work_nests_and_rolls_back(store):
+    td = "TD9011"
+    with store.unit_of_work():
+        store.add_record({"td_number": td, "status": "Assigned"})
+        with store.unit_of_work() as cur:
+            # The inner unit joins the outer transaction instead of committing
+            cur.execute("UPDATE psur_reports SET writer = 'Jeff S' WHERE td_number = ?", (td,))
+        assert store.get_connection().in_transaction
+    assert store.find_by_td(td)["writer"] == "Jeff S"
+
+    with pytest.raises(RuntimeError):
+        with store.unit_of_work():
+            store.update_record(td, {"status": "Released"})
+            store.add_record({"td_number": "TD9012"})
+            raise RuntimeError("abort")
+    assert not store.get_connection().in_transaction
+    assert store.find_by_td(td)["status"] == "Assigned"
+    assert store.find_by_td("TD9012") is None
+
+
+def test_due_dates_are_derived_on_write(store):
+    store.add_record({"td_number": "TD9001", "end_period": "2025-03-31", "status": "Assigned"})
+    assert store.find_by_td("TD9001")["due_date"] == "2025-04-30"
+    store.update_record("TD9001", {"end_period": "2025-06-30"})
+    assert store.find_by_td("TD9001")["due_date"] == "2025-07-30"
+
+    # A new offset re-derives every stored due date at once
+    store.recompute_due_dates(10)
+    assert store.find_by_td("TD9001")["due_date"] == "2025-07-10"
+
+
+def test_plain_sqlite_clients_can_write(tmp_path, make_store):
+    store = make_store()
+    store.add_record({"td_number": "TD9001", "end_period": "2025-03-31", "status": "Assigned"})
+    store.close()
+
+    # No app functions registered on this connection
+    conn = sqlite3.connect(tmp_path / "psur_schedule.db")
+    conn.execute("UPDATE psur_reports SET end_period = '2025-06-30', writer = ' Jeff S' WHERE td_number = 'TD9001'")
+    conn.execute("INSERT INTO psur_reports (td_number, status, class) VALUES ('TD9002', 'In Review', 'IIb')")
+    conn.commit()
+    due = conn.execute("SELECT due_date FROM psur_reports WHERE td_number = 'TD9001'").fetchone()[0]
+    keys = conn.execute("SELECT writer_key, status_key, class_key FROM psur_reports WHERE td_number LIKE 'TD900_' ORDER BY id").fetchall()
+    conn.close()
+    assert due == "2025-07-30"
+    assert keys == [("jeff s", "assigned", None), (None, "in review", "iib")]
+
+
+def test_search_ranks_identifiers_and_products_first(store):
+    store.add_records([
+        {"td_number": "TD9101", "product_name": "Generic Kit", "writer": "Zyloxa Team"},
+        {"td_number": "TD9102", "product_name": "Zyloxa Injectable", "writer": "Someone"},
+        {"td_number": "TD9103", "psur_number": "PSUR-ZYLOXA", "product_name": "Other"},
+    ])
+
+    # bm25 weights: psur_number > product_name > writer
+    assert [r["td_number"] for r in store.find_by_query("zyloxa")] == ["TD9103", "TD9102", "TD9101"]
+    # The last word of the query matches as a prefix
+    assert [r["td_number"] for r in store.find_by_query("zyloxa inj")] == ["TD9102"]
+    # A mid-word fragment falls back to the substring scan
+    assert [r["td_number"] for r in store.find_by_query("loxa inj")] == ["TD9102"]
+
+
+def test_records_leave_out_storage_columns(store):
+    td = store.get_all()[0]["td_number"]
+    records = [
+        *store.get_all(),
+        store.find_by_td(td),
+        *store.filter_records(status="a"),
+        *store.page_records(limit=5)["items"],
+        *store.iter_records(),
+    ]
+    assert records
+    for record in records:
+        assert set(record) <= set(db_store.EXPORT_COLUMNS), sorted(set(record) - set(db_store.EXPORT_COLUMNS))
+
+
+def test_sync_from_excel_writes_only_changes(store):
+    total = len(store.get_all(include_archived=True))
+    before = {r["id"]: r["version"] for r in store.get_all(include_archived=True)}
+
+    first = store.sync_from_excel()
+    assert (first["inserted"], first["updated"], first["deleted"]) == ([], [], [])
+    assert first["unchanged"] == total
+    assert {r["id"]: r["version"] for r in store.get_all(include_archived=True)} == before
+
+    tds = [r["td_number"] for r in store.get_all()]
+    edited, removed = [td for td in tds if tds.count(td) == 1][:2]
+    writer = store.find_by_td(edited)["writer"]
+    store.update_record(edited, {"writer": "Someone Else"})
+    store.delete_record(removed)
+    store.add_record({"td_number": "TD9201", "product_name": "Not in the workbook"})
+
+    changes = store.sync_from_excel()
+    assert changes["updated"] == [edited]
+    assert changes["inserted"] == [removed]
+    assert changes["deleted"] == ["TD9201"]
+    assert store.find_by_td(edited)["writer"] == writer
+
+    again = store.sync_from_excel()
+    assert (again["inserted"], again["updated"], again["deleted"]) == ([], [], [])
+    assert again["unchanged"] == total
+
+
+def _workbook_with(monkeypatch, change):
+    """Make the store read the workbook with ``change(df, colmap)`` applied."""
+    df, colmap = db_store.read_excel_cached(WORKBOOK)
+    df = df.copy()
+    change(df, colmap)
+    monkeypatch.setattr(db_store, "read_excel_cached", lambda path: (df, colmap))
+    return df
+
+
+def test_import_handles_datetime_end_periods(store, monkeypatch):
+    pd = pytest.importorskip("pandas")
+
+    def as_datetimes(df, colmap):
+        df[colmap["end_period"]] = pd.to_datetime(df[colmap["end_period"]], errors="coerce")
+
+    df = _workbook_with(monkeypatch, as_datetimes)
+    assert store.import_from_excel() == len(df)
+    assert list(store.metadata["last_import_timings"]) == ["read", "canonicalize", "derive_due", "prepare", "write"]
+    for record in store.get_all(include_archived=True):
+        due = db_store._compute_due(record["end_period"])
+        assert record["due_date"] == (due.isoformat() if due else ""), record["td_number"]
+
+    # Due dates derived on import already match the trigger's, so a sync
+    # journals exactly one entry per changed row
+    version = store.data_version()
+    td = next(r["td_number"] for r in store.get_all() if r["td_number"])
+    store.update_record(td, {"end_period": "2030-01-31"})
+    changes = store.sync_from_excel()
+    assert td in changes["updated"]
+    journal = store.changes_since(version)["changes"]
+    assert len(journal) == 1 + len(changes["updated"]) + len(changes["inserted"]) + len(changes["deleted"])
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    """A test client for the FastAPI app, served from ``store``."""
+    from fastapi.testclient import TestClient
+
+    import backend.server as server
+    from backend.async_store import AsyncStore
+
+    async_store = AsyncStore(store)
+    monkeypatch.setattr(server, "get_async_store", lambda: async_store)
+    yield TestClient(server.app)
+    async_store.shutdown()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_export_endpoints_stream_filtered_rows(store, client, compress):
+    expected = [r["id"] for r in store.filter_records(status="progress")]
+    assert expected
+    params = {"status": "progress", "gzip": compress}
+
+    response = client.get("/data/export.csv", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert (response.headers.get("content-encoding") == "gzip") is compress
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == list(db_store.EXPORT_COLUMNS)
+    assert [int(row["id"]) for row in rows] == expected
+
+    response = client.get("/data/export.ndjson", params=params)
+    assert response.status_code == 200
+    assert (response.headers.get("content-encoding") == "gzip") is compress
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == expected
+
+
+def test_import_normalizes_workbook_dates(store, monkeypatch):
+    def as_text(df, colmap):
+        end = colmap["end_period"]
+        df[end] = df[end].astype(object)
+        df.loc[df.index[0], end] = "03/31/2025"
+        df.loc[df.index[1], end] = "March 31, 2025"
+        df.loc[df.index[2], end] = "TBD"
+
+    _workbook_with(monkeypatch, as_text)
+    store.import_from_excel()
+    rows = {
+        row["id"]: (row["end_period"], row["due_date"], row["end_ord"])
+        for row in store.get_connection().execute(
+            "SELECT id, end_period, due_date, end_ord FROM psur_reports"
+            " UNION ALL SELECT id, end_period, due_date, end_ord FROM psur_reports_archive"
+        )
+    }
+    first = min(rows)
+    ordinal = date(2025, 3, 31).toordinal()
+    assert rows[first] == rows[first + 1] == ("2025-03-31", "2025-04-30", ordinal)
+    assert rows[first + 2] == ("TBD", "", None)
+    assert all(rows[i][0] == "" or rows[i][2] is not None for i in rows if i > first + 2)
+
+    # Writes through the store reject what the import tolerates
+    with pytest.raises(ValueError):
+        store.add_record({"td_number": "TD9201", "end_period": "TBD"})
+    with pytest.raises(ValueError):
+        store.update_record(store.get_all()[0]["td_number"], {"start_period": "sometime"})
+    store.add_record({"td_number": "TD9201", "end_period": "4/30/2025", "start_period": " "})
+    assert (store.find_by_td("TD9201")["end_period"], store.find_by_td("TD9201")["start_period"]) == ("2025-04-30", "")
+
+
+def _histograms(records):
+    out = {}
+    for dimension, column, default in db_store.STAT_DIMENSIONS:
+        counts = {}
+        for record in records:
+            key = (record.get(column) or "").strip(" \t\n\r") or default
+            counts[key] = counts.get(key, 0) + 1
+        out[f"by_{dimension}"] = dict(sorted(counts.items()))
+    return out
+
+
+def test_stat_counters_follow_writes(store):
+    assert store._get_setting("stat_counters") == "1"
+    td = store.get_all()[0]["td_number"]
+    store.add_record({"td_number": "TD9301", "status": "Brand New", "class": "IIb", "writer": " Pat "})
+    store.update_record(td, {"status": "Brand New", "writer": ""})
+    store.bulk_update({"status": "Brand New"}, {"class": "III"})
+    store.delete_record("TD9301")
+
+    stats = store.get_stats()
+    expected = _histograms(store.get_all())
+    for dimension in ("by_status", "by_class", "by_writer"):
+        assert stats[dimension] == expected[dimension], dimension
+    assert stats["by_status"]["Brand New"] == len(store.find_all_by_td(td, include_archived=False))
+    assert stats["total_records"] == store.count_records()
+
+
+def test_bulk_update_changes_every_match_at_once(store):
+    store.add_records([
+        {"td_number": "TD9301", "writer": "Bulk Writer", "class": "IIb", "end_period": "2025-01-31"},
+        {"td_number": "TD9301", "writer": "Bulk Writer", "class": "IIb", "end_period": "2025-02-28"},
+        {"td_number": "TD9302", "writer": "Bulk Writer", "class": "III", "end_period": "2025-03-31"},
+    ])
+    version = store.data_version()
+    updated = store.bulk_update({"writer": "bulk writer", "class": "IIb"}, {"status": "Released", "end_period": "2025-04-30"})
+    assert [(r["td_number"], r["status"], r["due_date"], r["version"]) for r in updated] == [
+        ("TD9301", "Released", "2025-05-30", 2),
+        ("TD9301", "Released", "2025-05-30", 2),
+    ]
+    assert store.find_by_td("TD9302")["status"] != "Released"
+    assert len(store.changes_since(version)["changes"]) == 2
+
+    assert store.bulk_update({"writer": "nobody here"}, {"status": "Released"}) == []
+    with pytest.raises(ValueError):
+        store.bulk_update({"writer": "bulk writer"}, {"nonsense": 1})
+
+
+def test_convex_bulk_update_patches_all_matches_in_one_call():
+    from backend.db_convex import ConvexStore
+
+    convex = ConvexStore()
+    matches = [{"_id": "a", "td_number": "TD9301"}, {"_id": "b", "td_number": "TD9301"}]
+    calls = []
+    convex._call_query = lambda path, args=None: matches
+    convex._call_mutation = lambda path, args=None: calls.append((path, args)) or [
+        {**m, **args["updates"]} for m in matches
+    ]
+    updated = convex.bulk_update({"class": "IIb"}, {"status": "Released", "version": 9})
+    assert calls == [("psur:bulkUpdate", {"ids": ["a", "b"], "updates": {"status": "Released"}})]
+    assert [r["status"] for r in updated] == ["Released", "Released"]
+
+
+def _due_order(records):
+    return sorted(records, key=lambda r: (r["due_date"] or "~", r["td_number"], r["id"]))
+
+
+def test_cursor_pages_walk_the_due_order(store):
+    expected = [r["id"] for r in _due_order(store.get_all())]
+
+    seen, cursor = [], None
+    while True:
+        page = store.page_records(limit=7, cursor=cursor)
+        seen.extend(r["id"] for r in page["items"])
+        if cursor is None:
+            assert page["total"] == len(expected)
+            # Rows added before the cursor position do not shift later pages
+            store.add_record({"td_number": "TD9401", "end_period": "2000-01-01"})
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+    writers = [r["writer"] for r in store.get_all() if r["writer"]]
+    writer = max(set(writers), key=writers.count)
+    filtered = [r["id"] for r in store.filter_records(writer=writer)]
+    first = store.page_records({"writer": writer}, limit=2)
+    rest = store.page_records({"writer": writer}, limit=100, cursor=first["next_cursor"])
+    assert len(filtered) > 2
+    assert [r["id"] for r in first["items"] + rest["items"]] == filtered
+
+    try:
+        store.page_records(cursor="not-a-cursor")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("invalid cursor accepted")
+
+
+def test_journal_records_edits(store):
+    td = store.get_all()[0]["td_number"]
+    version = store.data_version()
+    store.update_record(td, {"writer": "Someone Else"})
+    delta = store.changes_since(version)
+    assert not delta["reset"] and delta["version"] > version
+    assert {(c["op"], c["td_number"]) for c in delta["changes"]} == {("update", td)}
+    assert all(c["columns"] == ["writer"] for c in delta["changes"])
+
+    store.add_record({"td_number": "TD9801"})
+    store.delete_record("TD9801")
+    ops = [c["op"] for c in store.changes_since(delta["version"])["changes"]]
+    assert ops[0] == "insert" and ops[-1] == "delete"
+
+    # A full re-import cannot be replayed row by row
+    store.import_from_excel()
+    assert store.changes_since(version)["reset"]
+
+
+def test_journal_records_one_entry_per_edit(store):
+    td = store.get_all()[0]["td_number"]
+    rows = len(store.find_all_by_td(td, include_archived=False))
+
+    version = store.data_version()
+    store.update_record(td, {"end_period": "2031-01-31"})
+    delta = store.changes_since(version)
+    assert [c["columns"] for c in delta["changes"]] == [["end_period", "due_date"]] * rows
+    assert store.find_by_td(td)["due_date"] == "2031-03-02"
+
+    version = store.data_version()
+    store.update_record(td, {"due_date": "2040-01-01"})
+    assert store.changes_since(version)["changes"] == []
+    assert store.find_by_td(td)["due_date"] == "2031-03-02"
+
+    version = store.data_version()
+    changed = store.bulk_update({"status": store.find_by_td(td)["status"]}, {"end_period": "2032-01-31"})
+    changes = store.changes_since(version)["changes"]
+    assert sorted(c["row_id"] for c in changes) == sorted(r["id"] for r in changed)
+    assert all(c["columns"] == ["end_period", "due_date"] for c in changes)
+
+
+def test_journal_is_pruned_between_imports(store):
+    td = store.get_all()[0]["td_number"]
+    store._set_setting("changes_retention", 5)
+    start = store.data_version()
+    for i in range(2 * db_store.CHANGES_PRUNE_EVERY):
+        store.update_record(td, {"comments": f"note {i}"})
+
+    kept = store._query("SELECT COUNT(*) FROM psur_changes")[0][0]
+    assert kept <= 5 + db_store.CHANGES_PRUNE_EVERY
+    assert store.changes_since(start)["reset"]
+
+
+def _schema(path: Path):
+    conn = sqlite3.connect(path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        objects = conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+        return version, objects
+    finally:
+        conn.close()
+
+
+def test_writes_wait_for_the_background_import(make_store, monkeypatch):
+    monkeypatch.setattr(db_store, "BACKGROUND_IMPORT", True)
+    read_excel_cached = db_store.read_excel_cached
+
+    def slow_read(path):
+        time.sleep(0.3)
+        return read_excel_cached(path)
+
+    monkeypatch.setattr(db_store, "read_excel_cached", slow_read)
+    store = make_store(ready=False)
+    assert not store.ready.is_set()
+    store.add_record({"td_number": "TD9401", "status": "Assigned"})
+    assert store.ready.is_set()
+
+    rows = len(read_excel_cached(WORKBOOK)[0])
+    assert len(store.get_all(include_archived=True)) == rows + 1
+    assert store.find_by_td("TD9401")["status"] == "Assigned"
+
+
+def test_migrations_upgrade_a_legacy_database(tmp_path, make_store):
+    db = tmp_path / "psur_schedule.db"
+    shutil.copy(LEGACY_DB, db)
+    conn = sqlite3.connect(db)
+    legacy = conn.execute("SELECT id, td_number, end_period FROM psur_reports ORDER BY id").fetchall()
+    conn.close()
+
+    store = make_store()
+    version, objects = _schema(db)
+    assert version == db_store.SCHEMA_VERSION
+    names = {name for _, name, _ in objects}
+    assert {"psur_changes", "psur_comments", "psur_reports_archive", "psur_sequences"} <= names
+    assert {"trg_psur_due_insert", "trg_psur_changes_update", "trg_psur_changes_prune"} <= names
+    assert {"idx_due_ord", "idx_blank_writer"} <= names
+
+    # Rows keep their ids, dates are canonical and due dates derived
+    rows = store.get_all(include_archived=True)
+    assert sorted((r["id"], r["td_number"]) for r in rows) == [(i, td) for i, td, _ in legacy]
+    for record in rows:
+        due = db_store._compute_due(record["end_period"])
+        assert record["due_date"] == (due.isoformat() if due else ""), record["td_number"]
+    store.close()
+
+    # An up-to-date database is left alone on the next start
+    db_store.PSURDatabaseStore().close()
+    assert _schema(db) == (version, objects)
+
+
+def test_migrations_drop_the_legacy_unique_td_constraint(tmp_path, make_store):
+    conn = sqlite3.connect(tmp_path / "psur_schedule.db")
+    conn.execute(
+        "CREATE TABLE psur_reports (id INTEGER PRIMARY KEY AUTOINCREMENT, td_number TEXT UNIQUE, "
+        + ", ".join(f"{column} TEXT" for column in db_store.COLUMN_LIST[1:-3])
+        + ", created_at TEXT, updated_at TEXT, version INTEGER DEFAULT 1)"
+    )
+    conn.execute("INSERT INTO psur_reports (td_number, end_period) VALUES ('TD001', '2025-01-31')")
+    conn.commit()
+    conn.close()
+
+    store = make_store()
+    store.add_record({"td_number": "TD001", "end_period": "2025-02-28"})
+    assert [r["due_date"] for r in store.find_all_by_td("TD001")] == ["2025-03-02", "2025-03-30"]
+
+
+def test_later_migrations_replace_app_function_triggers(tmp_path, make_store, monkeypatch):
+    # A database stopped at version 12 has the triggers those versions shipped
+    with monkeypatch.context() as m:
+        m.setattr(db_store, "MIGRATIONS", db_store.MIGRATIONS[:12])
+        m.setattr(db_store, "SCHEMA_VERSION", 12)
+        make_store().close()
+    version, objects = _schema(tmp_path / "psur_schedule.db")
+    triggers = {name: sql for kind, name, sql in objects if kind == "trigger"}
+    assert version == 12
+    assert "psur_due_date(" in triggers["trg_psur_due_insert"]
+    assert "psur_lookup_key(" in triggers["trg_psur_lookup_keys_update"]
+
+    store = make_store()
+    version, objects = _schema(tmp_path / "psur_schedule.db")
+    assert version == db_store.SCHEMA_VERSION
+    assert not [name for kind, name, sql in objects if sql and ("psur_due_date(" in sql or "psur_lookup_key(" in sql)]
+    assert {"idx_writer", "idx_status"}.isdisjoint(name for kind, name, sql in objects)
+    assert store.filter_records(status="in progress") == store.filter_records(status="In Progress")
+
+
+FILTER_CASES = (
+    {},
+    {"status": "progress"},
+    {"status": "Released"},
+    {"writer": "pranavi"},
+    {"writer": "a", "status": "a"},
+    {"classification": "IIa"},
+    {"classification": "I"},
+    {"type": "psur"},
+    {"within_days": 120},
+    {"overdue_only": True},
+    {"writer": "zzz-nobody"},
+)
+
+
+def _both_paths(store, method, *args, **kwargs):
+    """``method`` answered from SQL and from the columnar snapshot."""
+    store.snapshot_enabled = False
+    from_sql = getattr(store, method)(*args, **kwargs)
+    store.snapshot_enabled = True
+    from_snapshot = getattr(store, method)(*args, **kwargs)
+    return from_sql, from_snapshot
+
+
+def _assert_snapshot_matches_sql(store):
+    for filters in FILTER_CASES:
+        from_sql, from_snapshot = _both_paths(store, "filter_records", **filters)
+        assert [r["id"] for r in from_snapshot] == [r["id"] for r in from_sql], filters
+    from_sql, from_snapshot = _both_paths(store, "get_stats")
+    assert from_snapshot == from_sql
+    from_sql, from_snapshot = _both_paths(store, "get_schedule_for_years", 2025, 2026)
+    assert from_snapshot == from_sql
+    from_sql, from_snapshot = _both_paths(store, "find_missing_fields", ["writer", "due_date", "email"])
+    assert from_snapshot == from_sql
+
+
+def test_snapshot_answers_match_sql(make_store):
+    pytest.importorskip("numpy")
+    store = make_store()
+    _assert_snapshot_matches_sql(store)
+    built = store.columnar_snapshot()
+
+    # Small changes are patched in from the journal
+    td = store.get_all()[0]["td_number"]
+    store.update_record(td, {"status": "In Progress", "writer": "", "end_period": "2025-12-31"})
+    store.add_record({"td_number": "TD9501", "writer": "Pranavi", "class": "IIa", "end_period": "2026-01-31"})
+    store.delete_record(store.get_all()[-1]["td_number"])
+    _assert_snapshot_matches_sql(store)
+    assert store.columnar_snapshot() is not built
+
+    # Another worker maps the file this one wrote
+    other = make_store()
+    other.snapshot_enabled = True
+    assert other.columnar_snapshot().version == store.data_version()
+    assert other.filter_records(status="progress") == store.filter_records(status="progress")
+
+
+def test_archived_reports_stay_reachable(store):
+    # Imports leave every row in the hot table unless archiving is configured
+    total = len(store.get_all())
+    assert store.count_archived() == 0 and store.get_stats()["total_records"] == total
+
+    assert store.archive_released() > 0
+    archived = [r for r in store.get_all(include_archived=True) if r["archived_at"]]
+    assert archived and store.count_archived() == len(archived)
+    assert len(store.get_all()) == total - len(archived)
+    hot = {r["td_number"] for r in store.get_all()}
+    record = next(r for r in archived if r["td_number"] not in hot and r.get("psur_number"))
+    td = record["td_number"]
+
+    assert store.find_by_td(td)["archived_at"]
+    assert store.find_by_psur(record["psur_number"])["td_number"] == td
+    assert td in [r["td_number"] for r in store.find_by_query(td)]
+    assert store.add_comment(td, "Filed with the authority", author="QA")
+    assert [c["body"] for c in store.get_comments(td)] == ["Filed with the authority"]
+
+    # Restoring and re-archiving keeps the comments attached
+    assert store.restore_archived(td) == 1
+    assert store.find_by_td(td).get("archived_at") is None
+    assert store.archive_released() >= 1
+    assert store.find_by_td(td)["archived_at"]
+    assert len(store.get_comments(td)) == 1
+
+    # Editing brings the report back to the hot table
+    assert store.update_record(td, {"writer": "Archivist"})
+    assert store.find_by_td(td)["writer"] == "Archivist"
+    assert td in {r["td_number"] for r in store.get_all()}
+    store.archive_released()
+
+    assert store.delete_record(td)
+    assert store.find_by_td(td) is None
+    assert store.get_comments(td) == []
+
+
+def test_update_record_covers_archived_rows(store):
+    store.archive_released()
+    record = next(r for r in store.get_all(include_archived=True) if r["archived_at"] and r["td_number"])
+    td = record["td_number"]
+    store.add_record({"td_number": td, "product_name": record["product_name"], "status": "Assigned"})
+    assert {bool(r["archived_at"]) for r in store.find_all_by_td(td)} == {True, False}
+
+    assert store.update_record(td, {"writer": "Archivist"})
+    rows = store.find_all_by_td(td)
+    assert len(rows) >= 2 and {r["writer"] for r in rows} == {"Archivist"}
+    assert not any(r["archived_at"] for r in rows)
+
+
+def test_archiving_on_import_is_opt_in(store, client, monkeypatch):
+    store.archive_on_import = True
+    store.import_from_excel()
+    archived = store.count_archived()
+    assert archived > 0
+    store.archive_on_import = False
+    assert store.sync_from_excel()["inserted"] == []
+    assert store.count_archived() == archived
+
+    from backend.async_store import AsyncStore
+    from backend.db_convex import ConvexStore
+    import backend.server as server
+
+    assert client.post("/data/archive").json()["ok"]
+    convex = AsyncStore(ConvexStore())
+    monkeypatch.setattr(server, "get_async_store", lambda: convex)
+    assert client.post("/data/archive").status_code == 501
+    convex.shutdown()
+
+
+def _convex_over(source):
+    """A ConvexStore whose get_all returns ``source``'s hot records."""
+    from backend.db_convex import ConvexStore
+
+    store = ConvexStore()
+    store.get_all = lambda **kwargs: source.get_all()
+    return store
+
+
+def _convex_in_memory():
+    """A ConvexStore whose getAll/applySync calls run against a dict of documents."""
+    from backend.db_convex import ConvexStore
+
+    store = ConvexStore()
+    store.documents = {}
+    ids = itertools.count(1)
+
+    def query(path, args=None):
+        assert path == "psur:getAll"
+        return list(store.documents.values())
+
+    def mutation(path, args=None):
+        assert path == "psur:applySync"
+        for doc_id in args["deletes"]:
+            del store.documents[doc_id]
+        for update in args["updates"]:
+            store.documents[update["id"]].update(update["fields"])
+        for fields in args["inserts"]:
+            n = next(ids)
+            store.documents[f"doc{n}"] = {**fields, "_id": f"doc{n}", "_creationTime": n}
+        return {}
+
+    store._call_query, store._call_mutation = query, mutation
+    return store
+
+
+def test_convex_sync_writes_only_changes(store):
+    convex = _convex_in_memory()
+    workbook = store.get_all(include_archived=True)
+    assert convex.import_from_excel() == len(workbook)
+    assert sorted(d["td_number"] for d in convex.documents.values()) == sorted(r["td_number"] for r in workbook)
+    changes = convex.sync_from_excel()
+    assert (changes["inserted"], changes["updated"], changes["deleted"]) == ([], [], [])
+    assert changes["unchanged"] == len(workbook)
+
+    edited = next(d for d in convex.documents.values() if d["td_number"])
+    edited["status"] = "Edited"
+    convex.documents["extra"] = {"_id": "extra", "_creationTime": 10**6, "td_number": "TD9901"}
+    changes = convex.sync_from_excel()
+    assert changes["updated"] == [edited["td_number"]]
+    assert changes["deleted"] == ["TD9901"]
+    assert edited["status"] != "Edited" and "extra" not in convex.documents
+
+
+def test_due_ranges_and_buckets(store):
+    dues = sorted(date.fromisoformat(r["due_date"]) for r in store.get_all() if r["due_date"])
+    start, end = dues[len(dues) // 4], dues[3 * len(dues) // 4]
+    expected = [d for d in dues if start <= d <= end]
+
+    items = store.records_due_between(start, end.isoformat())
+    assert [date.fromisoformat(r["due_date"]) for r in items] == expected
+    months = store.due_bucket_counts(start, end, "month")
+    assert list(months) == sorted(months) and sum(months.values()) == len(expected)
+    assert months[start.strftime("%Y-%m")] == sum(1 for d in expected if d.strftime("%Y-%m") == start.strftime("%Y-%m"))
+    weeks = store.due_bucket_counts(start, end, "week")
+    assert all(date.fromisoformat(monday).weekday() == 0 for monday in weeks)
+
+    period = store.due_in_period("quarter", anchor=start)
+    assert period["count"] == sum(period["buckets"].values()) == len(period["items"])
+    with pytest.raises(ValueError):
+        store.due_bucket_counts(start, end, "fortnight")
+    with pytest.raises(ValueError):
+        store.records_due_between("someday", end)
+
+    # The Convex client answers the same questions from getAll
+    convex = _convex_over(store)
+    assert convex.records_due_between(start, end) == items
+    assert convex.due_bucket_counts(start.isoformat(), end, "week") == weeks
+    assert convex.due_in_period("quarter", anchor=start.isoformat()) == period
+    with pytest.raises(ValueError):
+        convex.due_bucket_counts(start, end, "fortnight")
+    with pytest.raises(ValueError):
+        convex.records_due_between(start, "2025-13-45")
+
+
+def test_convex_health_report_matches_sqlite(tmp_path, make_store):
+    store = make_store()
+    store.add_records([{"td_number": "TD9601"}, {"td_number": "TD9601", "product_name": "Second row"}])
+    conn = sqlite3.connect(tmp_path / "psur_schedule.db")
+    conn.execute("UPDATE psur_reports SET start_period = 'Q3 2024' WHERE td_number = 'TD9601'")
+    conn.commit()
+    conn.close()
+
+    health = store.data_health()
+    assert "TD9601" in health["duplicate_td_numbers"]
+    assert health["invalid_dates"]["start_period"]["count"] == 2
+    convex = _convex_over(store).data_health()
+    assert convex.pop("version") is None
+    health.pop("version")
+    assert convex == health
+
+
+def _baseline_filter(records, writer=None, classification=None, status=None):
+    """The original Python filter: case-insensitive substring of the raw value."""
+    def matches(record, column, needle):
+        return not needle or needle.lower() in (record.get(column) or "").lower()
+
+    return sorted(
+        record["id"] for record in records
+        if matches(record, "writer", writer)
+        and matches(record, "class", classification)
+        and matches(record, "status", status)
+    )
+
+
+TEXT_FILTER_CASES = (
+    {"status": "progress"},
+    {"status": "PROGRESS"},
+    {"status": " progress"},
+    {"status": "released"},
+    {"writer": "Pranavi"},
+    {"writer": "sd, p"},
+    {"classification": "IIa"},
+    {"classification": "I"},
+    {"classification": "i", "status": "released", "writer": "a"},
+)
+
+
+def test_filters_keep_substring_matching(tmp_path, make_store):
+    shutil.copy(LEGACY_DB, tmp_path / "psur_schedule.db")
+    store = make_store()
+    assert len(store.filter_records(status="progress")) == 4
+    assert "Venkata SD, Pranavi" in {r["writer"] for r in store.filter_records(writer="Pranavi")}
+    assert "I, IIa" in {r["class"] for r in store.filter_records(classification="IIa")}
+
+    store.add_record({"td_number": "TD9701", "status": "Released ", "writer": "  Jeff S", "class": "Class IIa"})
+    store.add_record({"td_number": "TD9702", "status": "Assigned", "writer": "ÉLODIE Ärnström"})
+    records = store.get_all()
+    extra = ({"status": "released "}, {"writer": "  jeff"}, {"writer": "élodie"}, {"writer": "ärn"}, {"writer": "DIE"})
+    for filters in TEXT_FILTER_CASES + extra:
+        expected = _baseline_filter(records, **filters)
+        assert expected, filters
+        for found in _both_paths(store, "filter_records", **filters):
+            assert sorted(r["id"] for r in found) == expected, filters
+
+    # Substring needles seek the suffix table instead of scanning the keys
+    where, params = db_store._compile_filters(writer="Pranavi")
+    plan = " ".join(row[3] for row in store._query(f"EXPLAIN QUERY PLAN SELECT id FROM psur_reports WHERE {where}", params))
+    assert "SEARCH psur_lookup_suffixes USING PRIMARY KEY" in plan, plan
+
+
+def test_update_record_leaves_storage_columns_alone(store):
+    td = next(r["td_number"] for r in store.get_all() if r["td_number"] and r["writer"])
+    assert not store.update_record(td, {"writer_key": "someone else", "due_ord": 1, "content_hash": "x"})
+    assert store.update_record(td, {"writer": "Zoë Adams", "status_key": "released", "sort_key": "0"})
+
+    row = store._query("SELECT writer_key, status, status_key, due_date, due_ord FROM psur_reports WHERE td_number = ?", (td,))[0]
+    assert row["writer_key"] == "zoë adams"
+    assert row["status_key"] == (row["status"] or "").strip().lower()
+    assert row["due_ord"] == (date.fromisoformat(row["due_date"]).toordinal() if row["due_date"] else None)
+    assert [r["id"] for r in store.filter_records(writer="ZOË")] == [r["id"] for r in store.find_all_by_td(td)]
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,110 @@
+"""Tests for the workbook cache and the Excel writers in backend.excel_utils"""
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from backend import excel_utils
+
+WORKBOOK = Path(__file__).parent / "2025 Periodic Safety Update Report Master Schedule (2).xlsx"
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    """A private copy of the workbook, its cache dir, and a count of real parses."""
+    monkeypatch.setattr(excel_utils, "WORKBOOK_CACHE_DIR", tmp_path / "cache")
+    parses = []
+    read_excel_auto = excel_utils.read_excel_auto
+
+    def counting_read(path):
+        parses.append(path)
+        return read_excel_auto(path)
+
+    monkeypatch.setattr(excel_utils, "read_excel_auto", counting_read)
+    path = tmp_path / "schedule.xlsx"
+    shutil.copy(WORKBOOK, path)
+    return path, parses
+
+
+def test_cache_hits_until_the_workbook_changes(workbook):
+    openpyxl = pytest.importorskip("openpyxl")
+    path, parses = workbook
+    df, colmap = excel_utils.read_excel_cached(str(path))
+    again, _ = excel_utils.read_excel_cached(str(path))
+    assert len(parses) == 1
+    assert again.equals(df)
+
+    # Touched but byte-identical: the digest matches, no re-parse
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    excel_utils.read_excel_cached(str(path))
+    assert len(parses) == 1
+    entry = excel_utils._load_workbook_cache(excel_utils._workbook_cache_path(path.resolve()))
+    assert entry["mtime_ns"] == path.stat().st_mtime_ns
+
+    # Edited: size and digest move, so the workbook is parsed again
+    book = openpyxl.load_workbook(path)
+    sheet = next(ws for ws in book.worksheets if colmap["product_name"] in [c.value for c in ws[1]])
+    column = [c.value for c in sheet[1]].index(colmap["product_name"]) + 1
+    sheet.cell(row=2, column=column, value="Cache Probe")
+    book.save(path)
+    edited, _ = excel_utils.read_excel_cached(str(path))
+    assert len(parses) == 2
+    assert edited[colmap["product_name"]].iloc[0] == "Cache Probe"
+
+
+def test_corrupt_cache_is_rebuilt(workbook):
+    path, parses = workbook
+    df, _ = excel_utils.read_excel_cached(str(path))
+    cache_path = excel_utils._workbook_cache_path(path.resolve())
+    cache_path.write_bytes(b"not a pickle")
+
+    again, _ = excel_utils.read_excel_cached(str(path))
+    assert len(parses) == 2
+    assert again.equals(df)
+    assert excel_utils._load_workbook_cache(cache_path) is not None
+    excel_utils.read_excel_cached(str(path))
+    assert len(parses) == 2
+
+
+def test_write_records_xlsx_round_trips(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    columns = ["td_number", "product_name", "end_period", "due_date", "status", "id"]
+    records = (
+        {"td_number": f"TD{i:03d}", "product_name": f"Kit {i}", "end_period": "2025-03-31",
+         "due_date": "" if i == 2 else "2025-04-30", "status": "Assigned", "id": i}
+        for i in range(1, 4)
+    )
+    path = tmp_path / "export.xlsx"
+    assert excel_utils.write_records_xlsx(str(path), records, columns) == 3
+
+    sheet = openpyxl.load_workbook(path)["PSUR Schedule"]
+    header = [c.value for c in sheet[1]]
+    assert header == [excel_utils.EXACT_HEADERS["row_id"], excel_utils.EXACT_HEADERS["product_name"],
+                      excel_utils.EXACT_HEADERS["end_period"], excel_utils.EXACT_HEADERS["due_date"],
+                      excel_utils.EXACT_HEADERS["status"], "id"]
+    assert sheet.column_dimensions["B"].width == excel_utils.EXPORT_COLUMN_WIDTHS["product_name"]
+    assert sheet.column_dimensions["F"].width == 12
+    end_cell, due_cell = sheet["C2"], sheet["D3"]
+    assert end_cell.is_date and end_cell.value.date().isoformat() == "2025-03-31"
+    assert due_cell.value is None
+    assert sheet["F2"].value == 1
+
+    # The export reads back through the importer's header mapping
+    df, colmap = excel_utils.read_excel_auto(str(path))
+    assert list(df[colmap["row_id"]]) == ["TD001", "TD002", "TD003"]
+    assert str(df[colmap["end_period"]].iloc[0]) == "2025-03-31"
+
+
+def test_save_with_backup_copies_the_saved_file(tmp_path):
+    pd = pytest.importorskip("pandas")
+    path = tmp_path / "schedule.xlsx"
+    excel_utils.save_with_backup(pd.DataFrame({"TD Number": ["TD001"], "Status": ["Assigned"]}), str(path))
+
+    backups = list(tmp_path.glob("schedule.bak-*.xlsx"))
+    assert len(backups) == 1
+    assert backups[0].read_bytes() == path.read_bytes()
+    assert pd.read_excel(backups[0]).to_dict("records") == [{"TD Number": "TD001", "Status": "Assigned"}]
@@ -0,0 +1,46 @@
+"""Tests for the streaming CSV/NDJSON encoders"""
+import csv
+import hashlib
+import io
+import json
+import os
+import zlib
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from backend import export_utils
+
+# Hash text so the gzip stream does not collapse into a single chunk
+ROWS = [
+    {"td_number": f"TD{i:05d}", "product_name": f"Kit é {hashlib.sha256(str(i).encode()).hexdigest()}", "extra": "x"}
+    for i in range(5000)
+]
+FIELDS = ("td_number", "product_name")
+
+
+def _gunzip(data: bytes) -> bytes:
+    return zlib.decompress(data, 31)
+
+
+def test_csv_chunks_gzip_round_trip():
+    plain = b"".join(export_utils.csv_chunks(ROWS, FIELDS))
+    chunks = list(export_utils.csv_chunks(ROWS, FIELDS, compress=True))
+    assert len(chunks) > 2
+    assert _gunzip(b"".join(chunks)) == plain
+    # The header chunk is sync-flushed, so it decodes on its own
+    assert zlib.decompressobj(31).decompress(chunks[0]) == b"td_number,product_name\r\n"
+
+    rows = list(csv.DictReader(io.StringIO(plain.decode("utf-8"))))
+    assert rows == [{name: row[name] for name in FIELDS} for row in ROWS]
+
+
+def test_ndjson_chunks_gzip_round_trip():
+    plain = b"".join(export_utils.ndjson_chunks(ROWS, fieldnames=FIELDS))
+    chunks = list(export_utils.ndjson_chunks(ROWS, fieldnames=FIELDS, compress=True))
+    assert len(chunks) > 2
+    assert _gunzip(b"".join(chunks)) == plain
+    lines = plain.decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{name: row[name] for name in FIELDS} for row in ROWS]
+
+    # No rows: still a valid (empty) gzip stream
+    assert _gunzip(b"".join(export_utils.ndjson_chunks([], compress=True))) == b""